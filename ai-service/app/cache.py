@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+
+class AnalysisCache:
+    """
+    Persistent SQLite cache of AIAnalysisResult dicts, keyed on the normalized
+    content plus the prompt and model that produced them.
+    Entries expire after `ttl_seconds`; beyond `max_entries` the least recently
+    used ones are evicted. Both are enforced every TRIM_EVERY writes, so the table
+    can briefly run that many entries over.
+    """
+
+    TRIM_EVERY = 100
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._writes = 0 # Every TRIM_EVERY-th write trims, starting with a process's first
+        self._writes_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str, prompt_version: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\n{prompt_version}\n{text}".encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS analysis_cache (
+                            key TEXT PRIMARY KEY,
+                            analysis TEXT NOT NULL,
+                            created_at REAL NOT NULL,
+                            last_used_at REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS analysis_cache_last_used_idx ON analysis_cache (last_used_at)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS analysis_cache_created_idx ON analysis_cache (created_at)")
+                    conn.commit()
+                    self._initialized = True
+        try:
+            with conn: # Commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT analysis, created_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE analysis_cache SET last_used_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def set(self, key: str, analysis: Dict[str, Any]):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, analysis, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(analysis), now, now)
+            )
+            with self._writes_lock:
+                trim = self._writes % self.TRIM_EVERY == 0
+                self._writes += 1
+            if trim:
+                self._trim(conn, now)
+
+    def _trim(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        overflow = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute("""
+                DELETE FROM analysis_cache WHERE key IN (
+                    SELECT key FROM analysis_cache ORDER BY last_used_at LIMIT ?
+                )
+            """, (overflow,))
+
+def open_analysis_cache(data_dir: str, ttl_seconds: int, max_entries: int) -> AnalysisCache:
+    os.makedirs(data_dir, exist_ok=True)
+    return AnalysisCache(os.path.join(data_dir, "analysis_cache.sqlite3"), ttl_seconds, max_entries)
@@ -0,0 +1,167 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+class RunCheckpoint:
+    """
+    Durable progress of in-flight batches in SQLite: the rows each run claimed and
+    every analysis as soon as it completes. After a crash or restart the run is
+    resumed on the same rows and recorded analyses are reused instead of calling
+    the LLM again. Entries are dropped once their rows are saved.
+
+    Runs belong to `instance`, a name that survives restarts (AI_SERVICE_INSTANCE,
+    default the hostname), so a container that comes back under a new hostname
+    still finds its runs, provided the data directory is a persistent volume.
+    """
+
+    def __init__(self, path: str, max_age_seconds: int, instance: Optional[str] = None):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.instance = instance or socket.gethostname()
+        self._live = set() # batch_ids started by this process
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS checkpoint_runs (
+                            batch_id TEXT PRIMARY KEY,
+                            worker_id TEXT NOT NULL,
+                            instance TEXT,
+                            hostname TEXT NOT NULL,
+                            pid INTEGER NOT NULL,
+                            started_at REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS checkpoint_items (
+                            content_id TEXT PRIMARY KEY,
+                            batch_id TEXT NOT NULL,
+                            analysis TEXT,
+                            updated_at REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS checkpoint_items_batch_idx ON checkpoint_items (batch_id)")
+                    columns = [row[1] for row in conn.execute("PRAGMA table_info(checkpoint_runs)")]
+                    if "instance" not in columns: # Files written before runs were keyed on the instance
+                        conn.execute("ALTER TABLE checkpoint_runs ADD COLUMN instance TEXT")
+                    conn.commit()
+                    self._initialized = True
+        try:
+            with conn: # Commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def start_run(self, batch_id: str, worker_id: str, content_ids: List[str]):
+        """
+        Registers (or extends) a run owned by this process. Analyses already recorded
+        for these rows, e.g. by a run that crashed before saving, are kept.
+        """
+        now = time.time()
+        self._live.add(batch_id)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoint_runs (batch_id, worker_id, instance, hostname, pid, started_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (batch_id, worker_id, self.instance, socket.gethostname(), os.getpid(), now)
+            )
+            conn.executemany("""
+                INSERT INTO checkpoint_items (content_id, batch_id, analysis, updated_at) VALUES (?, ?, NULL, ?)
+                ON CONFLICT (content_id) DO UPDATE SET batch_id = excluded.batch_id, updated_at = excluded.updated_at
+            """, [(content_id, batch_id, now) for content_id in content_ids])
+
+    def record(self, content_id: str, analysis: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE checkpoint_items SET analysis = ?, updated_at = ? WHERE content_id = ?",
+                (json.dumps(analysis), time.time(), content_id)
+            )
+
+    def completed(self, content_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Recorded analyses for the given rows, by content_id."""
+        if not content_ids:
+            return {}
+        placeholders = ",".join("?" * len(content_ids))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT content_id, analysis FROM checkpoint_items WHERE analysis IS NOT NULL AND content_id IN ({placeholders})",
+                content_ids
+            ).fetchall()
+        return {content_id: json.loads(analysis) for content_id, analysis in rows}
+
+    def release(self, content_ids: List[str]):
+        """Drops rows that are safely saved."""
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM checkpoint_items WHERE content_id = ?", [(c,) for c in content_ids])
+
+    def finish_run(self, batch_id: str):
+        """
+        Closes a run. Rows whose save failed keep their analyses until they are
+        reclaimed or age out.
+        """
+        self._live.discard(batch_id)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoint_runs WHERE batch_id = ?", (batch_id,))
+            conn.execute("DELETE FROM checkpoint_items WHERE updated_at < ?", (time.time() - self.max_age_seconds,))
+
+    def interrupted_runs(self) -> List[Dict[str, Any]]:
+        """
+        Runs of this instance whose owning process is gone, with their unsaved rows.
+        """
+        with self._connect() as conn:
+            runs = conn.execute(
+                "SELECT batch_id, worker_id, hostname, pid FROM checkpoint_runs WHERE COALESCE(instance, hostname) = ?",
+                (self.instance,)
+            ).fetchall()
+            interrupted = []
+            for batch_id, worker_id, hostname, pid in runs:
+                if self._owner_alive(batch_id, hostname, pid):
+                    continue
+                content_ids = [row[0] for row in conn.execute(
+                    "SELECT content_id FROM checkpoint_items WHERE batch_id = ?", (batch_id,)
+                )]
+                interrupted.append({"batch_id": batch_id, "worker_id": worker_id, "pid": pid, "content_ids": content_ids})
+        return interrupted
+
+    def take_over(self, run: Dict[str, Any], worker_id: str) -> bool:
+        """
+        Atomically moves an interrupted run to this process. Only one of several
+        processes resuming at once wins.
+        """
+        with self._connect() as conn:
+            taken = conn.execute(
+                "UPDATE checkpoint_runs SET worker_id = ?, instance = ?, hostname = ?, pid = ?, started_at = ? WHERE batch_id = ? AND pid = ?",
+                (worker_id, self.instance, socket.gethostname(), os.getpid(), time.time(), run["batch_id"], run["pid"])
+            ).rowcount == 1
+        if taken:
+            self._live.add(run["batch_id"])
+        return taken
+
+    def _owner_alive(self, batch_id: str, hostname: str, pid: int) -> bool:
+        if hostname != socket.gethostname():
+            return False # Written by a previous incarnation of this instance (e.g. a replaced container)
+        if pid == os.getpid():
+            # Same pid as ours: either our own run or a previous incarnation (e.g. a restarted container)
+            return batch_id in self._live
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+def open_run_checkpoint(data_dir: str, max_age_seconds: int, instance: Optional[str] = None) -> RunCheckpoint:
+    os.makedirs(data_dir, exist_ok=True)
+    return RunCheckpoint(os.path.join(data_dir, "run_checkpoint.sqlite3"), max_age_seconds, instance)
@@ -1,7 +1,21 @@
+import json
 import os
+import socket
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Optional
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from langchain_groq import ChatGroq
+from app.rate_limit import open_rate_limiter
+from app.resilience import CircuitBreaker
+from app.cache import open_analysis_cache
+from app.dedup import open_near_duplicate_index
+from app.checkpoint import open_run_checkpoint
+from app.job_store import open_job_store
+
+# Heavy client libraries are imported on first use, keeping service startup fast
+if TYPE_CHECKING:
+    from supabase import Client
+    from langchain_core.language_models import BaseChatModel
+    from app.prefilter import Prefilter
 
 # Load .env from project root
 env_path = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
@@ -10,18 +24,212 @@ load_dotenv(dotenv_path=env_path)
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY") or os.getenv("SUPABASE_ANON_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+# Two-tier cascade: a fast triage model first, escalating to GROQ_MODEL only near decision thresholds
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+TRIAGE_MODEL = os.getenv("TRIAGE_MODEL", "llama-3.1-8b-instant")
+CASCADE_MARGIN = float(os.getenv("CASCADE_MARGIN", "8"))
+TRIAGE_REQUESTS_PER_MINUTE = int(os.getenv("TRIAGE_REQUESTS_PER_MINUTE", "30"))
+TRIAGE_TOKENS_PER_MINUTE = int(os.getenv("TRIAGE_TOKENS_PER_MINUTE", "6000"))
+
+# Analysis fan-out: max in-flight Groq calls per batch, and the account's rate limits
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "5"))
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "12000"))
+# Draw the limits above from one budget shared by all processes on the host (gunicorn workers, worker.py)
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "true").lower() == "true"
+
+# Scoring policy (see app/scoring.py); change and run `python -m app.rescore` to re-decide stored analyses
+SCORE_WEIGHT_QUALITY = float(os.getenv("SCORE_WEIGHT_QUALITY", "0.4"))
+SCORE_WEIGHT_ENGAGEMENT = float(os.getenv("SCORE_WEIGHT_ENGAGEMENT", "0.3"))
+SCORE_WEIGHT_VIRALITY = float(os.getenv("SCORE_WEIGHT_VIRALITY", "0.3"))
+SCORE_REJECT_THRESHOLD = float(os.getenv("SCORE_REJECT_THRESHOLD", "40"))
+SCORE_APPROVE_THRESHOLD = float(os.getenv("SCORE_APPROVE_THRESHOLD", "70"))
+SCORE_SPAM_OVERRIDE = float(os.getenv("SCORE_SPAM_OVERRIDE", "80")) # "spam" in reasoning rejects below this score
+
+# Groq JSON mode for analysis calls (output is still repaired/coerced locally), and re-asks for unparseable output
+ANALYSIS_JSON_MODE = os.getenv("ANALYSIS_JSON_MODE", "true").lower() == "true"
+ANALYSIS_MAX_REASKS = int(os.getenv("ANALYSIS_MAX_REASKS", "1"))
+
+# Groq retries: attempts per call, total retry sleep allowed per batch, and the circuit breaker
+GROQ_MAX_ATTEMPTS = int(os.getenv("GROQ_MAX_ATTEMPTS", "4"))
+GROQ_RETRY_BUDGET_SECONDS = float(os.getenv("GROQ_RETRY_BUDGET_SECONDS", "120"))
+# Transient failures one item may accumulate across runs before it is given up as ai_error instead of requeued
+GROQ_MAX_ITEM_RETRIES = int(os.getenv("GROQ_MAX_ITEM_RETRIES", "12"))
+GROQ_BREAKER_FAILURES = int(os.getenv("GROQ_BREAKER_FAILURES", "5"))
+GROQ_BREAKER_RESET_SECONDS = float(os.getenv("GROQ_BREAKER_RESET_SECONDS", "60"))
+
+# How long a worker owns claimed content_queue rows before others may reclaim them
+CONTENT_LEASE_SECONDS = int(os.getenv("CONTENT_LEASE_SECONDS", "600"))
+
+# Content tokens sent per item; longer articles are compressed by extractive sentence selection
+ANALYSIS_TOKEN_BUDGET = int(os.getenv("ANALYSIS_TOKEN_BUDGET", "1000"))
+
+# Packed analysis: content tokens per multi-item call (0 = one item per call)
+ANALYSIS_PACK_TOKEN_BUDGET = int(os.getenv("ANALYSIS_PACK_TOKEN_BUDGET", "0"))
+ANALYSIS_PACK_MAX_ITEMS = int(os.getenv("ANALYSIS_PACK_MAX_ITEMS", "8"))
+
+# Local durable state (analysis cache etc.)
+DATA_DIR = os.getenv("AI_SERVICE_DATA_DIR") or os.path.join(os.path.dirname(__file__), '..', '.data')
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "50000"))
+
+# Near-duplicate detection: "inherit" reuses the original's analysis, "reject" drops the copy
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_MODE = os.getenv("NEAR_DUP_MODE", "inherit")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+# Each process holds its own copy of the history in memory, roughly 2KB per entry
+NEAR_DUP_MAX_HISTORY = int(os.getenv("NEAR_DUP_MAX_HISTORY", "50000"))
+NEAR_DUP_HISTORY_SECONDS = int(os.getenv("NEAR_DUP_HISTORY_SECONDS", str(30 * 24 * 3600)))
+# How often a process trims the shared table and picks up entries other processes added
+NEAR_DUP_REFRESH_SECONDS = float(os.getenv("NEAR_DUP_REFRESH_SECONDS", "30"))
+
+# Per-item run checkpoints, so a batch interrupted by a crash or deploy resumes without re-analyzing
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+CHECKPOINT_MAX_AGE_SECONDS = int(os.getenv("CHECKPOINT_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+# Name this service instance keeps across restarts; interrupted runs are resumed by the same name
+INSTANCE_NAME = os.getenv("AI_SERVICE_INSTANCE") or socket.gethostname()
+
+# Learned pre-filter (app/prefilter.py): default confidence for `train`, and the holdout precision a model needs to be used
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "true").lower() == "true"
+PREFILTER_REJECT_CONFIDENCE = float(os.getenv("PREFILTER_REJECT_CONFIDENCE", "0.97"))
+PREFILTER_MIN_PRECISION = float(os.getenv("PREFILTER_MIN_PRECISION", "0.98"))
+
+# Background analysis jobs: graph runs executing at once, and how many may wait behind them
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "10"))
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "100"))
+
+# worker.py: batch size bounds, the batch duration it sizes for, and the longest empty-queue backoff
+WORKER_MIN_BATCH = int(os.getenv("WORKER_MIN_BATCH", "5"))
+WORKER_MAX_BATCH = int(os.getenv("WORKER_MAX_BATCH", "200"))
+WORKER_TARGET_BATCH_SECONDS = float(os.getenv("WORKER_TARGET_BATCH_SECONDS", "60"))
+WORKER_IDLE_MAX_SECONDS = float(os.getenv("WORKER_IDLE_MAX_SECONDS", "60"))
 
-# Allow passing keys via creating the client if needed, but for now global is fine
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("SUPABASE_URL or SUPABASE_KEY (SUPABASE_ANON_KEY) is not set in .env")
+# Rows claimed per claim_pending_content call; larger batches are fetched page by page
+FETCH_PAGE_SIZE = int(os.getenv("FETCH_PAGE_SIZE", "50"))
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Queue scheduling (app/scheduling.py): "priority" claims the freshest, most promising rows first, "fifo" the oldest
+SCHEDULING_MODE = os.getenv("SCHEDULING_MODE", "priority")
+SCHEDULING_HALF_LIFE_HOURS = float(os.getenv("SCHEDULING_HALF_LIFE_HOURS", "12"))
+SCHEDULING_MAX_WAIT_HOURS = float(os.getenv("SCHEDULING_MAX_WAIT_HOURS", "48")) # Starvation guard
+SOURCE_PRIORITY = json.loads(os.getenv("SOURCE_PRIORITY") or "{}") # e.g. {"techcrunch": 2, "automation": 3}
+SCHEDULING_LEARN_SOURCES = os.getenv("SCHEDULING_LEARN_SOURCES", "true").lower() == "true"
+SCHEDULING_HISTORY_DAYS = int(os.getenv("SCHEDULING_HISTORY_DAYS", "30"))
+SCHEDULING_REFRESH_SECONDS = float(os.getenv("SCHEDULING_REFRESH_SECONDS", "900"))
 
-def get_llm():
+# Streaming pipeline: bound on items buffered between stages, and rows claimed per fetch
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "20"))
+STREAM_FETCH_CHUNK = int(os.getenv("STREAM_FETCH_CHUNK", "10"))
+
+# Rows per save_analysis_batch RPC call
+SAVE_CHUNK_SIZE = int(os.getenv("SAVE_CHUNK_SIZE", "100"))
+
+# Keep-alive pool for Groq calls, shared by every batch in the process
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+GROQ_KEEPALIVE_SECONDS = float(os.getenv("GROQ_KEEPALIVE_SECONDS", "60"))
+
+# Created on first use (or swapped in via use_clients), so importing the app needs no credentials
+_supabase: Optional["Client"] = None
+_llm_factory: Optional[Callable[..., "BaseChatModel"]] = None
+_llms: Dict[str, "BaseChatModel"] = {} # One client per model, reused across batches
+_prefilter: Optional["Prefilter"] = None
+_clients_lock = threading.Lock()
+
+# Shared by all batches (and, with RATE_LIMIT_SHARED, all processes) so concurrent jobs respect one Groq budget
+groq_limiter = open_rate_limiter(DATA_DIR, "analysis", GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, RATE_LIMIT_SHARED)
+triage_limiter = open_rate_limiter( # Groq limits are per model
+    DATA_DIR, "triage", TRIAGE_REQUESTS_PER_MINUTE, TRIAGE_TOKENS_PER_MINUTE, RATE_LIMIT_SHARED
+)
+groq_breaker = CircuitBreaker(GROQ_BREAKER_FAILURES, GROQ_BREAKER_RESET_SECONDS)
+
+analysis_cache = open_analysis_cache(DATA_DIR, ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_MAX_ENTRIES) \
+    if ANALYSIS_CACHE_ENABLED else None
+
+near_dup_index = open_near_duplicate_index(
+    DATA_DIR, NEAR_DUP_MAX_HISTORY, NEAR_DUP_HISTORY_SECONDS, NEAR_DUP_REFRESH_SECONDS
+) if NEAR_DUP_ENABLED else None
+
+run_checkpoint = open_run_checkpoint(DATA_DIR, CHECKPOINT_MAX_AGE_SECONDS, INSTANCE_NAME) if CHECKPOINT_ENABLED else None
+
+job_store = open_job_store(DATA_DIR, JOB_HISTORY_LIMIT)
+
+def get_supabase() -> "Client":
+    """
+    The process-wide Supabase client. Its HTTP session (and keep-alive
+    connections) is reused by every request.
+    """
+    global _supabase
+    if _supabase is None:
+        with _clients_lock:
+            if _supabase is None:
+                if not SUPABASE_URL or not SUPABASE_KEY:
+                    raise ValueError("SUPABASE_URL or SUPABASE_KEY (SUPABASE_ANON_KEY) is not set in .env")
+                from supabase import create_client
+                _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+def use_clients(supabase_client=None, llm_factory: Optional[Callable[..., "BaseChatModel"]] = None):
+    """
+    Swaps in alternative Supabase / chat model implementations, e.g. the local
+    stand-ins used by the benchmark suite.
+    """
+    global _supabase, _llm_factory
+    if supabase_client is not None:
+        _supabase = supabase_client
+    if llm_factory is not None:
+        _llm_factory = llm_factory
+        _llms.clear()
+
+def get_llm(model: Optional[str] = None) -> "BaseChatModel":
+    """
+    The chat model client for `model` (default GROQ_MODEL), created once and
+    reused, with a shared keep-alive connection pool.
+    """
+    model = model or GROQ_MODEL
+    if model not in _llms:
+        with _clients_lock:
+            if model not in _llms:
+                _llms[model] = _llm_factory() if _llm_factory else _create_groq_llm(model)
+    return _llms[model]
+
+def _create_groq_llm(model: str) -> "BaseChatModel":
     if not GROQ_API_KEY:
         raise ValueError("GROQ_API_KEY is not set")
+    import httpx
+    from langchain_groq import ChatGroq
+    limits = httpx.Limits(
+        max_connections=GROQ_MAX_CONNECTIONS,
+        max_keepalive_connections=GROQ_MAX_CONNECTIONS,
+        keepalive_expiry=GROQ_KEEPALIVE_SECONDS
+    )
     return ChatGroq(
         temperature=0.2, 
-        model_name="llama-3.3-70b-versatile", 
-        api_key=GROQ_API_KEY
+        model_name=model, 
+        api_key=GROQ_API_KEY,
+        max_retries=0, # Retries are handled by _call_llm in app/nodes.py
+        http_client=httpx.Client(limits=limits),
+        http_async_client=httpx.AsyncClient(limits=limits) # Used on app.runtime's long-lived loop
     )
+
+def get_prefilter() -> Optional["Prefilter"]:
+    """
+    The learned pre-filter, or None when disabled. Inactive until
+    `python -m app.prefilter train` has produced a model.
+    """
+    global _prefilter
+    if _prefilter is None and PREFILTER_ENABLED:
+        with _clients_lock:
+            if _prefilter is None:
+                from app.prefilter import open_prefilter # NumPy is only needed once a batch runs
+                _prefilter = open_prefilter(DATA_DIR, PREFILTER_MIN_PRECISION)
+    return _prefilter
+
+def get_worker_id() -> str:
+    """
+    Identifies this process when claiming rows. Resolved per call, so it stays
+    correct in workers forked after import (gunicorn).
+    """
+    return os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
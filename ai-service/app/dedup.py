@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+
+# MinHash signature = NUM_PERM values, split into BANDS bands of ROWS rows for LSH.
+# With 8x4, pairs at Jaccard 0.8 become candidates ~98% of the time, pairs at 0.3 ~6%.
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1337) # Fixed seed: signatures must be stable across restarts
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+def shingle_hashes(text: str) -> set:
+    """
+    64-bit hashes of the word SHINGLE_SIZE-grams of `text`.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") for g in grams}
+
+def minhash_signature(text: str) -> List[int]:
+    """
+    MinHash signature of the text's shingle set (empty list for empty text).
+    """
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return []
+    return [min((a * x + b) % _PRIME for x in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS]
+
+def estimate_similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity: the fraction of matching signature slots."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+def _band_keys(signature) -> List[int]:
+    return [hash((band, tuple(signature[band * ROWS:(band + 1) * ROWS]))) for band in range(BANDS)]
+
+class NearDuplicateIndex:
+    """
+    LSH index over MinHash signatures. Lookups touch BANDS buckets, so cost stays
+    flat as history grows. With a `path`, entries are persisted to SQLite together
+    with their analysis. The newest `max_entries` within `max_age_seconds` are
+    loaded on first use, and every `refresh_seconds` the table is trimmed to the
+    same limits and rows written since by other processes are picked up.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 50000, max_age_seconds: int = 30 * 24 * 3600,
+                 refresh_seconds: float = 30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.refresh_seconds = refresh_seconds
+        self._signatures: "OrderedDict[str, array]" = OrderedDict() # content_id -> signature, oldest first
+        self._buckets: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._last_rowid = 0 # Newest persisted row already in memory
+        self._next_refresh = 0.0 if path else float("inf")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS near_dup_signatures (
+                content_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                analysis TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS near_dup_created_idx ON near_dup_signatures (created_at)")
+        return conn
+
+    def _refresh(self):
+        """Trims the table and loads rows added since the last refresh. Caller holds `_lock`."""
+        if time.monotonic() < self._next_refresh:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM near_dup_signatures WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+            conn.execute("""
+                DELETE FROM near_dup_signatures WHERE rowid <= (
+                    SELECT rowid FROM near_dup_signatures ORDER BY rowid DESC LIMIT 1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            conn.commit()
+            # rowid, not created_at: it is assigned under SQLite's write lock, so it follows commit order
+            rows = conn.execute(
+                "SELECT rowid, content_id, signature FROM near_dup_signatures WHERE rowid > ? ORDER BY rowid DESC LIMIT ?",
+                (self._last_rowid, self.max_entries)
+            ).fetchall()
+        finally:
+            conn.close()
+        for rowid, content_id, blob in reversed(rows):
+            signature = array("I")
+            signature.frombytes(blob)
+            self._insert(content_id, signature)
+        if rows:
+            if not self._last_rowid:
+                print(f"Near-duplicate index loaded {len(rows)} signatures.")
+            self._last_rowid = rows[0][0]
+        self._next_refresh = time.monotonic() + self.refresh_seconds
+
+    def _insert(self, content_id: str, signature: array):
+        if content_id in self._signatures:
+            return
+        self._signatures[content_id] = signature
+        for key in _band_keys(signature):
+            self._buckets.setdefault(key, []).append(content_id)
+        while len(self._signatures) > self.max_entries:
+            old_id, old_signature = self._signatures.popitem(last=False)
+            for key in _band_keys(old_signature):
+                bucket = self._buckets.get(key)
+                if bucket:
+                    bucket.remove(old_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def query(self, signature: List[int], threshold: float) -> Optional[Tuple[str, float]]:
+        """
+        Returns (content_id, similarity) of the most similar indexed item at or
+        above `threshold`, or None.
+        """
+        if not signature:
+            return None
+        with self._lock:
+            self._refresh()
+            candidates = set()
+            for key in _band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            best = None
+            for content_id in candidates:
+                similarity = estimate_similarity(signature, self._signatures[content_id])
+                if similarity >= threshold and (best is None or similarity > best[1]):
+                    best = (content_id, similarity)
+            return best
+
+    def add(self, content_id: str, signature: List[int], analysis: Optional[Dict[str, Any]] = None):
+        if not signature:
+            return
+        packed = array("I", signature)
+        with self._lock:
+            self._refresh()
+            self._insert(content_id, packed)
+        if self.path:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO near_dup_signatures (content_id, signature, analysis, created_at) VALUES (?, ?, ?, ?)",
+                    (content_id, packed.tobytes(), json.dumps(analysis) if analysis else None, time.time())
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def analysis_for(self, content_id: str) -> Optional[Dict[str, Any]]:
+        """Stored analysis of a persisted entry (kept on disk, not in memory)."""
+        if not self.path:
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT analysis FROM near_dup_signatures WHERE content_id = ?", (content_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row and row[0] else None
+
+def open_near_duplicate_index(data_dir: str, max_entries: int, max_age_seconds: int,
+                              refresh_seconds: float) -> NearDuplicateIndex:
+    os.makedirs(data_dir, exist_ok=True)
+    return NearDuplicateIndex(
+        os.path.join(data_dir, "near_duplicates.sqlite3"), max_entries, max_age_seconds, refresh_seconds
+    )
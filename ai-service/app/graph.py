@@ -1,8 +1,11 @@
 from langgraph.graph import StateGraph, END
 from app.state import GraphState
+from app.metrics import timed_node
 from app.nodes import (
     fetch_content_node,
     validate_content_node,
+    near_duplicate_node,
+    prefilter_node,
     analyze_content_node,
     score_and_decide_node,
     save_results_node
@@ -12,17 +15,21 @@ def create_graph():
     workflow = StateGraph(GraphState)
 
     # Add nodes
-    workflow.add_node("fetch", fetch_content_node)
-    workflow.add_node("validate", validate_content_node)
-    workflow.add_node("analyze", analyze_content_node)
-    workflow.add_node("score", score_and_decide_node)
-    workflow.add_node("save", save_results_node)
+    workflow.add_node("fetch", timed_node("fetch", fetch_content_node))
+    workflow.add_node("validate", timed_node("validate", validate_content_node))
+    workflow.add_node("dedup", timed_node("dedup", near_duplicate_node))
+    workflow.add_node("prefilter", timed_node("prefilter", prefilter_node))
+    workflow.add_node("analyze", timed_node("analyze", analyze_content_node))
+    workflow.add_node("score", timed_node("score", score_and_decide_node))
+    workflow.add_node("save", save_results_node) # Times itself, before logging the batch
 
     # Add edges
     workflow.set_entry_point("fetch")
     
     workflow.add_edge("fetch", "validate")
-    workflow.add_edge("validate", "analyze")
+    workflow.add_edge("validate", "dedup")
+    workflow.add_edge("dedup", "prefilter")
+    workflow.add_edge("prefilter", "analyze")
     workflow.add_edge("analyze", "score")
     workflow.add_edge("score", "save")
     workflow.add_edge("save", END)
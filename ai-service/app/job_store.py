@@ -0,0 +1,93 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from app.schemas import AnalysisJob
+
+class JobStore:
+    """
+    Analysis job records in SQLite, shared by every worker process on the host, so
+    a job can be polled through any of them (e.g. under gunicorn -w 4). Keeps the
+    newest `history_limit` finished jobs.
+    """
+
+    def __init__(self, path: str, history_limit: int):
+        self.path = path
+        self.history_limit = history_limit
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS analysis_jobs (
+                            job_id TEXT PRIMARY KEY,
+                            status TEXT NOT NULL,
+                            record TEXT NOT NULL,
+                            hostname TEXT NOT NULL,
+                            pid INTEGER NOT NULL,
+                            updated_at REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS analysis_jobs_status_idx ON analysis_jobs (status, updated_at)")
+                    conn.commit()
+                    self._initialized = True
+        try:
+            with conn: # Commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def put(self, job: AnalysisJob):
+        """Writes a job record owned by this process."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_jobs (job_id, status, record, hostname, pid, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.status, job.model_dump_json(), socket.gethostname(), os.getpid(), time.time())
+            )
+            if job.status in ("completed", "failed"):
+                conn.execute("""
+                    DELETE FROM analysis_jobs WHERE job_id IN (
+                        SELECT job_id FROM analysis_jobs WHERE status IN ('completed', 'failed')
+                        ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.history_limit,))
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        """
+        The job's last recorded state, for jobs run by other processes. A job whose
+        process on this host has exited (or was a previous incarnation of this one,
+        e.g. in a restarted container) without finishing it is reported as failed.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT record, hostname, pid FROM analysis_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        job = AnalysisJob.model_validate_json(row[0])
+        if job.status in ("queued", "running") and row[1] == socket.gethostname() \
+                and (row[2] == os.getpid() or not _pid_alive(row[2])):
+            job = job.model_copy(update={"status": "failed", "error": "The worker process running this job exited"})
+        return job
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def open_job_store(data_dir: str, history_limit: int) -> JobStore:
+    os.makedirs(data_dir, exist_ok=True)
+    return JobStore(os.path.join(data_dir, "jobs.sqlite3"), history_limit)
@@ -0,0 +1,181 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from app.config import MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS, JOB_HISTORY_LIMIT, run_checkpoint, job_store, get_worker_id
+from app.job_store import JobStore
+from app.state import GRAPH_STAGES
+from app.schemas import AnalysisJob, ProcessingStats
+
+class JobQueueFull(Exception):
+    pass
+
+class JobManager:
+    """
+    Runs analysis graphs in a bounded background thread pool and tracks their
+    per-stage progress for polling. Records are written through to `store`, so
+    jobs started by other worker processes can be polled here too.
+    """
+
+    # Streaming jobs report progress after every save; the shared record is refreshed at most this often
+    PROGRESS_WRITE_SECONDS = 1.0
+
+    def __init__(self, max_concurrent: int, max_queued: int, history_limit: int, store: Optional[JobStore] = None):
+        self.max_active = max_concurrent + max_queued
+        self.history_limit = history_limit
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="analysis-job")
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _active_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+
+    def submit(self, batch_size: int, mode: str = "batch", resume_from: Optional[Dict[str, Any]] = None) -> AnalysisJob:
+        # A resumed run keeps its batch id, which is also its checkpoint key
+        job_id = resume_from["batch_id"] if resume_from else str(uuid.uuid4())
+        with self._lock:
+            if self._active_count() >= self.max_active:
+                raise JobQueueFull(f"{self.max_active} analysis jobs already queued or running")
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "stages": {stage: "pending" for stage in GRAPH_STAGES},
+                "items": 0,
+                "stats": None,
+                "error": None,
+                "created_at": datetime.now(),
+                "finished_at": None
+            }
+            self._prune()
+        self._persist(job_id)
+        if mode == "stream":
+            self._executor.submit(self._run_streaming, job_id, batch_size)
+        else:
+            self._executor.submit(self._run, job_id, batch_size, resume_from)
+        return self.get(job_id)
+
+    def resume_interrupted(self) -> List[AnalysisJob]:
+        """
+        Queues a graph run for every batch a dead process on this host left
+        unfinished. Analyses it had completed are restored, not recomputed.
+        """
+        if not run_checkpoint:
+            return []
+        jobs = []
+        for run in run_checkpoint.interrupted_runs():
+            if not run_checkpoint.take_over(run, get_worker_id()):
+                continue # Another process got it first
+            if not run["content_ids"]:
+                run_checkpoint.finish_run(run["batch_id"])
+                continue
+            try:
+                jobs.append(self.submit(len(run["content_ids"]), resume_from=run))
+            except JobQueueFull:
+                # Its rows return to the queue when their lease expires; analyses stay checkpointed
+                print(f"Job queue full, not resuming batch {run['batch_id']}")
+                break
+        return jobs
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return AnalysisJob(**job)
+        if self.store:
+            try:
+                return self.store.get(job_id) # Started by another worker process
+            except Exception as e:
+                print(f"Job store read failed: {e}")
+        return None
+
+    def _prune(self):
+        finished = [jid for jid, job in self._jobs.items() if job["status"] in ("completed", "failed")]
+        for jid in finished[:max(0, len(finished) - self.history_limit)]:
+            del self._jobs[jid]
+
+    def _update(self, job_id: str, persist: bool = True, **changes):
+        with self._lock:
+            self._jobs[job_id].update(changes)
+        if persist:
+            self._persist(job_id)
+
+    def _persist(self, job_id: str):
+        if not self.store:
+            return
+        with self._lock:
+            job = AnalysisJob(**self._jobs[job_id])
+        try:
+            self.store.put(job)
+        except Exception as e:
+            print(f"Job store write failed: {e}")
+
+    def _run(self, job_id: str, batch_size: int, resume_from: Optional[Dict[str, Any]] = None):
+        from app.graph import app_graph # Imported on first job so the API starts fast
+        initial_state = {
+            "batch_size": batch_size,
+            "batch_id": job_id,
+            "started_at": datetime.now().isoformat(),
+            "resume_from": resume_from,
+            "content_batch": [],
+            "stats": ProcessingStats().model_dump()
+        }
+        stages = {stage: "pending" for stage in GRAPH_STAGES}
+        stages[GRAPH_STAGES[0]] = "running"
+        self._update(job_id, status="running", stages=dict(stages))
+
+        try:
+            final_state = initial_state
+            for update in app_graph.stream(initial_state, stream_mode="updates"):
+                for stage, state in update.items():
+                    final_state = state
+                    stages[stage] = "completed"
+                    next_index = GRAPH_STAGES.index(stage) + 1
+                    if next_index < len(GRAPH_STAGES):
+                        stages[GRAPH_STAGES[next_index]] = "running"
+                self._update(
+                    job_id,
+                    stages=dict(stages),
+                    items=len(final_state.get("content_batch") or []),
+                    stats=final_state.get("stats")
+                )
+            self._update(job_id, status="completed", finished_at=datetime.now())
+
+        except Exception as e:
+            print(f"Analysis job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e), finished_at=datetime.now())
+
+    def _run_streaming(self, job_id: str, batch_size: int):
+        from app.pipeline import run_streaming_batch
+        from app.runtime import run_async
+        # Every stage is live at once in streaming mode
+        self._update(job_id, status="running", stages={stage: "running" for stage in GRAPH_STAGES})
+
+        last_write = 0.0
+
+        def on_progress(stats, saved):
+            # Called on the event loop: only hit SQLite now and then
+            nonlocal last_write
+            persist = time.monotonic() - last_write >= self.PROGRESS_WRITE_SECONDS
+            if persist:
+                last_write = time.monotonic()
+            self._update(job_id, persist=persist, items=saved, stats=dict(stats))
+
+        try:
+            stats = run_async(run_streaming_batch(batch_size, job_id, on_progress))
+            self._update(
+                job_id,
+                status="completed",
+                stages={stage: "completed" for stage in GRAPH_STAGES},
+                stats=stats,
+                finished_at=datetime.now()
+            )
+
+        except Exception as e:
+            print(f"Analysis job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e), finished_at=datetime.now())
+
+job_manager = JobManager(MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS, JOB_HISTORY_LIMIT, job_store)
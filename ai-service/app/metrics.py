@@ -0,0 +1,101 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Any
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import Counter, Histogram
+
+STAGE_SECONDS = Histogram(
+    "ai_stage_duration_seconds", "Wall-clock time of one graph stage over a batch", ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+BATCH_SECONDS = Histogram(
+    "ai_batch_duration_seconds", "Wall-clock time of one analysis batch",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+LLM_CALL_SECONDS = Histogram(
+    "ai_llm_call_duration_seconds", "Latency of one Groq analysis call",
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+LLM_TOKENS = Counter("ai_llm_tokens_total", "Groq tokens used by analysis calls", ["kind"])
+OUTPUT_REPAIRS = Counter("ai_analysis_output_repairs_total", "Defects in LLM output fixed locally instead of re-asking", ["fix"])
+
+class UsageCollector(BaseCallbackHandler):
+    """
+    Captures prompt/completion token counts reported by the chat model.
+    """
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+                    return
+        # Older integrations only report usage in llm_output
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        self.prompt_tokens += token_usage.get("prompt_tokens", 0)
+        self.completion_tokens += token_usage.get("completion_tokens", 0)
+
+def record_llm_call(stats: Dict[str, Any], seconds: float, usage: UsageCollector):
+    latency_ms = int(seconds * 1000)
+    stats["llm_calls"] += 1
+    stats["llm_latency_ms_total"] += latency_ms
+    stats["llm_latency_ms_max"] = max(stats["llm_latency_ms_max"], latency_ms)
+    stats["prompt_tokens"] += usage.prompt_tokens
+    stats["completion_tokens"] += usage.completion_tokens
+    LLM_CALL_SECONDS.observe(seconds)
+    LLM_TOKENS.labels("prompt").inc(usage.prompt_tokens)
+    LLM_TOKENS.labels("completion").inc(usage.completion_tokens)
+
+def add_stage_time(stats: Dict[str, Any], stage: str, seconds: float):
+    timings = stats.setdefault("stage_timings_ms", {})
+    timings[stage] = timings.get(stage, 0) + int(seconds * 1000)
+
+def observe_stage_timings(stats: Dict[str, Any]):
+    """
+    Records a finished batch's summed stage timings in the ai_stage_duration_seconds
+    histogram, for runs that time stages piecemeal rather than through stage_timer.
+    """
+    for stage, ms in stats.get("stage_timings_ms", {}).items():
+        STAGE_SECONDS.labels(stage).observe(ms / 1000)
+
+def merge_stats(stats: Dict[str, Any], delta: Dict[str, Any]):
+    """Adds the counters and stage timings of `delta` (a ProcessingStats dict) into `stats`."""
+    for key, value in delta.items():
+        if key == "stage_timings_ms":
+            for stage, ms in value.items():
+                stats[key][stage] = stats[key].get(stage, 0) + ms
+        elif key.endswith("_max"):
+            stats[key] = max(stats[key], value)
+        else:
+            stats[key] += value
+
+@contextmanager
+def stage_timer(stats: Dict[str, Any], stage: str):
+    """
+    Records the wall-clock time of the enclosed block in stats.stage_timings_ms
+    and the ai_stage_duration_seconds histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        add_stage_time(stats, stage, elapsed)
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+
+def timed_node(stage: str, node):
+    """
+    Wraps a graph node so its wall-clock time is recorded by stage_timer.
+    """
+    @wraps(node)
+    def wrapper(state):
+        with stage_timer(state["stats"], stage):
+            return node(state)
+    return wrapper
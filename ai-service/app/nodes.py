@@ -1,58 +1,795 @@
+import asyncio
+import hashlib
 import json
+import random
 import uuid
-import re
+import time
+from contextvars import ContextVar
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from app.config import supabase, get_llm
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from app.config import (
+    get_supabase, get_llm, get_worker_id, groq_limiter, triage_limiter, groq_breaker,
+    analysis_cache, near_dup_index, run_checkpoint, get_prefilter,
+    ANALYSIS_CONCURRENCY, CONTENT_LEASE_SECONDS, FETCH_PAGE_SIZE, GROQ_MODEL,
+    CASCADE_ENABLED, TRIAGE_MODEL, CASCADE_MARGIN,
+    GROQ_MAX_ATTEMPTS, GROQ_RETRY_BUDGET_SECONDS, GROQ_MAX_ITEM_RETRIES, ANALYSIS_JSON_MODE, ANALYSIS_MAX_REASKS,
+    ANALYSIS_PACK_TOKEN_BUDGET, ANALYSIS_PACK_MAX_ITEMS, ANALYSIS_TOKEN_BUDGET,
+    NEAR_DUP_MODE, NEAR_DUP_THRESHOLD, SCHEDULING_MODE
+)
 from app.state import GraphState, ContentItem
 from app.schemas import AIAnalysisResult
-from app.scoring import calculate_final_score, make_decision
+from app.scoring import calculate_final_score, make_decision, is_near_threshold
+from app.rate_limit import estimate_tokens
+from app.text import extract_main_text, compress_to_budget, count_tokens
+from app.persistence import build_save_row, save_batch
+from app.cache import AnalysisCache
+from app.dedup import NearDuplicateIndex, minhash_signature
+from app.resilience import (
+    CircuitOpenError, RetriesExhausted, RetryBudget,
+    is_transient, retry_after_seconds, backoff_seconds
+)
+from app.structured import AnalysisParseError, coerce_analysis, parse_analysis, parse_packed, failed_generation
+from app.metrics import UsageCollector, record_llm_call, stage_timer, BATCH_SECONDS, OUTPUT_REPAIRS
+from app.runtime import run_async
+from app.scheduling import priority_claim_params
 
-# --- Node Implementation ---
+# Prompt scaffolding + expected completion, on top of the content itself
+PROMPT_OVERHEAD_TOKENS = 600
 
-def fetch_content_node(state: GraphState) -> GraphState:
+ANALYSIS_PROMPT_MESSAGES = [
+    ("system", "You are an expert content strategist for a tech/business brand. Verify constraint: Output valid JSON only."),
+    ("user", """Analyze the following content for strategic value.
+    
+    Content: {content}
+    
+    Return a JSON object with:
+    - category: one of [technology, startup, ai, business, marketing, other]
+    - content_quality_score: 0-100
+    - engagement_score: 0-100
+    - virality_probability: 0-100
+    - recommended_platforms: list of strings
+    - content_type_recommendation: string
+    - reasoning: string explanation
+    - rewrite_needed: boolean
+    
+    {format_instructions}
+    """)
+]
+
+# Packed mode: several short items per call, answered as one JSON object holding an array
+PACKED_PROMPT_MESSAGES = [
+    ("system", "You are an expert content strategist for a tech/business brand. Verify constraint: Output valid JSON only."),
+    ("user", """Analyze each of the following {count} content items for strategic value.
+    
+    {items}
+    
+    Return a JSON object whose "items" array has exactly one object per item, each with:
+    - item: the item number
+    - category: one of [technology, startup, ai, business, marketing, other]
+    - content_quality_score: 0-100
+    - engagement_score: 0-100
+    - virality_probability: 0-100
+    - recommended_platforms: list of strings
+    - content_type_recommendation: string
+    - reasoning: string explanation
+    - rewrite_needed: boolean
+    
+    Return ONLY the JSON object.
+    """)
+]
+
+# Expected completion tokens per item in a pack, on top of its content
+PACK_ITEM_OVERHEAD_TOKENS = 200
+
+# Part of the analysis cache key: editing the prompt invalidates cached results
+PROMPT_VERSION = hashlib.sha256(json.dumps(ANALYSIS_PROMPT_MESSAGES).encode("utf-8")).hexdigest()[:16]
+
+# Per-batch retry time budget, see start_retry_budget
+_retry_budget: ContextVar[Optional[RetryBudget]] = ContextVar("retry_budget", default=None)
+
+# Models that produce a cached result (the cascade's output differs from the full model's alone)
+CACHE_MODEL_TAG = f"{TRIAGE_MODEL}>{GROQ_MODEL}@{CASCADE_MARGIN}" if CASCADE_ENABLED else GROQ_MODEL
+
+# --- Per-item steps (shared by the graph nodes and the streaming pipeline) ---
+
+def claim_pending_items(limit: int, after: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
-    Fetches pending content from Supabase.
+    Claims up to `limit` pending content_queue rows for this worker: by
+    priority (app/scheduling.py) when SCHEDULING_MODE is "priority", else oldest
+    first. Rows are atomically moved to 'processing' under this worker's lease, so
+    concurrent workers never fetch the same items. Expired leases are reclaimed.
+    Only id, raw_content, summary, source_url and created_at come back; in fifo
+    mode `after` (a previously returned row) continues past it on (created_at, id).
     """
-    batch_size = state["batch_size"]
-    print(f"Fetching {batch_size} pending items...")
+    params = {
+        "p_worker_id": get_worker_id(),
+        "p_limit": limit,
+        "p_lease_seconds": CONTENT_LEASE_SECONDS
+    }
+    if SCHEDULING_MODE == "priority":
+        response = get_supabase().rpc("claim_prioritized_content", {**params, **priority_claim_params()}).execute()
+        return response.data or []
+    response = get_supabase().rpc("claim_pending_content", {
+        **params,
+        "p_after_created_at": after["created_at"] if after else None,
+        "p_after_id": after["id"] if after else None
+    }).execute()
+    return response.data or []
+
+def iter_claimed_pages(limit: int, page_size: int = FETCH_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Claims up to `limit` rows a page at a time (keyset-paginated in fifo mode),
+    so a large batch never needs one huge response and the caller can start on
+    early pages.
+    """
+    after = None
+    remaining = limit
+    while remaining > 0:
+        rows = claim_pending_items(min(page_size, remaining), after)
+        if not rows:
+            return
+        yield rows
+        remaining -= len(rows)
+        after = rows[-1]
+
+def reclaim_items(run: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Takes over the rows of an interrupted run that are still 'processing' under
+    its previous worker id, with a fresh lease.
+    """
+    response = get_supabase().rpc("reclaim_content", {
+        "p_worker_id": get_worker_id(),
+        "p_previous_worker_id": run["worker_id"],
+        "p_ids": run["content_ids"],
+        "p_lease_seconds": CONTENT_LEASE_SECONDS
+    }).execute()
+    return response.data or []
+
+def extend_leases(content_ids: List[str]) -> List[str]:
+    """
+    Renews this worker's lease on rows it still holds. Returns the ids renewed.
+    """
+    response = get_supabase().rpc("extend_content_lease", {
+        "p_worker_id": get_worker_id(),
+        "p_ids": content_ids,
+        "p_lease_seconds": CONTENT_LEASE_SECONDS
+    }).execute()
+    return [row["id"] for row in response.data or []]
+
+async def keep_leases(content_ids: Callable[[], Iterable[str]]):
+    """
+    Renews the leases of `content_ids()` every third of CONTENT_LEASE_SECONDS until
+    cancelled, so a batch slowed by rate limits and retries keeps its rows instead
+    of having them reclaimed and analyzed again by another worker.
+    """
+    while True:
+        await asyncio.sleep(CONTENT_LEASE_SECONDS / 3)
+        ids = list(content_ids())
+        if not ids:
+            continue
+        try:
+            renewed = await asyncio.to_thread(extend_leases, ids)
+        except Exception as e:
+            print(f"Lease renewal failed: {e}")
+            continue
+        if len(renewed) < len(ids):
+            print(f"Lost the lease on {len(ids) - len(renewed)} items; their saves will be skipped.")
+
+async def _with_leases(content_ids: List[str], work):
+    """Awaits `work` while keeping the leases of `content_ids`."""
+    keeper = asyncio.create_task(keep_leases(lambda: content_ids))
+    try:
+        return await work
+    finally:
+        keeper.cancel()
+
+def checkpoint_claimed(batch_id: str, items: List[ContentItem], stats: Dict[str, Any]):
+    """
+    Registers claimed items with the run checkpoint and restores analyses that an
+    interrupted run already paid for.
+    """
+    if not run_checkpoint or not items:
+        return
+    try:
+        run_checkpoint.start_run(batch_id, get_worker_id(), [item["id"] for item in items])
+        completed = run_checkpoint.completed([item["id"] for item in items])
+    except Exception as e:
+        print(f"Run checkpoint write failed: {e}")
+        return
+    for item in items:
+        if item["id"] in completed:
+            item["analysis"] = completed[item["id"]]
+            stats["processed"] += 1
+            stats["resumed"] += 1
+    if completed:
+        print(f"Restored {len(completed)} analyses from an interrupted run.")
+
+def new_content_item(row: Dict[str, Any]) -> ContentItem:
+    return {
+        "id": row["id"],
+        "raw_content": row.get("raw_content") or row.get("summary") or "",
+        "source_url": row.get("source_url") or "",
+        "is_valid": True,
+        "validation_error": "",
+        "analysis": None,
+        "final_score": 0.0,
+        "decision": "pending",
+        "decision_reason": "",
+        "retry_count": row.get("ai_retry_count") or 0, # Accumulated across runs
+        "duplicate_of": "",
+        "near_dup_signature": [],
+        "prompt_content": ""
+    }
+
+def validate_item(item: ContentItem, stats: Dict[str, Any]):
+    # Cleaning: main article text only (no nav, share widgets...), whitespace normalized
+    text = extract_main_text(item["raw_content"])
+    item["raw_content"] = text
+    
+    # Validation Rules
+    if len(text) < 50: # Reduced from 150 for testing, prompt said 150
+        item["is_valid"] = False
+        item["validation_error"] = "Content too short (<50 chars)"
+        item["decision"] = "rejected"
+        item["decision_reason"] = "Validation Failed: Too short"
+        stats["rejected"] += 1
+        return
+    # Add more rules here (language detection etc if needed)
+    
+    # What the LLM sees: the most informative sentences within the token budget
+    item["prompt_content"] = compress_to_budget(text, ANALYSIS_TOKEN_BUDGET)
+
+def check_near_duplicate(item: ContentItem, stats: Dict[str, Any], batch_index: Optional[NearDuplicateIndex] = None):
+    """
+    Matches the item against `batch_index` (if given) and the persistent history index.
+    History matches inherit the stored analysis; in-batch matches are resolved by
+    inherit_batch_duplicates once their original has been analyzed.
+    """
+    if not item["is_valid"] or not near_dup_index:
+        return
+    signature = minhash_signature(item["raw_content"])
+    item["near_dup_signature"] = signature
+    
+    original_analysis = None
+    match = batch_index.query(signature, NEAR_DUP_THRESHOLD) if batch_index else None
+    if not match:
+        match = near_dup_index.query(signature, NEAR_DUP_THRESHOLD)
+        if match:
+            original_analysis = near_dup_index.analysis_for(match[0])
+            if not original_analysis and NEAR_DUP_MODE == "inherit":
+                match = None # Nothing to inherit, analyze it normally
+    if not match:
+        if batch_index:
+            batch_index.add(item["id"], signature)
+        return
+    
+    original_id, similarity = match
+    print(f"Item {item['id']} is a near-duplicate of {original_id} ({similarity:.2f})")
+    item["duplicate_of"] = original_id
+    stats["near_duplicates"] += 1
+    
+    if NEAR_DUP_MODE == "reject":
+        item["is_valid"] = False
+        item["decision"] = "rejected"
+        item["decision_reason"] = f"Near-duplicate of {original_id}"
+        stats["rejected"] += 1
+    elif original_analysis:
+        item["analysis"] = original_analysis
+
+def prefilter_item(item: ContentItem, stats: Dict[str, Any]):
+    """
+    Rejects the item without an LLM call if the local pre-filter is confident it
+    would be rejected anyway.
+    """
+    prefilter = get_prefilter()
+    if not prefilter or not item["is_valid"] or item["analysis"] or item["duplicate_of"]:
+        return
+    try:
+        probability = prefilter.confident_reject(item["raw_content"])
+    except Exception as e:
+        print(f"Pre-filter failed: {e}")
+        return
+    if probability is None:
+        return
+    item["is_valid"] = False
+    item["decision"] = "rejected"
+    item["decision_reason"] = f"Pre-filter: predicted reject (p={probability:.2f})"
+    stats["rejected"] += 1
+    stats["prefiltered"] += 1
+
+# Built chains by (kind, model), reused while get_llm returns the same client
+_chains: Dict[tuple, tuple] = {}
+_format_instructions: Optional[str] = None
+
+def _cached_chain(kind: str, model: Optional[str], build):
+    llm = get_llm(model)
+    cached = _chains.get((kind, model))
+    if cached is None or cached[0] is not llm:
+        # JSON mode: the provider guarantees syntactically valid JSON, so repair is rarely needed
+        json_llm = _with_failed_generation(llm.bind(response_format={"type": "json_object"})) if ANALYSIS_JSON_MODE else llm
+        cached = _chains[(kind, model)] = (llm, build(json_llm))
+    return cached[1]
+
+def _with_failed_generation(json_llm):
+    """
+    In JSON mode Groq rejects invalid output with a 400 json_validate_failed
+    instead of returning it. This hands the rejected output to the parser as if
+    it had been returned, so local repair (or else a re-ask) still applies.
+    """
+    def recover(error: Exception) -> AIMessage:
+        text = failed_generation(error)
+        if text is None:
+            raise error
+        OUTPUT_REPAIRS.labels(fix="json_validate_failed").inc()
+        return AIMessage(content=text)
+
+    def invoke(messages, config):
+        try:
+            return json_llm.invoke(messages, config)
+        except Exception as e:
+            return recover(e)
+
+    async def ainvoke(messages, config):
+        try:
+            return await json_llm.ainvoke(messages, config)
+        except Exception as e:
+            return recover(e)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+def build_analysis_chain(model: Optional[str] = None):
+    """
+    Returns the (prompt | llm | parser) chain and its format instructions. The
+    parser repairs and coerces the output into a valid AIAnalysisResult dict in
+    one pass. Chains are built once per model and shared by every batch.
+    """
+    global _format_instructions
+    if _format_instructions is None:
+        _format_instructions = JsonOutputParser(pydantic_object=AIAnalysisResult).get_format_instructions()
+    chain = _cached_chain(
+        "analysis", model,
+        lambda llm: ChatPromptTemplate.from_messages(ANALYSIS_PROMPT_MESSAGES) | llm | RunnableLambda(parse_analysis)
+    )
+    return chain, _format_instructions
+
+def _read_cached_analysis(item: ContentItem) -> Optional[Dict[str, Any]]:
+    try:
+        return analysis_cache.get(AnalysisCache.make_key(item["prompt_content"], PROMPT_VERSION, CACHE_MODEL_TAG))
+    except Exception as e:
+        print(f"Analysis cache read failed: {e}")
+        return None
+
+def _use_cached_analysis(item: ContentItem, cached: Optional[Dict[str, Any]], stats: Dict[str, Any]) -> bool:
+    stats["cache_hits" if cached else "cache_misses"] += 1
+    if cached:
+        item["analysis"] = cached
+        stats["processed"] += 1
+    return bool(cached)
+
+def load_cached_analysis(item: ContentItem, stats: Dict[str, Any]) -> bool:
+    """
+    Fills item["analysis"] from the analysis cache. Returns True on a hit.
+    """
+    if not analysis_cache:
+        return False
+    return _use_cached_analysis(item, _read_cached_analysis(item), stats)
+
+async def aload_cached_analysis(item: ContentItem, stats: Dict[str, Any]) -> bool:
+    """
+    load_cached_analysis for coroutines: the SQLite read runs in a worker thread,
+    stats are updated back on the event loop.
+    """
+    if not analysis_cache:
+        return False
+    return _use_cached_analysis(item, await asyncio.to_thread(_read_cached_analysis, item), stats)
+
+def _persist_analysis(item: ContentItem, result: Dict[str, Any]):
+    """Records a fresh analysis in the run checkpoint and the analysis cache (blocking SQLite writes)."""
+    if run_checkpoint:
+        try:
+            run_checkpoint.record(item["id"], result)
+        except Exception as e:
+            print(f"Run checkpoint write failed: {e}")
+    if analysis_cache:
+        try:
+            analysis_cache.set(AnalysisCache.make_key(item["prompt_content"], PROMPT_VERSION, CACHE_MODEL_TAG), result)
+        except Exception as e:
+            print(f"Analysis cache write failed: {e}")
+
+async def _store_analysis(item: ContentItem, result: Dict[str, Any], stats: Dict[str, Any]):
+    item["analysis"] = result
+    stats["processed"] += 1
+    if run_checkpoint or analysis_cache:
+        await asyncio.to_thread(_persist_analysis, item, result)
+
+def _mark_ai_error(item: ContentItem, error: Exception, stats: Dict[str, Any]):
+    print(f"AI Analysis failed for {item['id']}: {error}")
+    item["is_valid"] = False # Mark invalid to skip scoring
+    item["validation_error"] = f"AI Error: {str(error)}"
+    if isinstance(error, (RetriesExhausted, CircuitOpenError)) and item["retry_count"] < GROQ_MAX_ITEM_RETRIES:
+        # Provider trouble, not the content's fault: hand it back to the queue
+        item["decision"] = "deferred"
+        item["decision_reason"] = f"Deferred: {error}"
+        stats["deferred"] += 1
+    else:
+        item["decision"] = "ai_error" # Special status
+        stats["ai_errors"] += 1
+
+def start_retry_budget():
+    """
+    Starts the retry wait budget for the current batch. Tasks spawned afterwards
+    (asyncio.gather, pipeline stages) share it through the context.
+    """
+    _retry_budget.set(RetryBudget(GROQ_RETRY_BUDGET_SECONDS))
+
+async def _call_llm(chain, inputs: Dict[str, Any], tokens: int, item: ContentItem, stats: Dict[str, Any]):
+    """
+    Calls the full model with retries: honors rate-limit reset headers, otherwise
+    jittered exponential backoff, within GROQ_MAX_ATTEMPTS and the batch's retry
+    budget. The circuit breaker short-circuits calls while Groq keeps failing.
+    """
+    budget = _retry_budget.get() or RetryBudget(GROQ_RETRY_BUDGET_SECONDS)
+    attempt = reasks = 0
+    while True:
+        if not groq_breaker.allow():
+            raise CircuitOpenError("Groq circuit breaker is open")
+        try:
+            await groq_limiter.acquire(tokens)
+            result = await _invoke_llm(chain, inputs, stats)
+        except AnalysisParseError as e:
+            groq_breaker.record_success()
+            if reasks >= ANALYSIS_MAX_REASKS:
+                raise
+            # Only output the local repair couldn't fix gets a second call
+            reasks += 1
+            stats["reasks"] += 1
+            print(f"Unparseable output for {item['id']} ({e}), asking again...")
+            continue
+        except Exception as e:
+            if not is_transient(e):
+                groq_breaker.record_success() # The provider answered; the request was bad
+                raise
+            groq_breaker.record_failure()
+            attempt += 1
+            item["retry_count"] += 1
+            wait = retry_after_seconds(e)
+            if wait is not None:
+                groq_limiter.pause(wait) # The account is out of budget: hold back every caller, not just this one
+            wait = backoff_seconds(attempt) if wait is None else wait + random.uniform(0, 1)
+            if attempt >= GROQ_MAX_ATTEMPTS or wait > budget.remaining():
+                raise RetriesExhausted(f"gave up after {attempt} attempts: {e}") from e
+            print(f"Transient Groq error for {item['id']} ({e}), retrying in {wait:.1f}s...")
+            stats["retries"] += 1
+            budget.spend(wait)
+            await asyncio.sleep(wait)
+            continue
+        except BaseException:
+            # Cancelled (e.g. a failed stream stage): a half-open probe must not hold its slot forever
+            groq_breaker.release_probe()
+            raise
+        groq_breaker.record_success()
+        return result
+
+async def _invoke_llm(chain, inputs: Dict[str, Any], stats: Dict[str, Any]):
+    """
+    Invokes an analysis chain, recording its latency and token usage (failed calls included).
+    """
+    usage = UsageCollector()
+    start = time.perf_counter()
+    try:
+        return await chain.ainvoke(inputs, config={"callbacks": [usage]})
+    finally:
+        record_llm_call(stats, time.perf_counter() - start, usage)
+
+async def analyze_item(
+    chain, format_instructions: str, item: ContentItem, stats: Dict[str, Any],
+    use_cache: bool = True, triage_chain=None
+):
+    """
+    Analyzes one item: analysis cache first, then (with a triage chain) the fast
+    model, then the full model under the shared Groq request/token limiter.
+    Failures mark the item as ai_error.
+    """
+    if use_cache and await aload_cached_analysis(item, stats):
+        return
+    
+    inputs = {
+        "content": item["prompt_content"],
+        "format_instructions": format_instructions
+    }
+    tokens = estimate_tokens(item["prompt_content"] + format_instructions) + PROMPT_OVERHEAD_TOKENS
+    if triage_chain is not None:
+        result = await _triage_item(triage_chain, inputs, tokens, item, stats)
+        if result is not None:
+            await _store_analysis(item, result, stats)
+            return
+    
+    try:
+        print(f"Analyzing item {item['id']}...")
+        result = await _call_llm(chain, inputs, tokens, item, stats)
+    except Exception as e:
+        _mark_ai_error(item, e, stats)
+        return
+    
+    await _store_analysis(item, result, stats)
+
+def build_triage_chain():
+    """
+    The cascade's first-tier chain, or None when the cascade is disabled.
+    """
+    return build_analysis_chain(TRIAGE_MODEL)[0] if CASCADE_ENABLED else None
+
+async def _triage_item(triage_chain, inputs: Dict[str, Any], tokens: int, item: ContentItem, stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Runs the triage model. Returns its analysis when the resulting score is clear of
+    every decision threshold, or None when the item must be escalated.
+    """
+    try:
+        await triage_limiter.acquire(tokens)
+        result = await _invoke_llm(triage_chain, inputs, stats)
+        final_score = calculate_final_score(AIAnalysisResult(**result))
+        if not is_near_threshold(final_score, CASCADE_MARGIN):
+            stats["triaged"] += 1
+            return result
+        print(f"Escalating item {item['id']} (triage score {final_score})")
+    except Exception as e:
+        print(f"Triage failed for {item['id']}, escalating: {e}")
+    stats["escalated"] += 1
+    return None
+
+def build_packed_chain():
+    """
+    Returns the (prompt | llm | parser) chain that analyzes several items per call.
+    """
+    return _cached_chain(
+        "packed", None,
+        lambda llm: ChatPromptTemplate.from_messages(PACKED_PROMPT_MESSAGES) | llm | RunnableLambda(parse_packed)
+    )
+
+def plan_packs(items: List[ContentItem]) -> List[List[ContentItem]]:
+    """
+    Greedily groups short items into packs whose content fits ANALYSIS_PACK_TOKEN_BUDGET
+    (at most ANALYSIS_PACK_MAX_ITEMS each). Items too large to share a call get their own pack.
+    """
+    packs, current, current_tokens = [], [], 0
+    for item in items:
+        tokens = count_tokens(item["prompt_content"]) + PACK_ITEM_OVERHEAD_TOKENS
+        if tokens * 2 > ANALYSIS_PACK_TOKEN_BUDGET:
+            packs.append([item])
+            continue
+        if current and (current_tokens + tokens > ANALYSIS_PACK_TOKEN_BUDGET or len(current) >= ANALYSIS_PACK_MAX_ITEMS):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+async def analyze_pack(packed_chain, chain, format_instructions: str, items: List[ContentItem], stats: Dict[str, Any]):
+    """
+    Analyzes a pack of items in one call. If the returned array is malformed or
+    partial, the unanswered items are retried as a smaller pack (halved when nothing
+    came back); single items fall back to the one-item chain. When Groq itself is
+    out of retries or the circuit is open, the whole pack is deferred instead.
+    """
+    if len(items) == 1:
+        await analyze_item(chain, format_instructions, items[0], stats, use_cache=False)
+        return
     
+    rendered = "\n\n".join(
+        f"[ITEM {n}]\n{item['prompt_content']}\n[/ITEM {n}]" for n, item in enumerate(items, start=1)
+    )
+    results = {}
+    retries_before = items[0]["retry_count"]
     try:
-        # Fetch pending content
-        response = supabase.table("content_queue") \
-            .select("*") \
-            .eq("status", "pending") \
-            .order("created_at", desc=False) \
-            .limit(batch_size) \
-            .execute()
+        print(f"Analyzing pack of {len(items)} items...")
+        response = await _call_llm(
+            packed_chain,
+            {"items": rendered, "count": len(items)},
+            estimate_tokens(rendered) + PROMPT_OVERHEAD_TOKENS + PACK_ITEM_OVERHEAD_TOKENS * len(items),
+            items[0], # Retry attempts are tallied on the pack's first item
+            stats
+        )
+        for entry in response:
+            try:
+                n = int(entry["item"])
+                if 1 <= n <= len(items) and n not in results:
+                    results[n] = coerce_analysis(entry)
+            except Exception:
+                continue # Malformed entry: that item is retried below
+    except (RetriesExhausted, CircuitOpenError) as e:
+        # Smaller packs would hit the same provider trouble: every item goes back to the queue
+        pack_retries = items[0]["retry_count"] - retries_before
+        for item in items:
+            if item is not items[0]:
+                item["retry_count"] += pack_retries
+            _mark_ai_error(item, e, stats)
+        return
+    except Exception as e:
+        print(f"Packed analysis failed ({len(items)} items): {e}")
+    
+    missing = []
+    for n, item in enumerate(items, start=1):
+        if n in results:
+            await _store_analysis(item, results[n], stats)
+        else:
+            missing.append(item)
+    
+    if not missing:
+        return
+    if len(missing) == len(items):
+        half = len(items) // 2
+        await analyze_pack(packed_chain, chain, format_instructions, items[:half], stats)
+        await analyze_pack(packed_chain, chain, format_instructions, items[half:], stats)
+    else:
+        await analyze_pack(packed_chain, chain, format_instructions, missing, stats)
+
+def inherit_batch_duplicates(items: List[ContentItem], stats: Dict[str, Any]):
+    """
+    Copies each in-batch near-duplicate's analysis from its (now analyzed) original.
+    """
+    by_id = {item["id"]: item for item in items}
+    for item in items:
+        if not item["is_valid"] or item["analysis"] or not item["duplicate_of"]:
+            continue
+        original = by_id.get(item["duplicate_of"])
+        if original and original["analysis"]:
+            item["analysis"] = original["analysis"]
+        elif original and original["decision"] == "deferred":
+            item["is_valid"] = False
+            item["decision"] = "deferred" # Retried together with its original
+            item["decision_reason"] = original["decision_reason"]
+            stats["deferred"] += 1
+        elif original and original["decision"] == "rejected" and original["decision_reason"].startswith("Pre-filter"):
+            item["is_valid"] = False
+            item["decision"] = "rejected"
+            item["decision_reason"] = original["decision_reason"]
+            stats["rejected"] += 1
+            stats["prefiltered"] += 1
+        else:
+            item["is_valid"] = False
+            item["validation_error"] = f"AI Error: original {item['duplicate_of']} was not analyzed"
+            item["decision"] = "ai_error"
+            stats["ai_errors"] += 1
+
+def score_item(item: ContentItem, stats: Dict[str, Any]):
+    if not item["is_valid"] or not item["analysis"]:
+        return
+        
+    # Convert dict to Pydantic for cleaner access if preferred, or just dict access
+    analysis_data = item["analysis"]
+    try:
+        analysis_obj = AIAnalysisResult(**analysis_data)
         
-        items = response.data
+        # Score
+        final_score = calculate_final_score(analysis_obj)
+        item["final_score"] = final_score
         
-        # Convert to ContentItem structure
-        content_batch: List[ContentItem] = []
-        for item in items:
-            content_batch.append({
-                "id": item["id"],
-                "raw_content": item.get("raw_content") or item.get("summary") or "",
-                "source_url": item.get("source_url") or "",
-                "is_valid": True,
-                "validation_error": "",
-                "analysis": None,
-                "final_score": 0.0,
-                "decision": "pending",
-                "decision_reason": "",
-                "retry_count": 0
-            })
+        # Decide
+        decision, reason = make_decision(
+            final_score, 
+            analysis_obj.rewrite_needed, 
+            analysis_obj.reasoning,
+            analysis_obj
+        )
+        item["decision"] = decision
+        item["decision_reason"] = reason
+        
+        # Update stats
+        if decision == "approved":
+            stats["approved"] += 1
+        elif decision == "review":
+            stats["review"] += 1
+        elif decision == "rejected":
+            stats["rejected"] += 1
             
-        print(f"Fetched {len(content_batch)} items.")
-        state["content_batch"] = content_batch
+    except Exception as e:
+        print(f"Scoring error for {item['id']}: {e}")
+        item["decision"] = "ai_error"
+        item["decision_reason"] = f"Scoring Error: {e}"
+        stats["ai_errors"] += 1
+
+def save_items(items: List[ContentItem], stats: Dict[str, Any]):
+    """
+    Persists items in bulk, then records freshly analyzed originals in the
+    near-duplicate history so later copies can be matched against them.
+    """
+    current_time = datetime.now().isoformat()
+    
+    # Update content_queue and upsert content_ai_analysis in bulk
+    rows = [build_save_row(item, current_time) for item in items]
+    failures = save_batch(rows)
+    for failure in failures:
+        print(f"Error saving item {failure['content_id']}: {failure['error']}")
+    stats["save_errors"] = stats.get("save_errors", 0) + len(failures)
+    failed_ids = {failure["content_id"] for failure in failures}
+    
+    if run_checkpoint:
+        try:
+            run_checkpoint.release([item["id"] for item in items if item["id"] not in failed_ids])
+        except Exception as e:
+            print(f"Run checkpoint write failed: {e}")
+    
+    if near_dup_index:
+        for item in items:
+            if item["analysis"] and not item["duplicate_of"] and item["id"] not in failed_ids:
+                try:
+                    near_dup_index.add(item["id"], item["near_dup_signature"], item["analysis"])
+                except Exception as e:
+                    print(f"Near-duplicate index write failed: {e}")
+
+def finish_checkpoint(batch_id: str):
+    if run_checkpoint:
+        try:
+            run_checkpoint.finish_run(batch_id)
+        except Exception as e:
+            print(f"Run checkpoint write failed: {e}")
+
+def log_batch(batch_id: str, batch_size: int, stats: Dict[str, Any], started_at: datetime):
+    finished_at = datetime.now()
+    elapsed = (finished_at - started_at).total_seconds()
+    stats["execution_time_ms"] = int(elapsed * 1000)
+    BATCH_SECONDS.observe(elapsed)
+    
+    log_entry = {
+        "batch_id": batch_id,
+        "batch_size": batch_size,
+        "processed": stats["processed"],
+        "approved": stats["approved"],
+        "review": stats["review"],
+        "rejected": stats["rejected"],
+        "ai_errors": stats["ai_errors"],
+        "execution_time": stats["execution_time_ms"],
+        "llm_calls": stats["llm_calls"],
+        "prompt_tokens": stats["prompt_tokens"],
+        "completion_tokens": stats["completion_tokens"],
+        "stage_timings": stats["stage_timings_ms"],
+        "started_at": started_at.isoformat(),
+        "finished_at": finished_at.isoformat()
+    }
+    try:
+        get_supabase().table("ai_processing_logs").insert(log_entry).execute()
+    except Exception as e:
+        print(f"Error saving batch log: {e}")
+
+# --- Node Implementation ---
+
+def fetch_content_node(state: GraphState) -> GraphState:
+    """
+    Claims pending content from Supabase, or takes back an interrupted run's rows.
+    """
+    batch_size = state["batch_size"]
+    if not state.get("started_at"):
+        state["started_at"] = datetime.now().isoformat()
+    if not state.get("batch_id"):
+        state["batch_id"] = str(uuid.uuid4())
+    resume_from = state.get("resume_from")
+    
+    content_batch: List[ContentItem] = []
+    state["content_batch"] = content_batch
+    try:
+        if resume_from:
+            print(f"Resuming interrupted batch {state['batch_id']} ({len(resume_from['content_ids'])} items)...")
+            pages = iter([reclaim_items(resume_from)])
+        else:
+            print(f"Claiming {batch_size} pending items as {get_worker_id()}...")
+            pages = iter_claimed_pages(batch_size)
+        for rows in pages:
+            # Already-claimed pages stay in the batch even if a later page fails
+            items = [new_content_item(row) for row in rows]
+            content_batch.extend(items)
+            checkpoint_claimed(state["batch_id"], items, state["stats"])
         
     except Exception as e:
         print(f"Error fetching content: {e}")
         state["stats"]["ai_errors"] += 1
         
+    print(f"Fetched {len(content_batch)} items.")
     return state
 
 def validate_content_node(state: GraphState) -> GraphState:
@@ -60,29 +797,33 @@ def validate_content_node(state: GraphState) -> GraphState:
     Validates content quality before AI analysis.
     """
     print("Validating content...")
-    valid_batch = []
-    
     for item in state["content_batch"]:
-        text = item["raw_content"]
-        
-        # Cleaning
-        text = re.sub(r'<[^>]+>', '', text) # Strip HTML
-        text = re.sub(r'\s+', ' ', text).strip() # Normalize whitespace
-        
-        item["raw_content"] = text
-        
-        # Validation Rules
-        if len(text) < 50: # Reduced from 150 for testing, prompt said 150
-            item["is_valid"] = False
-            item["validation_error"] = "Content too short (<50 chars)"
-            item["decision"] = "rejected"
-            item["decision_reason"] = "Validation Failed: Too short"
-            state["stats"]["rejected"] += 1
-        # Add more rules here (language detection etc if needed)
-        
-        valid_batch.append(item)
-        
-    state["content_batch"] = valid_batch
+        validate_item(item, state["stats"])
+    return state
+
+def near_duplicate_node(state: GraphState) -> GraphState:
+    """
+    Flags near-duplicates (MinHash + LSH) within the batch and against recently
+    analyzed content, so syndicated or lightly edited copies skip the LLM.
+    """
+    if not near_dup_index:
+        return state
+    print("Checking for near-duplicates...")
+    batch_index = NearDuplicateIndex() # In-memory, this batch only
+    for item in state["content_batch"]:
+        check_near_duplicate(item, state["stats"], batch_index)
+    return state
+
+def prefilter_node(state: GraphState) -> GraphState:
+    """
+    Decides predictable rejects with the local pre-filter model, before the LLM.
+    """
+    if not get_prefilter():
+        return state
+    for item in state["content_batch"]:
+        prefilter_item(item, state["stats"])
+    if state["stats"]["prefiltered"]:
+        print(f"Pre-filter rejected {state['stats']['prefiltered']} items.")
     return state
 
 def analyze_content_node(state: GraphState) -> GraphState:
@@ -90,187 +831,69 @@ def analyze_content_node(state: GraphState) -> GraphState:
     Calls Groq LLaMA-3 to analyze content.
     """
     print("Analyzing content with AI...")
-    llm = get_llm()
-    parser = JsonOutputParser(pydantic_object=AIAnalysisResult)
+    chain, format_instructions = build_analysis_chain()
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are an expert content strategist for a tech/business brand. Verify constraint: Output valid JSON only."),
-        ("user", """Analyze the following content for strategic value.
-        
-        Content: {content}
-        
-        Return a JSON object with:
-        - category: one of [technology, startup, ai, business, marketing, other]
-        - content_quality_score: 0-100
-        - engagement_score: 0-100
-        - virality_probability: 0-100
-        - recommended_platforms: list of strings
-        - content_type_recommendation: string
-        - reasoning: string explanation
-        - rewrite_needed: boolean
-        
-        {format_instructions}
-        """)
-    ])
+    pending = [
+        item for item in state["content_batch"]
+        if item["is_valid"] and not item["analysis"] and not item["duplicate_of"]
+    ]
+    if ANALYSIS_PACK_TOKEN_BUDGET > 0:
+        pending = [item for item in pending if not load_cached_analysis(item, state["stats"])]
+        packs = plan_packs(pending)
+        print(f"Analyzing {len(pending)} items in {len(packs)} packs (concurrency={ANALYSIS_CONCURRENCY})...")
+        work = _analyze_packs(build_packed_chain(), chain, format_instructions, packs, state["stats"])
+    else:
+        print(f"Analyzing {len(pending)} items (concurrency={ANALYSIS_CONCURRENCY})...")
+        work = _analyze_items(chain, format_instructions, pending, state["stats"], build_triage_chain())
     
-    chain = prompt | llm | parser
+    run_async(_with_leases([item["id"] for item in state["content_batch"]], work))
     
-    processed_batch = []
-    for item in state["content_batch"]:
-        if not item["is_valid"]:
-            processed_batch.append(item)
-            continue
-            
-        try:
-            # Call LLM
-            print(f"Analyzing item {item['id']}...")
-            result = chain.invoke({
-                "content": item["raw_content"][:4000], # Truncate for safety
-                "format_instructions": parser.get_format_instructions()
-            })
-            
-            # Populate analysis
-            item["analysis"] = result
-            state["stats"]["processed"] += 1
-            
-        except Exception as e:
-            print(f"AI Analysis failed for {item['id']}: {e}")
-            item["is_valid"] = False # Mark invalid to skip scoring
-            item["validation_error"] = f"AI Error: {str(e)}"
-            item["decision"] = "ai_error" # Special status
-            state["stats"]["ai_errors"] += 1
-            
-        processed_batch.append(item)
-        
-    state["content_batch"] = processed_batch
+    inherit_batch_duplicates(state["content_batch"], state["stats"])
     return state
 
+async def _analyze_items(chain, format_instructions: str, items: List[ContentItem], stats: Dict[str, Any], triage_chain=None):
+    """
+    Runs analyze_item for all items concurrently, capped by ANALYSIS_CONCURRENCY.
+    Every coroutine runs on this one event loop, so stats updates never race.
+    """
+    start_retry_budget()
+    semaphore = asyncio.Semaphore(max(1, ANALYSIS_CONCURRENCY))
+    
+    async def analyze_one(item: ContentItem):
+        async with semaphore:
+            await analyze_item(chain, format_instructions, item, stats, triage_chain=triage_chain)
+    
+    await asyncio.gather(*(analyze_one(item) for item in items))
+
+async def _analyze_packs(packed_chain, chain, format_instructions: str, packs: List[List[ContentItem]], stats: Dict[str, Any]):
+    start_retry_budget()
+    semaphore = asyncio.Semaphore(max(1, ANALYSIS_CONCURRENCY))
+    
+    async def analyze_one(pack: List[ContentItem]):
+        async with semaphore:
+            await analyze_pack(packed_chain, chain, format_instructions, pack, stats)
+    
+    await asyncio.gather(*(analyze_one(pack) for pack in packs))
+
 def score_and_decide_node(state: GraphState) -> GraphState:
     """
     Applies deterministic scoring and business logic.
     """
     print("Scoring and deciding...")
-    scored_batch = []
-    
     for item in state["content_batch"]:
-        if not item["is_valid"] or not item["analysis"]:
-            scored_batch.append(item)
-            continue
-            
-        # Convert dict to Pydantic for cleaner access if preferred, or just dict access
-        analysis_data = item["analysis"]
-        try:
-            analysis_obj = AIAnalysisResult(**analysis_data)
-            
-            # Score
-            final_score = calculate_final_score(analysis_obj)
-            item["final_score"] = final_score
-            
-            # Decide
-            decision, reason = make_decision(
-                final_score, 
-                analysis_obj.rewrite_needed, 
-                analysis_obj.reasoning,
-                analysis_obj
-            )
-            item["decision"] = decision
-            item["decision_reason"] = reason
-            
-            # Update stats
-            if decision == "approved":
-                state["stats"]["approved"] += 1
-            elif decision == "review":
-                state["stats"]["review"] += 1
-            elif decision == "rejected":
-                state["stats"]["rejected"] += 1
-                
-        except Exception as e:
-            print(f"Scoring error for {item['id']}: {e}")
-            item["decision"] = "ai_error"
-            item["decision_reason"] = f"Scoring Error: {e}"
-            state["stats"]["ai_errors"] += 1
-            
-        scored_batch.append(item)
-        
-    state["content_batch"] = scored_batch
+        score_item(item, state["stats"])
     return state
 
 def save_results_node(state: GraphState) -> GraphState:
     """
-    Writes results to Supabase.
+    Writes results to Supabase. Times itself rather than going through timed_node,
+    so the batch log already carries the "save" stage timing.
     """
     print("Saving results...")
-    
     batch_id = state.get("batch_id") or str(uuid.uuid4())
-    current_time = datetime.now().isoformat()
-    
-    for item in state["content_batch"]:
-        try:
-            # 1. Update content_queue
-            update_data = {
-                "ai_status": item["decision"], # approved, review, rejected, ai_error
-                "final_score": item["final_score"],
-                "decision_reason": item["decision_reason"],
-                "analyzed_at": current_time
-            }
-            # Also update status to 'processed' or keep 'pending'?
-            # Prompt says: "Next Layer (Step 5) must consume: SELECT * FROM content_queue WHERE ai_status = 'approved'"
-            # It implies 'status' might still be 'pending' or we assume 'ai_status' is sufficient filter.
-            # But earlier prompt said: "If fails validation: Update status = 'rejected', ai_status = 'invalid'".
-            # So we should probably update 'status' too.
-            # "Is the content strategically valuable?" -> If approved, status -> 'approved'.
-            # Let's map ai_status to main status?
-            # If ai_status is 'approved' or 'review', main status could be 'processed'?
-            # For now, let's just set status='processed' (or keep pending?) so step 5 can pick it up?
-            # Step 5 query: `WHERE ai_status = 'approved'`.
-            # If status stays 'pending', it will be picked up again by Step 4 query: `WHERE status = 'pending'`.
-            # CRITICAL: We MUST change `status` from 'pending' to avoid infinite loops!
-            
-            if item["decision"] in ["approved", "review"]:
-                # Maybe set status to 'ready_for_transform' or just 'processed'?
-                # Or if approved -> 'approved'.
-                update_data["status"] = item["decision"] 
-            elif item["decision"] in ["rejected", "ai_error"]:
-                update_data["status"] = "rejected"
-            
-            supabase.table("content_queue").update(update_data).eq("id", item["id"]).execute()
-            
-            # 2. Insert into content_ai_analysis (only if analysis exists)
-            if item["analysis"]:
-                analysis_record = {
-                    "content_id": item["id"],
-                    "category": item["analysis"]["category"],
-                    "content_quality_score": item["analysis"]["content_quality_score"],
-                    "engagement_score": item["analysis"]["engagement_score"],
-                    "virality_probability": item["analysis"]["virality_probability"],
-                    "final_score": item["final_score"],
-                    "recommended_platforms": item["analysis"]["recommended_platforms"],
-                    "content_type_recommendation": item["analysis"]["content_type_recommendation"],
-                    "rewrite_needed": item["analysis"]["rewrite_needed"],
-                    "reasoning": item["analysis"]["reasoning"],
-                    "raw_llm_response": item["analysis"]
-                }
-                supabase.table("content_ai_analysis").insert(analysis_record).execute()
-                
-        except Exception as e:
-            print(f"Error saving item {item['id']}: {e}")
-            
-    # 3. Log batch stats
-    log_entry = {
-        "batch_id": batch_id,
-        "batch_size": state["batch_size"],
-        "processed": state["stats"]["processed"],
-        "approved": state["stats"]["approved"],
-        "review": state["stats"]["review"],
-        "rejected": state["stats"]["rejected"],
-        "ai_errors": state["stats"]["ai_errors"],
-        "execution_time": state["stats"].get("execution_time_ms", 0),
-        "started_at": current_time, # approximate
-        "finished_at": current_time
-    }
-    try:
-        supabase.table("ai_processing_logs").insert(log_entry).execute()
-    except Exception as e:
-        print(f"Error saving batch log: {e}")
-
+    with stage_timer(state["stats"], "save"):
+        save_items(state["content_batch"], state["stats"])
+        finish_checkpoint(batch_id)
+    if state["content_batch"]: # Idle polls (e.g. worker.py on an empty queue) are not logged
+        log_batch(batch_id, state["batch_size"], state["stats"], datetime.fromisoformat(state["started_at"]))
     return state
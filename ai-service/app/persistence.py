@@ -0,0 +1,82 @@
+from typing import List, Dict, Any
+from app.config import get_supabase, get_worker_id, SAVE_CHUNK_SIZE
+from app.state import ContentItem
+
+def build_save_row(item: ContentItem, analyzed_at: str) -> Dict[str, Any]:
+    """
+    Flattens a processed ContentItem into the row shape expected by save_analysis_batch.
+    """
+    row = {
+        "id": item["id"],
+        "ai_status": item["decision"], # approved, review, rejected, ai_error
+        "final_score": item["final_score"],
+        "decision_reason": item["decision_reason"],
+        "analyzed_at": analyzed_at,
+        "ai_retry_count": item["retry_count"],
+        "analysis": item["analysis"]
+    }
+    # CRITICAL: `status` must leave 'pending' or the item is fetched again forever
+    if item["decision"] in ["approved", "review"]:
+        row["status"] = item["decision"]
+    elif item["decision"] in ["rejected", "ai_error"]:
+        row["status"] = "rejected"
+    else:
+        # Deferred (transient provider failure) or undecided: hand it back to the queue
+        # rather than leave it 'processing' unleased
+        row["status"] = "pending"
+    return row
+
+def save_batch(rows: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Persists analysis rows in chunks of SAVE_CHUNK_SIZE, one RPC per chunk. Only
+    rows still claimed by this worker are written; a row whose lease was lost to
+    another worker is left to its new owner and reported as failed.
+    Returns the rows that failed as [{"content_id": ..., "error": ...}].
+    """
+    worker_id = get_worker_id()
+    failures = []
+    for start in range(0, len(rows), SAVE_CHUNK_SIZE):
+        chunk = rows[start:start + SAVE_CHUNK_SIZE]
+        try:
+            response = get_supabase().rpc("save_analysis_batch", {"p_rows": chunk, "p_worker_id": worker_id}).execute()
+            failures.extend(response.data or [])
+        except Exception as e:
+            # RPC missing or the whole request failed: fall back to per-row writes
+            print(f"Bulk save failed ({e}), falling back to per-row writes...")
+            failures.extend(_save_rows_individually(chunk, worker_id))
+    return failures
+
+def _save_rows_individually(rows: List[Dict[str, Any]], worker_id: str) -> List[Dict[str, str]]:
+    failures = []
+    for row in rows:
+        try:
+            update_data = {k: row[k] for k in ("ai_status", "final_score", "decision_reason", "analyzed_at", "ai_retry_count")}
+            update_data["status"] = row["status"]
+            update_data["claimed_by"] = None # Release the lease
+            update_data["lease_expires_at"] = None
+            response = get_supabase().table("content_queue").update(update_data) \
+                .eq("id", row["id"]).eq("claimed_by", worker_id).execute()
+            if not response.data:
+                failures.append({"content_id": row["id"], "error": f"lease lost: row is no longer claimed by {worker_id}"})
+                continue
+
+            analysis = row["analysis"]
+            if analysis:
+                analysis_record = {
+                    "content_id": row["id"],
+                    "category": analysis["category"],
+                    "content_quality_score": analysis["content_quality_score"],
+                    "engagement_score": analysis["engagement_score"],
+                    "virality_probability": analysis["virality_probability"],
+                    "final_score": row["final_score"],
+                    "recommended_platforms": analysis["recommended_platforms"],
+                    "content_type_recommendation": analysis["content_type_recommendation"],
+                    "rewrite_needed": analysis["rewrite_needed"],
+                    "reasoning": analysis["reasoning"],
+                    "raw_llm_response": analysis
+                }
+                get_supabase().table("content_ai_analysis").upsert(analysis_record, on_conflict="content_id").execute()
+
+        except Exception as e:
+            failures.append({"content_id": row["id"], "error": str(e)})
+    return failures
@@ -0,0 +1,154 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Optional, Dict, Any
+from app.config import ANALYSIS_CONCURRENCY, SAVE_CHUNK_SIZE, STREAM_QUEUE_SIZE, STREAM_FETCH_CHUNK
+from app.schemas import ProcessingStats
+from app.metrics import add_stage_time, merge_stats, observe_stage_timings
+from app.nodes import (
+    iter_claimed_pages,
+    new_content_item,
+    validate_item,
+    check_near_duplicate,
+    prefilter_item,
+    checkpoint_claimed,
+    finish_checkpoint,
+    build_analysis_chain,
+    build_triage_chain,
+    start_retry_budget,
+    analyze_item,
+    score_item,
+    save_items,
+    log_batch,
+    keep_leases
+)
+
+async def run_streaming_batch(
+    batch_size: int,
+    batch_id: Optional[str] = None,
+    on_progress: Optional[Callable[[Dict[str, Any], int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Per-item alternative to app_graph: each item moves fetch -> validate/dedup ->
+    analyze -> score/save on its own, through bounded queues, and is persisted as
+    soon as it is scored. Memory stays flat regardless of batch size.
+
+    Near-duplicates are matched against history only; an original is added to the
+    history as soon as it is saved, so later copies in the same run still match.
+    `on_progress(stats, items_saved)` is called after every save. Stage timings are
+    summed busy time per stage, since stages overlap.
+    Returns the ProcessingStats dict.
+    """
+    stats = ProcessingStats().model_dump()
+    started_at = datetime.now()
+    batch_id = batch_id or str(uuid.uuid4())
+    workers = max(1, ANALYSIS_CONCURRENCY)
+    chain, format_instructions = build_analysis_chain()
+    triage_chain = build_triage_chain()
+    start_retry_budget()
+
+    to_analyze: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    to_save: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    in_flight = set() # Claimed but not yet saved: their leases are kept alive
+
+    def prepare_page(rows):
+        """
+        Checkpoint, validate, dedup and pre-filter one page. Runs in a worker thread
+        (SQLite, HTML parsing, index loads) and counts into its own stats, merged
+        back on the event loop, so it never races the analyze workers.
+        """
+        page_stats = ProcessingStats().model_dump()
+        items = [new_content_item(row) for row in rows]
+        checkpoint_claimed(batch_id, items, page_stats)
+        for item in items:
+            start = time.perf_counter()
+            validate_item(item, page_stats)
+            add_stage_time(page_stats, "validate", time.perf_counter() - start)
+            start = time.perf_counter()
+            check_near_duplicate(item, page_stats)
+            add_stage_time(page_stats, "dedup", time.perf_counter() - start)
+            start = time.perf_counter()
+            prefilter_item(item, page_stats)
+            add_stage_time(page_stats, "prefilter", time.perf_counter() - start)
+        return items, page_stats
+
+    async def fetch_stage():
+        pages = iter_claimed_pages(batch_size, STREAM_FETCH_CHUNK)
+        try:
+            while True:
+                start = time.perf_counter()
+                rows = await asyncio.to_thread(next, pages, None)
+                add_stage_time(stats, "fetch", time.perf_counter() - start)
+                if rows is None:
+                    break
+                items, page_stats = await asyncio.to_thread(prepare_page, rows)
+                merge_stats(stats, page_stats)
+                in_flight.update(item["id"] for item in items)
+                for item in items:
+                    await to_analyze.put(item)
+        except Exception as e:
+            print(f"Error fetching content: {e}")
+            stats["ai_errors"] += 1
+        # Not in a finally: once cancelled, nobody is left to drain the queue
+        for _ in range(workers):
+            await to_analyze.put(None)
+
+    async def analyze_stage():
+        while (item := await to_analyze.get()) is not None:
+            if item["is_valid"] and not item["analysis"]:
+                start = time.perf_counter()
+                await analyze_item(chain, format_instructions, item, stats, triage_chain=triage_chain)
+                add_stage_time(stats, "analyze", time.perf_counter() - start)
+            await to_save.put(item)
+        await to_save.put(None)
+
+    async def save_stage():
+        finished_workers = 0
+        saved = 0
+        while finished_workers < workers:
+            # Save whatever is ready right now, up to one chunk
+            chunk = []
+            item = await to_save.get()
+            while True:
+                if item is None:
+                    finished_workers += 1
+                else:
+                    chunk.append(item)
+                if len(chunk) >= SAVE_CHUNK_SIZE or to_save.empty() or finished_workers == workers:
+                    break
+                item = to_save.get_nowait()
+            if not chunk:
+                continue
+            start = time.perf_counter()
+            for item in chunk:
+                score_item(item, stats)
+            add_stage_time(stats, "score", time.perf_counter() - start)
+            start = time.perf_counter()
+            await asyncio.to_thread(save_items, chunk, stats)
+            add_stage_time(stats, "save", time.perf_counter() - start)
+            in_flight.difference_update(item["id"] for item in chunk)
+            saved += len(chunk)
+            if on_progress:
+                on_progress(stats, saved)
+        return saved
+
+    print(f"Streaming up to {batch_size} items (concurrency={workers})...")
+    tasks = [asyncio.create_task(stage) for stage in (fetch_stage(), *(analyze_stage() for _ in range(workers)), save_stage())]
+    lease_keeper = asyncio.create_task(keep_leases(lambda: list(in_flight)))
+    try:
+        *_, saved = await asyncio.gather(*tasks)
+    except BaseException:
+        # A failed stage would leave the others blocked on its queue forever
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        lease_keeper.cancel()
+
+    observe_stage_timings(stats)
+    finish_checkpoint(batch_id)
+    if saved: # Idle polls (e.g. worker.py on an empty queue) are not logged
+        await asyncio.to_thread(log_batch, batch_id, batch_size, stats, started_at)
+    return stats
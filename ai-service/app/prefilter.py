@@ -0,0 +1,221 @@
+"""
+Local pre-filter: a hashed-feature logistic regression, trained on stored
+analyses, that predicts whether content would be rejected. Items it rejects
+with high confidence are decided without an LLM call.
+
+    cd ai-service
+    python -m app.prefilter train               # retrain from content_ai_analysis
+    python -m app.prefilter train --confidence 0.99
+"""
+import argparse
+import io
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple, Dict, Any
+import numpy as np
+
+N_FEATURES = 1 << 18
+_TOKEN = re.compile(r"[a-z0-9']+")
+# Decided rows only; a posted or scheduled item keeps its ai_status
+LABELS = {"rejected": 1, "review": 0, "approved": 0}
+TRAINING_COLUMNS = "content_id, content_queue!inner(raw_content, summary, ai_status)"
+# Fewer confident rejects than this on the holdout and precision can't be trusted
+MIN_HOLDOUT_REJECTS = 20
+
+def featurize(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed unigram + bigram counts plus a length bucket, sqrt-damped and L2-normalized.
+    """
+    words = _TOKEN.findall(text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    grams.append(f"__len{int(math.log2(len(words) + 1))}")
+    counts = Counter(zlib.crc32(g.encode("utf-8")) % N_FEATURES for g in grams)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.sqrt(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    return indices, values / np.linalg.norm(values)
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+def train_weights(
+    features: List[Tuple[np.ndarray, np.ndarray]],
+    labels: np.ndarray,
+    epochs: int = 8,
+    batch_size: int = 256,
+    learning_rate: float = 0.5,
+    l2: float = 1e-6,
+    seed: int = 0
+) -> Tuple[np.ndarray, float]:
+    """
+    Mini-batch logistic regression with AdaGrad, which suits sparse hashed features.
+    Returns (weights, bias).
+    """
+    weights = np.zeros(N_FEATURES)
+    grad_sq = np.full(N_FEATURES, 1e-8)
+    bias, bias_grad_sq = 0.0, 1e-8
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(features))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            indices = np.concatenate([features[i][0] for i in batch])
+            values = np.concatenate([features[i][1] for i in batch])
+            rows = np.repeat(np.arange(len(batch)), [len(features[i][0]) for i in batch])
+
+            logits = np.bincount(rows, weights=weights[indices] * values, minlength=len(batch)) + bias
+            error = _sigmoid(logits) - labels[batch]
+            touched, inverse = np.unique(indices, return_inverse=True)
+            grad = np.bincount(inverse, weights=values * error[rows], minlength=len(touched)) / len(batch)
+            grad += l2 * weights[touched]
+            grad_sq[touched] += grad ** 2
+            weights[touched] -= learning_rate * grad / np.sqrt(grad_sq[touched])
+
+            bias_grad = error.mean()
+            bias_grad_sq += bias_grad ** 2
+            bias -= learning_rate * bias_grad / math.sqrt(bias_grad_sq)
+    return weights, bias
+
+def predict(weights: np.ndarray, bias: float, features: Tuple[np.ndarray, np.ndarray]) -> float:
+    indices, values = features
+    return float(_sigmoid(weights[indices] @ values + bias))
+
+class Prefilter:
+    """
+    The trained model at `path`, loaded on first use and reloaded whenever a
+    retrain replaces the file. A model whose holdout precision at its confidence
+    threshold is below `min_precision` is ignored.
+    """
+
+    def __init__(self, path: str, min_precision: float):
+        self.path = path
+        self.min_precision = min_precision
+        self._model: Optional[Dict[str, Any]] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Optional[Dict[str, Any]]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self._model = self._load()
+            return self._model
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with np.load(self.path) as data:
+                meta = json.loads(str(data["meta"]))
+                model = {"weights": data["weights"].astype(np.float64), "bias": float(data["bias"]), "meta": meta}
+        except Exception as e:
+            print(f"Pre-filter model unreadable: {e}")
+            return None
+        if meta["holdout_predicted_rejects"] < MIN_HOLDOUT_REJECTS or meta["holdout_precision"] < self.min_precision:
+            print(
+                f"Pre-filter disabled: holdout precision {meta['holdout_precision']:.3f} over "
+                f"{meta['holdout_predicted_rejects']} predicted rejects (need >= {self.min_precision})"
+            )
+            return None
+        return model
+
+    def confident_reject(self, text: str) -> Optional[float]:
+        """
+        The predicted reject probability if it clears the model's confidence threshold, else None.
+        """
+        model = self._current()
+        if model is None:
+            return None
+        probability = predict(model["weights"], model["bias"], featurize(text))
+        return probability if probability >= model["meta"]["confidence"] else None
+
+    def save(self, weights: np.ndarray, bias: float, meta: Dict[str, Any]):
+        """Writes the model atomically, so running processes never read a partial file."""
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, weights=weights.astype(np.float32), bias=np.float64(bias), meta=json.dumps(meta))
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, self.path)
+
+def open_prefilter(data_dir: str, min_precision: float) -> Prefilter:
+    os.makedirs(data_dir, exist_ok=True)
+    return Prefilter(os.path.join(data_dir, "prefilter.npz"), min_precision)
+
+def load_training_data(page_size: int) -> Tuple[List[str], List[int]]:
+    from app.rescore import fetch_analysis_pages
+    from app.text import extract_main_text
+
+    texts, labels = [], []
+    for rows in fetch_analysis_pages(page_size, columns=TRAINING_COLUMNS, statuses=None):
+        for row in rows:
+            content = row["content_queue"]
+            label = LABELS.get(content["ai_status"])
+            text = extract_main_text(content["raw_content"] or content["summary"] or "")
+            if label is None or len(text) < 50: # Too-short content never reaches the pre-filter
+                continue
+            texts.append(text)
+            labels.append(label)
+    return texts, labels
+
+def train(texts: Iterable[str], labels: Iterable[int], confidence: float, epochs: int, holdout: float = 0.1, seed: int = 0):
+    """
+    Trains on all but a random `holdout` fraction and measures reject precision
+    at `confidence` on the rest. Returns (weights, bias, meta).
+    """
+    features = [featurize(text) for text in texts]
+    y = np.asarray(list(labels), dtype=np.float64)
+    order = np.random.default_rng(seed).permutation(len(features))
+    n_holdout = int(len(order) * holdout)
+    test, fit = order[:n_holdout], order[n_holdout:]
+
+    weights, bias = train_weights([features[i] for i in fit], y[fit], epochs=epochs, seed=seed)
+    probabilities = np.array([predict(weights, bias, features[i]) for i in test])
+    predicted = probabilities >= confidence
+    true_rejects = y[test] == 1
+    meta = {
+        "trained_at": time.time(),
+        "examples": len(fit),
+        "reject_rate": float(y.mean()) if len(y) else 0.0,
+        "confidence": confidence,
+        "holdout_predicted_rejects": int(predicted.sum()),
+        "holdout_precision": float(true_rejects[predicted].mean()) if predicted.any() else 0.0,
+        "holdout_recall": float(predicted[true_rejects].mean()) if true_rejects.any() else 0.0
+    }
+    return weights, bias, meta
+
+def main(argv: Optional[List[str]] = None):
+    from app.config import get_prefilter, PREFILTER_REJECT_CONFIDENCE, PREFILTER_MIN_PRECISION, DATA_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--confidence", type=float, default=PREFILTER_REJECT_CONFIDENCE,
+                        help="Minimum predicted reject probability to skip the LLM")
+    parser.add_argument("--epochs", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    texts, labels = load_training_data(args.page_size)
+    print(f"Loaded {len(texts)} labeled analyses ({sum(labels)} rejected)")
+    if not texts:
+        return
+    weights, bias, meta = train(texts, labels, args.confidence, args.epochs)
+    (get_prefilter() or open_prefilter(DATA_DIR, PREFILTER_MIN_PRECISION)).save(weights, bias, meta)
+    print(
+        f"Trained in {time.perf_counter() - started:.1f}s. Holdout at p >= {args.confidence}: "
+        f"precision {meta['holdout_precision']:.3f}, recall {meta['holdout_recall']:.3f} "
+        f"over {meta['holdout_predicted_rejects']} predicted rejects"
+    )
+    if meta["holdout_predicted_rejects"] < MIN_HOLDOUT_REJECTS or meta["holdout_precision"] < PREFILTER_MIN_PRECISION:
+        print(f"Below PREFILTER_MIN_PRECISION={PREFILTER_MIN_PRECISION}: the service will not use this model.")
+
+if __name__ == "__main__":
+    main()
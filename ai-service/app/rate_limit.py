@@ -0,0 +1,214 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 chars per token) used for rate-limit budgeting.
+    """
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` units and refills them
+    evenly over `period` seconds. A capacity of 0 disables the bucket.
+    """
+
+    def __init__(self, capacity: int, period: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period if capacity > 0 else 0.0
+        self.clock = clock
+        self.available = float(capacity)
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.available = min(self.capacity, self.available + max(0.0, now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: int) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity) # Never wait for more than a full bucket
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: int):
+        if self.capacity <= 0:
+            return
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+class RateLimiter:
+    """
+    Request + token per-minute limiter for the Groq account.
+    Thread-safe, so one instance can be shared by every batch in the process.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, tokens: int) -> float:
+        with self._lock:
+            wait = max(self.paused_until - time.monotonic(), self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait <= 0:
+                self.requests.consume(1)
+                self.tokens.consume(tokens)
+            return wait
+
+    def pause(self, seconds: float):
+        """Holds back every caller for `seconds`, e.g. after Groq answered 429 with a reset time."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int):
+        """Waits until one request carrying `tokens` tokens fits in the budget."""
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose buckets live in a SQLite file, so every process on the host
+    (gunicorn workers, worker.py) draws from one per-minute budget instead of each
+    assuming the whole account. Processes get whatever the others leave unused, so
+    adding workers adds throughput up to the account limit rather than 429s.
+    A pause after a 429 applies to all of them. If the file can't be used, falls
+    back to this process' own buckets.
+
+    The SQLite work runs in worker threads on per-thread connections with a short
+    busy timeout, so contention between processes never blocks the event loop.
+    """
+
+    def __init__(self, path: str, name: str, requests_per_minute: int, tokens_per_minute: int, busy_timeout: float = 0.25):
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self.path = path
+        self.name = name
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._failed = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None) # Transactions are explicit
+            if not self._initialized:
+                with self._init_lock:
+                    if not self._initialized:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute("""
+                            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                                name TEXT PRIMARY KEY,
+                                requests_available REAL NOT NULL,
+                                tokens_available REAL NOT NULL,
+                                updated_at REAL NOT NULL,
+                                paused_until REAL NOT NULL DEFAULT 0
+                            )
+                        """)
+                        self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, update):
+        """
+        Runs `update(requests, tokens, paused_until)` -> (result, paused_until) on
+        the stored buckets inside one write transaction, so only one process at a
+        time reads and changes the budget.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT requests_available, tokens_available, updated_at, paused_until FROM rate_limit_buckets WHERE name = ?",
+                (self.name,)
+            ).fetchone()
+            requests = TokenBucket(self.requests.capacity, clock=time.time)
+            tokens = TokenBucket(self.tokens.capacity, clock=time.time)
+            paused_until = 0.0
+            if row is not None:
+                requests.available, tokens.available, updated_at, paused_until = row
+                requests.updated_at = tokens.updated_at = updated_at
+            result, paused_until = update(requests, tokens, paused_until)
+            conn.execute("""
+                INSERT OR REPLACE INTO rate_limit_buckets (name, requests_available, tokens_available, updated_at, paused_until)
+                VALUES (?, ?, ?, ?, ?)
+            """, (self.name, requests.available, tokens.available, max(requests.updated_at, tokens.updated_at), paused_until))
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _on_error(self, error: Exception):
+        if not self._failed:
+            self._failed = True
+            print(f"Shared rate limit unavailable ({error}); using this process' own budget")
+
+    def _try_acquire_shared(self, tokens: int) -> float:
+        def take(requests: TokenBucket, token_bucket: TokenBucket, paused_until: float):
+            wait = max(paused_until - time.time(), requests.wait_time(1), token_bucket.wait_time(tokens))
+            if wait <= 0:
+                requests.consume(1)
+                token_bucket.consume(tokens)
+            return wait, paused_until
+
+        if self._failed:
+            return super()._try_acquire(tokens)
+        try:
+            wait = self._transaction(take)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                return self.busy_timeout # Another process holds the budget: try again shortly
+            self._on_error(e)
+            return super()._try_acquire(tokens)
+        except sqlite3.Error as e:
+            self._on_error(e)
+            return super()._try_acquire(tokens)
+        # Processes waking in lockstep would contend for the same refill
+        return wait + random.uniform(0, 0.05) if wait > 0 else wait
+
+    async def acquire(self, tokens: int):
+        """Waits until one request carrying `tokens` tokens fits in the shared budget."""
+        while True:
+            wait = max(self.paused_until - time.monotonic(), 0.0)
+            if wait <= 0:
+                wait = await asyncio.to_thread(self._try_acquire_shared, tokens)
+                if wait <= 0:
+                    return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Pauses this process at once and records the pause for the others in the
+        background, so the caller (on the event loop) never waits on SQLite.
+        """
+        super().pause(seconds)
+        if not self._failed:
+            threading.Thread(target=self._pause_shared, args=(seconds,), daemon=True).start()
+
+    def _pause_shared(self, seconds: float):
+        until = time.time() + seconds
+        try:
+            self._transaction(lambda requests, tokens, paused_until: (None, max(paused_until, until)))
+        except sqlite3.Error as e:
+            print(f"Could not share rate-limit pause: {e}")
+
+def open_rate_limiter(data_dir: str, name: str, requests_per_minute: int, tokens_per_minute: int, shared: bool) -> RateLimiter:
+    if not shared:
+        return RateLimiter(requests_per_minute, tokens_per_minute)
+    os.makedirs(data_dir, exist_ok=True)
+    return SharedRateLimiter(os.path.join(data_dir, "rate_limit.sqlite3"), name, requests_per_minute, tokens_per_minute)
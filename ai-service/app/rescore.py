@@ -0,0 +1,150 @@
+"""
+Offline re-scoring: re-applies a scoring policy to every stored analysis without
+calling the LLM, and writes back only the decisions that changed.
+
+    cd ai-service
+    python -m app.rescore --dry-run
+    python -m app.rescore --approve-threshold 65 --quality-weight 0.5 --engagement-weight 0.25 --virality-weight 0.25
+"""
+import argparse
+import time
+from typing import Iterator, List, Dict, Any, Optional
+import numpy as np
+from app.config import get_supabase, SAVE_CHUNK_SIZE
+from app.schemas import ScoringPolicy
+from app.scoring import DEFAULT_POLICY, decision_reasons
+
+# Only settled decisions are re-decided; scheduled/posted content is left alone
+RESCORABLE_STATUSES = ["approved", "review", "rejected"]
+
+# Decision codes for the vectorized path, and the decision_reasons() key of each rule
+STATUSES = np.array(["rejected", "review", "approved"])
+REASON_KEYS = np.array(["low", "middle", "high", "rewrite", "spam"])
+REJECTED, REVIEW, APPROVED = 0, 1, 2
+LOW, MIDDLE, HIGH, REWRITE, SPAM = 0, 1, 2, 3, 4
+
+ANALYSIS_COLUMNS = (
+    "content_id, content_quality_score, engagement_score, virality_probability, "
+    "rewrite_needed, reasoning, final_score, content_queue!inner(status, decision_reason)"
+)
+
+def fetch_analysis_pages(
+    page_size: int,
+    columns: str = ANALYSIS_COLUMNS,
+    statuses: Optional[List[str]] = RESCORABLE_STATUSES
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yields content_ai_analysis rows (`columns` must embed content_queue!inner)
+    whose content is in one of `statuses` (any if None), a page at a time,
+    keyset-paginated on content_id. Pages until an empty response: PostgREST
+    caps responses at its max-rows (1000 by default), so a short page doesn't
+    mean the end.
+    """
+    last_id = None
+    while True:
+        query = get_supabase().table("content_ai_analysis").select(columns)
+        if statuses:
+            query = query.in_("content_queue.status", statuses)
+        if last_id is not None:
+            query = query.gt("content_id", last_id)
+        rows = query.order("content_id").limit(page_size).execute().data or []
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["content_id"]
+
+def score_columns(quality: np.ndarray, engagement: np.ndarray, virality: np.ndarray, policy: ScoringPolicy) -> np.ndarray:
+    """calculate_final_score over whole columns."""
+    score = quality * policy.quality_weight + engagement * policy.engagement_weight + virality * policy.virality_weight
+    return np.clip(np.round(score, 2), 0.0, 100.0)
+
+def decide_columns(scores: np.ndarray, rewrite_needed: np.ndarray, spam: np.ndarray, policy: ScoringPolicy):
+    """
+    make_decision over whole columns. Returns (status codes, reason codes).
+    """
+    status = np.where(scores < policy.reject_threshold, REJECTED,
+                      np.where(scores < policy.approve_threshold, REVIEW, APPROVED))
+    reason = status.copy() # LOW/MIDDLE/HIGH line up with REJECTED/REVIEW/APPROVED
+    downgrade = (status == APPROVED) & rewrite_needed
+    status[downgrade], reason[downgrade] = REVIEW, REWRITE
+    spam_reject = spam & (scores < policy.spam_override_score)
+    status[spam_reject], reason[spam_reject] = REJECTED, SPAM
+    return status, reason
+
+def rescore_page(rows: List[Dict[str, Any]], policy: ScoringPolicy) -> List[Dict[str, Any]]:
+    """
+    Re-decides one page of rows. Returns the changed ones in apply_rescore's row shape.
+    """
+    quality = np.fromiter((r["content_quality_score"] for r in rows), dtype=np.float64, count=len(rows))
+    engagement = np.fromiter((r["engagement_score"] for r in rows), dtype=np.float64, count=len(rows))
+    virality = np.fromiter((r["virality_probability"] for r in rows), dtype=np.float64, count=len(rows))
+    rewrite_needed = np.fromiter((bool(r["rewrite_needed"]) for r in rows), dtype=bool, count=len(rows))
+    spam = np.fromiter(("spam" in (r["reasoning"] or "").lower() for r in rows), dtype=bool, count=len(rows))
+    old_scores = np.array([r["final_score"] for r in rows], dtype=np.float64)
+    old_status = np.array([r["content_queue"]["status"] for r in rows])
+
+    scores = score_columns(quality, engagement, virality, policy)
+    status_codes, reason_codes = decide_columns(scores, rewrite_needed, spam, policy)
+    statuses = STATUSES[status_codes]
+    changed = np.flatnonzero((statuses != old_status) | ~np.isclose(scores, old_scores, atol=0.005))
+
+    reasons = decision_reasons(policy)
+    return [
+        {
+            "id": rows[i]["content_id"],
+            "status": str(statuses[i]),
+            "final_score": float(scores[i]),
+            "decision_reason": reasons[REASON_KEYS[reason_codes[i]]]
+        }
+        for i in changed
+    ]
+
+def apply_rescore(rows: List[Dict[str, Any]]) -> int:
+    """
+    Writes re-decided rows in chunks of SAVE_CHUNK_SIZE. Returns how many content_queue rows changed.
+    """
+    updated = 0
+    for start in range(0, len(rows), SAVE_CHUNK_SIZE):
+        response = get_supabase().rpc("apply_rescore", {"p_rows": rows[start:start + SAVE_CHUNK_SIZE]}).execute()
+        updated += response.data or 0
+    return updated
+
+def rescore_all(policy: ScoringPolicy = DEFAULT_POLICY, page_size: int = 1000, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Re-decides every stored analysis under `policy`. Makes no LLM calls.
+    """
+    started = time.perf_counter()
+    report = {"scanned": 0, "changed": 0, "written": 0, "transitions": {}}
+    for rows in fetch_analysis_pages(page_size):
+        changes = rescore_page(rows, policy)
+        report["scanned"] += len(rows)
+        report["changed"] += len(changes)
+        old_status = {r["content_id"]: r["content_queue"]["status"] for r in rows}
+        for change in changes:
+            key = f"{old_status[change['id']]}->{change['status']}"
+            report["transitions"][key] = report["transitions"].get(key, 0) + 1
+        if changes and not dry_run:
+            report["written"] += apply_rescore(changes)
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for field, value in DEFAULT_POLICY.model_dump().items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=value)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    args = parser.parse_args(argv)
+
+    policy = ScoringPolicy(**{field: getattr(args, field) for field in ScoringPolicy.model_fields})
+    print(f"Re-scoring with {policy.model_dump()}{' (dry run)' if args.dry_run else ''}...")
+    report = rescore_all(policy, page_size=args.page_size, dry_run=args.dry_run)
+    print(
+        f"Scanned {report['scanned']} analyses in {report['seconds']}s: "
+        f"{report['changed']} changed, {report['written']} written"
+    )
+    for transition, count in sorted(report["transitions"].items()):
+        print(f"  {transition}: {count}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+class CircuitOpenError(Exception):
+    pass
+
+class RetriesExhausted(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive transient failures and rejects
+    calls for `reset_seconds`; then lets a single probe through (half-open) and
+    closes again on its success.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probing:
+                return False
+            self._probing = True # Half-open: one probe at a time
+            return True
+
+    def release_probe(self):
+        """
+        Frees the half-open slot of a probe that ended without a result (e.g. its
+        task was cancelled), so the next caller can probe instead.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    print(f"Circuit breaker open for {self.reset_seconds}s after {self._failures} failures")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+class RetryBudget:
+    """
+    Time one batch may spend sleeping between retries, summed over its items.
+    Only those waits count, not rate-limiter queueing or the calls themselves.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.spent = 0.0
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.seconds - self.spent)
+
+    def spend(self, seconds: float):
+        with self._lock:
+            self.spent += seconds
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_transient(error: Exception) -> bool:
+    """
+    Rate limits, provider-side 5xx, timeouts and connection failures.
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return type(error).__name__ in ("APITimeoutError", "APIConnectionError", "ReadTimeout", "ConnectTimeout")
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parses "7.66s", "2m59.56s", "120ms" or plain seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Wait suggested by the provider for a 429: Retry-After, else the reset time of
+    whichever Groq limit is exhausted (x-ratelimit-remaining-* is 0). None for
+    other errors, or when no exhausted limit is reported.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers or _status_code(error) != 429:
+        return None
+    value = headers.get("retry-after")
+    if value and (seconds := _parse_duration(value)) is not None:
+        return seconds
+    waits = []
+    for limit in ("tokens", "requests"):
+        remaining, reset = headers.get(f"x-ratelimit-remaining-{limit}"), headers.get(f"x-ratelimit-reset-{limit}")
+        if remaining is not None and reset and remaining.strip() == "0":
+            seconds = _parse_duration(reset)
+            if seconds is not None:
+                waits.append(seconds)
+    return max(waits) if waits else None
+
+def backoff_seconds(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
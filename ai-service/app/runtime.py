@@ -0,0 +1,25 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="analysis-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Runs `coro` to completion on the process-wide event loop and returns its result.
+    Unlike asyncio.run, the loop outlives the call, so the LLM clients' pooled
+    keep-alive connections are reused by every batch. Safe to call from any thread
+    except the loop itself.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
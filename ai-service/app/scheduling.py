@@ -0,0 +1,82 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from app.config import (
+    get_supabase,
+    SOURCE_PRIORITY, SCHEDULING_LEARN_SOURCES, SCHEDULING_HISTORY_DAYS, SCHEDULING_REFRESH_SECONDS,
+    SCHEDULING_HALF_LIFE_HOURS, SCHEDULING_MAX_WAIT_HOURS
+)
+
+def learned_weights(rates: List[Dict[str, Any]], smoothing: float = 20, bounds: Tuple[float, float] = (0.25, 4.0)) -> Dict[str, float]:
+    """
+    Each source's approval rate relative to the overall rate, from
+    source_approval_rates rows. Rates are smoothed toward the overall rate by
+    `smoothing` pseudo-decisions, so a source with little history stays near 1.
+    """
+    decided = sum(row["decided"] for row in rates)
+    approved = sum(row["approved"] for row in rates)
+    if not decided or not approved:
+        return {}
+    overall = approved / decided
+    low, high = bounds
+    return {
+        row["source"]: min(high, max(low, (row["approved"] + smoothing * overall) / (row["decided"] + smoothing) / overall))
+        for row in rates
+    }
+
+class SourceWeights:
+    """
+    Per-source claim weights: the configured priority times the learned approval
+    factor. Learned factors are refreshed at most every `refresh_seconds`, and a
+    failed refresh keeps the previous ones.
+    """
+
+    def __init__(
+        self,
+        configured: Dict[str, float],
+        fetch_rates: Optional[Callable[[], List[Dict[str, Any]]]],
+        refresh_seconds: float
+    ):
+        self.configured = {source: float(weight) for source, weight in configured.items()}
+        self.fetch_rates = fetch_rates
+        self.refresh_seconds = refresh_seconds
+        self._learned: Dict[str, float] = {}
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Dict[str, float]:
+        if self.fetch_rates:
+            with self._lock:
+                now = time.monotonic()
+                if self._refreshed_at is None or now - self._refreshed_at >= self.refresh_seconds:
+                    self._refreshed_at = now
+                    try:
+                        self._learned = learned_weights(self.fetch_rates())
+                    except Exception as e:
+                        print(f"Source approval rates unavailable, keeping previous weights: {e}")
+        sources = set(self.configured) | set(self._learned)
+        return {
+            source: self.configured.get(source, 1.0) * self._learned.get(source, 1.0)
+            for source in sources
+        }
+
+def fetch_source_approval_rates() -> List[Dict[str, Any]]:
+    since = datetime.now() - timedelta(days=SCHEDULING_HISTORY_DAYS)
+    response = get_supabase().rpc("source_approval_rates", {"p_since": since.isoformat()}).execute()
+    return response.data or []
+
+source_weights = SourceWeights(
+    SOURCE_PRIORITY, fetch_source_approval_rates if SCHEDULING_LEARN_SOURCES else None, SCHEDULING_REFRESH_SECONDS
+)
+
+def priority_claim_params() -> Dict[str, Any]:
+    """
+    Ranking parameters for claim_prioritized_content (see its migration for the
+    formula): freshness half-life, starvation deadline and source weights.
+    """
+    return {
+        "p_half_life_hours": SCHEDULING_HALF_LIFE_HOURS,
+        "p_max_wait_seconds": int(SCHEDULING_MAX_WAIT_HOURS * 3600),
+        "p_source_weights": source_weights.get()
+    }
@@ -1,9 +1,11 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import List, Dict, Optional, Literal
 from datetime import datetime
 
 class AnalysisRequest(BaseModel):
     batch_size: int = Field(default=10, ge=1, le=50)
+    # "batch": stage-at-a-time LangGraph run; "stream": per-item pipeline, saved as items finish
+    mode: Literal["batch", "stream"] = "batch"
 
 class AIAnalysisResult(BaseModel):
     category: Literal["technology", "startup", "ai", "business", "marketing", "other"]
@@ -15,12 +17,40 @@ class AIAnalysisResult(BaseModel):
     reasoning: str
     rewrite_needed: bool
 
+class ScoringPolicy(BaseModel):
+    """
+    Weights and thresholds turning an AIAnalysisResult into a decision (see app/scoring.py).
+    """
+    quality_weight: float = 0.4
+    engagement_weight: float = 0.3
+    virality_weight: float = 0.3
+    reject_threshold: float = 40
+    approve_threshold: float = 70
+    spam_override_score: float = 80
+
 class ProcessingStats(BaseModel):
     processed: int = 0
     approved: int = 0
     review: int = 0
     rejected: int = 0
     ai_errors: int = 0
+    retries: int = 0
+    reasks: int = 0 # Calls repeated because the output could not be parsed or repaired
+    deferred: int = 0 # Returned to pending after exhausting retries
+    save_errors: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    resumed: int = 0 # Analyses reused from an interrupted run's checkpoint
+    near_duplicates: int = 0
+    prefiltered: int = 0 # Rejected by the local pre-filter without an LLM call (also counted in rejected)
+    triaged: int = 0 # Decided by the triage model alone
+    escalated: int = 0 # Sent on to the full model
+    llm_calls: int = 0
+    llm_latency_ms_total: int = 0
+    llm_latency_ms_max: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    stage_timings_ms: Dict[str, int] = Field(default_factory=dict)
     execution_time_ms: int = 0
 
 class AnalysisResponse(ProcessingStats):
@@ -30,6 +60,20 @@ class AnalysisResponse(ProcessingStats):
     """
     pass
 
+class AnalysisJob(BaseModel):
+    """
+    Status of a background analysis run, returned by POST /api/analyze
+    and polled via GET /api/analyze/{job_id}.
+    """
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    stages: Dict[str, Literal["pending", "running", "completed"]]
+    items: int = 0
+    stats: Optional[ProcessingStats] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
 class VerificationResult(BaseModel):
     is_valid: bool
     reasons: List[str] = []
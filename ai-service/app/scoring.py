@@ -1,28 +1,62 @@
-from app.schemas import AIAnalysisResult, ProcessingStats
+from app.schemas import AIAnalysisResult, ProcessingStats, ScoringPolicy
+from app.config import (
+    SCORE_WEIGHT_QUALITY, SCORE_WEIGHT_ENGAGEMENT, SCORE_WEIGHT_VIRALITY,
+    SCORE_REJECT_THRESHOLD, SCORE_APPROVE_THRESHOLD, SCORE_SPAM_OVERRIDE
+)
 
-def calculate_final_score(analysis: AIAnalysisResult) -> float:
+# The live policy; app/rescore.py re-applies a (possibly different) one to stored analyses
+DEFAULT_POLICY = ScoringPolicy(
+    quality_weight=SCORE_WEIGHT_QUALITY,
+    engagement_weight=SCORE_WEIGHT_ENGAGEMENT,
+    virality_weight=SCORE_WEIGHT_VIRALITY,
+    reject_threshold=SCORE_REJECT_THRESHOLD,
+    approve_threshold=SCORE_APPROVE_THRESHOLD,
+    spam_override_score=SCORE_SPAM_OVERRIDE
+)
+
+# Decision thresholds: below REJECT_THRESHOLD -> rejected, at/above APPROVE_THRESHOLD -> approved
+REJECT_THRESHOLD = DEFAULT_POLICY.reject_threshold
+APPROVE_THRESHOLD = DEFAULT_POLICY.approve_threshold
+
+def decision_reasons(policy: ScoringPolicy) -> dict[str, str]:
+    """decision_reason texts per rule, shared with the vectorized re-scorer."""
+    return {
+        "spam": "Spam detected in reasoning",
+        "low": f"Score < {policy.reject_threshold:g}",
+        "middle": f"Score between {policy.reject_threshold:g} and {policy.approve_threshold:g}",
+        "high": f"Score >= {policy.approve_threshold:g}",
+        "rewrite": "High score but rewrite needed"
+    }
+
+def calculate_final_score(analysis: AIAnalysisResult, policy: ScoringPolicy = DEFAULT_POLICY) -> float:
     """
     Calculates the deterministic final score based on weighted components.
-    Formula: (quality * 0.4) + (engagement * 0.3) + (virality * 0.3)
+    Formula (default policy): (quality * 0.4) + (engagement * 0.3) + (virality * 0.3)
     Output is clamped between 0 and 100.
     """
     try:
         score = (
-            (analysis.content_quality_score * 0.4) +
-            (analysis.engagement_score * 0.3) +
-            (analysis.virality_probability * 0.3)
+            (analysis.content_quality_score * policy.quality_weight) +
+            (analysis.engagement_score * policy.engagement_weight) +
+            (analysis.virality_probability * policy.virality_weight)
         )
         return max(0.0, min(100.0, round(score, 2)))
     except Exception as e:
         print(f"Error calculating score: {e}")
         return 0.0
 
-def make_decision(final_score: float, rewrite_needed: bool, reasoning: str, analysis: AIAnalysisResult) -> tuple[str, str]:
+def make_decision(
+    final_score: float,
+    rewrite_needed: bool,
+    reasoning: str,
+    analysis: AIAnalysisResult,
+    policy: ScoringPolicy = DEFAULT_POLICY
+) -> tuple[str, str]:
     """
     Determines the final status (approved, review, rejected) based on the score and business rules.
     Returns: (status, decision_reason)
     """
-    
+    reasons = decision_reasons(policy)
     status = "rejected"
     decision_reason = f"Score {final_score} below threshold"
 
@@ -30,19 +64,19 @@ def make_decision(final_score: float, rewrite_needed: bool, reasoning: str, anal
     # The prompt says: "If LLM reasoning flags spam -> force reject"
     # We'll assume if the reasoning explicitly starts with "SPAM" or similar. 
     # But let's rely mostly on the score as per the prompt's main logic.
-    if "spam" in reasoning.lower() and final_score < 80: # Safety: only reject for spam if score isn't super high (false positive check)
-        return "rejected", "Spam detected in reasoning"
+    if "spam" in reasoning.lower() and final_score < policy.spam_override_score: # Safety: only reject for spam if score isn't super high (false positive check)
+        return "rejected", reasons["spam"]
 
     # Rule 2: Score thresholds
-    if final_score < 40:
+    if final_score < policy.reject_threshold:
         status = "rejected"
-        decision_reason = "Score < 40"
-    elif 40 <= final_score < 70:
+        decision_reason = reasons["low"]
+    elif policy.reject_threshold <= final_score < policy.approve_threshold:
         status = "review"
-        decision_reason = "Score between 40 and 70"
-    else: # >= 70
+        decision_reason = reasons["middle"]
+    else: # >= approve_threshold
         status = "approved"
-        decision_reason = "Score >= 70"
+        decision_reason = reasons["high"]
 
     # Rule 3: Rewrite needed safeguard
     # "If rewrite_needed = true AND score >= 60 -> allow review"
@@ -58,10 +92,17 @@ def make_decision(final_score: float, rewrite_needed: bool, reasoning: str, anal
     # Let's assume: If score >= 70 (Approved) AND Rewrite Needed -> Downgrade to Review.
     if status == "approved" and rewrite_needed:
         status = "review"
-        decision_reason = "High score but rewrite needed"
+        decision_reason = reasons["rewrite"]
         
     # Another interpretation: If score >= 60 and < 70 (Review), it stays review.
     # If score >= 60 (so 60-100) -> ensure at least Review.
     # If score was 75 (Approved) -> Downgrade to Review? Yes, that makes sense for "Rewrite Needed".
     
-    return status, decision_reason
\ No newline at end of file
+    return status, decision_reason
+
+def is_near_threshold(final_score: float, margin: float) -> bool:
+    """
+    True if the score is within `margin` points of a decision threshold,
+    i.e. a small scoring error could flip the decision.
+    """
+    return any(abs(final_score - threshold) < margin for threshold in (REJECT_THRESHOLD, APPROVE_THRESHOLD))
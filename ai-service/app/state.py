@@ -1,6 +1,9 @@
 from typing import TypedDict, List, Dict, Any, Optional
 from app.schemas import ProcessingStats
 
+# Graph node names in execution order (used for job progress reporting)
+GRAPH_STAGES = ["fetch", "validate", "dedup", "prefilter", "analyze", "score", "save"]
+
 class ContentItem(TypedDict):
     id: str
     raw_content: str
@@ -13,9 +16,14 @@ class ContentItem(TypedDict):
     decision: str # approved, review, rejected
     decision_reason: str
     retry_count: int
+    duplicate_of: str # id of the near-duplicate original, "" if none
+    near_dup_signature: List[int] # MinHash signature, [] if not computed
+    prompt_content: str # Compressed text sent to the LLM
 
 class GraphState(TypedDict):
     batch_size: int
     batch_id: str
+    started_at: str # ISO timestamp, set by the fetch node if not provided
+    resume_from: Optional[Dict[str, Any]] # Interrupted run to resume (see RunCheckpoint), None for a fresh claim
     content_batch: List[ContentItem]
     stats: Dict[str, Any] # ProcessingStats dict
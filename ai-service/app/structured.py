@@ -0,0 +1,136 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
+from app.schemas import AIAnalysisResult
+from app.metrics import OUTPUT_REPAIRS
+
+class AnalysisParseError(ValueError):
+    pass
+
+CATEGORIES = {"technology", "startup", "ai", "business", "marketing", "other"}
+CATEGORY_ALIASES = {
+    "tech": "technology",
+    "artificial intelligence": "ai",
+    "a.i.": "ai",
+    "machine learning": "ai",
+    "startups": "startup",
+    "entrepreneurship": "startup",
+    "finance": "business",
+    "marketing & growth": "marketing"
+}
+SCORE_FIELDS = ("content_quality_score", "engagement_score", "virality_probability")
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.I)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERAL = re.compile(r"\b(True|False|None)\b")
+
+def repair_json(text: str) -> Any:
+    """
+    Parses model output as JSON, fixing common defects on the way: code fences,
+    prose around the JSON, trailing commas and Python literals.
+    """
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    fixed = _FENCE.sub("", text)
+    if fixed != text:
+        OUTPUT_REPAIRS.labels(fix="fence").inc()
+    starts = [i for i in (fixed.find("{"), fixed.find("[")) if i >= 0]
+    if starts:
+        start = min(starts)
+        end = fixed.rfind("}" if fixed[start] == "{" else "]")
+        if end > start and (start > 0 or end < len(fixed) - 1):
+            fixed = fixed[start:end + 1]
+            OUTPUT_REPAIRS.labels(fix="extract").inc()
+    for fix, pattern, replacement in (
+        ("trailing_comma", _TRAILING_COMMA, r"\1"),
+        ("python_literal", _PYTHON_LITERAL, lambda m: {"True": "true", "False": "false", "None": "null"}[m.group(1)])
+    ):
+        try:
+            return json.loads(fixed)
+        except ValueError:
+            repaired = pattern.sub(replacement, fixed)
+            if repaired != fixed:
+                OUTPUT_REPAIRS.labels(fix=fix).inc()
+                fixed = repaired
+    try:
+        return json.loads(fixed)
+    except ValueError as e:
+        raise AnalysisParseError(f"Unrepairable JSON output: {e}") from e
+
+def failed_generation(error: Exception) -> Optional[str]:
+    """
+    The output Groq refused to return in JSON mode (a 400 with code
+    json_validate_failed), or None for any other error.
+    """
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        body = body.get("error", body)
+    if isinstance(body, dict) and body.get("code") == "json_validate_failed":
+        return body.get("failed_generation") or ""
+    return None
+
+def _to_score(value: Any) -> int:
+    if isinstance(value, bool) or value is None:
+        raise ValueError(f"not a score: {value!r}")
+    if isinstance(value, str):
+        value = value.strip().rstrip("%")
+    score = round(float(value))
+    if not 0 <= score <= 100:
+        OUTPUT_REPAIRS.labels(fix="score_range").inc()
+    return max(0, min(100, score))
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "y", "1")
+    return bool(value)
+
+def coerce_analysis(data: Any) -> Dict[str, Any]:
+    """
+    Normalizes one analysis object into a valid AIAnalysisResult dict: key and
+    category casing, category aliases, numeric strings and out-of-range scores,
+    string booleans and lists. Raises AnalysisParseError if scores are missing.
+    """
+    if not isinstance(data, dict):
+        raise AnalysisParseError(f"Expected a JSON object, got {type(data).__name__}")
+    data = {str(k).strip().lower().replace(" ", "_"): v for k, v in data.items()}
+    try:
+        category = str(data.get("category") or "other").strip().lower()
+        category = CATEGORY_ALIASES.get(category, category)
+        if category not in CATEGORIES:
+            OUTPUT_REPAIRS.labels(fix="category").inc()
+            category = "other"
+        platforms = data.get("recommended_platforms") or []
+        if isinstance(platforms, str):
+            platforms = [p.strip() for p in platforms.split(",") if p.strip()]
+        return AIAnalysisResult(
+            category=category,
+            **{field: _to_score(data.get(field)) for field in SCORE_FIELDS},
+            recommended_platforms=[str(p) for p in platforms],
+            content_type_recommendation=str(data.get("content_type_recommendation") or ""),
+            reasoning=str(data.get("reasoning") or ""),
+            rewrite_needed=_to_bool(data.get("rewrite_needed", False))
+        ).model_dump()
+    except (ValueError, TypeError, ValidationError) as e:
+        raise AnalysisParseError(f"Invalid analysis: {e}") from e
+
+def parse_analysis(message) -> Dict[str, Any]:
+    """Output step of the single-item chain: chat message -> AIAnalysisResult dict."""
+    return coerce_analysis(repair_json(message.content))
+
+def parse_packed(message) -> List[Any]:
+    """
+    Output step of the packed chain: the raw per-item entries, from either a bare
+    array or JSON mode's {"items": [...]} object. Entries are coerced by the caller
+    so one bad entry doesn't sink the pack.
+    """
+    data = repair_json(message.content)
+    if isinstance(data, dict):
+        data = data.get("items")
+    if not isinstance(data, list):
+        raise AnalysisParseError("Packed output has no item list")
+    return data
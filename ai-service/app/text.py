@@ -0,0 +1,175 @@
+import re
+from collections import Counter
+from html import unescape
+from html.parser import HTMLParser
+from typing import List, Tuple
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    """The tiktoken encoding, loaded on first use; None if unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            # Llama 3's tokenizer is a tiktoken BPE extending cl100k's vocabulary, so counts track closely
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception: # Not installed, or the BPE file can't be downloaded
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+# Containers that never hold article body text
+_SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "button", "svg", "iframe", "select"}
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+_BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "td", "br", "tr"}
+# Class/id/role tokens marking boilerplate, whole tokens only ("share-bar" matches, "has-sidebar" doesn't)
+_BOILERPLATE_ATTR = re.compile(
+    r"^(share|social|nav|navbar|menu|footer|cookie|cookies|subscribe|newsletter|related|comment|comments|promo|banner|sidebar|breadcrumb|breadcrumbs)([-_].*)?$",
+    re.I
+)
+# Page-level wrappers: their classes describe the page (e.g. "has-sidebar"), not boilerplate
+_WRAPPER_TAGS = {"html", "body", "main", "article"}
+# Opening one of these closes an open element of the same kind, as HTML does for an unclosed <p> or <li>
+_IMPLICIT_CLOSE_TAGS = {"p", "li", "td", "th", "tr", "dt", "dd", "option"}
+# Extraction keeping less than this share of a long document's text is treated as a misparse
+_MIN_KEPT_RATIO = 0.1
+_MIN_FALLBACK_CHARS = 200
+_SCRIPT_STYLE = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>", re.I | re.S)
+# Short lines starting with one of these whole phrases are widget/footer text ("Share this", not "Shareholders ...")
+_BOILERPLATE_LINE = re.compile(
+    r"^(share|tweet|follow us|subscribe|sign up|read more|click here|advertisement|related( articles| posts)?|"
+    r"cookies? (policy|settings|preferences|consent)|we use cookies|this (web)?site uses cookies|all rights reserved|©)(?=\W|$)",
+    re.I
+)
+_BOILERPLATE_LINE_MAX_WORDS = 8
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'“])")
+_WORD = re.compile(r"[a-z0-9']+")
+_STOPWORDS = set(
+    "a an and are as at be but by for from has have he her his i in is it its of on or our she so that the their "
+    "them they this to was we were what when which who will with you your not can all more about into than then".split()
+)
+
+class _MainTextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[str] = []
+        self._current: List[str] = []
+        self._stack: List[Tuple[str, bool]] = [] # Per open element: (tag, is it (inside) skipped content?)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self._flush()
+        if tag in _VOID_TAGS:
+            return
+        if tag in _IMPLICIT_CLOSE_TAGS and self._stack and self._stack[-1][0] == tag:
+            self._stack.pop()
+        skipped = (self._stack and self._stack[-1][1]) or tag in _SKIP_TAGS
+        if not skipped and tag not in _WRAPPER_TAGS:
+            tokens = " ".join(v for k, v in attrs if k in ("class", "id", "role") and v).split()
+            skipped = any(_BOILERPLATE_ATTR.match(token) for token in tokens)
+        self._stack.append((tag, bool(skipped)))
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS:
+            return
+        if tag in _BLOCK_TAGS:
+            self._flush()
+        # Close back to the matching element, so unclosed children don't leak their state; stray end tags are ignored
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                break
+
+    def handle_data(self, data):
+        if not (self._stack and self._stack[-1][1]):
+            self._current.append(data)
+
+    def _flush(self):
+        text = re.sub(r"\s+", " ", "".join(self._current)).strip()
+        if text:
+            self.blocks.append(text)
+        self._current = []
+
+def extract_main_text(raw: str) -> str:
+    """
+    HTML -> main article text: drops scripts, navigation, share widgets and other
+    boilerplate containers and lines, and normalizes whitespace. Plain text passes through.
+    """
+    if "<" in raw and ">" in raw:
+        parser = _MainTextExtractor()
+        try:
+            parser.feed(raw)
+            parser.close()
+            parser._flush()
+            blocks = parser.blocks
+        except Exception:
+            return _strip_tags(raw) # Malformed markup
+    else:
+        blocks = [unescape(raw)]
+    if len(blocks) > 1: # A lone block is the whole item (e.g. plain text), never boilerplate
+        kept = [b for b in blocks if not _is_boilerplate_line(b)]
+    else:
+        kept = blocks
+    text = re.sub(r"\s+", " ", " ".join(kept)).strip()
+    if "<" in raw and len(raw) >= _MIN_FALLBACK_CHARS:
+        stripped = _strip_tags(raw)
+        if len(stripped) >= _MIN_FALLBACK_CHARS and len(text) < _MIN_KEPT_RATIO * len(stripped):
+            # Almost everything was classed as boilerplate: better some noise than a dropped article
+            return stripped
+    return text
+
+def _is_boilerplate_line(block: str) -> bool:
+    return len(block.split()) < _BOILERPLATE_LINE_MAX_WORDS and bool(_BOILERPLATE_LINE.match(block))
+
+def _strip_tags(raw: str) -> str:
+    text = re.sub(r"<[^>]+>", " ", _SCRIPT_STYLE.sub(" ", raw))
+    return re.sub(r"\s+", " ", unescape(text)).strip()
+
+def count_tokens(text: str) -> int:
+    """
+    Token count for the analysis model (tiktoken when available, else ~4 chars/token).
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+def compress_to_budget(text: str, token_budget: int) -> str:
+    """
+    Extractive compression: if `text` exceeds `token_budget`, keeps the highest
+    scoring sentences (term salience with a lead bias, lede always kept) in their
+    original order until the budget is filled.
+    """
+    if token_budget <= 0 or count_tokens(text) <= token_budget:
+        return text
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+    if len(sentences) <= 1:
+        return _truncate_tokens(text, token_budget)
+
+    words_per_sentence = [[w for w in _WORD.findall(s.lower()) if w not in _STOPWORDS] for s in sentences]
+    frequencies = Counter(w for words in words_per_sentence for w in words)
+    scores = []
+    for index, words in enumerate(words_per_sentence):
+        salience = sum(frequencies[w] for w in set(words)) / (len(words) ** 0.5) if words else 0.0
+        lead_bias = 1.0 + 1.0 / (1 + index)
+        scores.append(0.0 if len(words) < 3 else salience * lead_bias)
+    scores[0] = float("inf") # The lede carries the story
+
+    chosen, used = set(), 0
+    for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        tokens = count_tokens(sentences[index]) + 1
+        if used + tokens > token_budget:
+            continue
+        chosen.add(index)
+        used += tokens
+    if not chosen:
+        return _truncate_tokens(sentences[0], token_budget)
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+def _truncate_tokens(text: str, token_budget: int) -> str:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:token_budget])
+    return text[:token_budget * 4]
@@ -0,0 +1,304 @@
+"""
+Local stand-ins for Supabase and Groq, so the analysis pipeline can be
+benchmarked without credentials or network access.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+_WORDS = (
+    "startup funding ai model launch market growth founder product team revenue cloud data "
+    "platform users enterprise open source release benchmark pricing strategy hiring chip "
+    "research agents developer api security privacy regulation acquisition valuation seed"
+).split()
+
+def fake_article(rng: random.Random, words: int) -> str:
+    return "<p>" + " ".join(rng.choice(_WORDS) for _ in range(words)) + "</p>"
+
+# Columns returned by claim_pending_content / claim_prioritized_content / reclaim_content
+CLAIM_COLUMNS = ("id", "raw_content", "summary", "source_url", "created_at", "ai_retry_count")
+_SOURCES = ("newsapi", "hackernews", "techcrunch", "rss", "automation")
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+class _Call:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self) -> _Result:
+        return _Result(self._fn())
+
+class _TableQuery:
+    """Just enough of the PostgREST builder for the pipeline's write paths."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = None
+        self._payload = None
+        self._filters = []
+
+    def insert(self, payload):
+        self._op, self._payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "id"):
+        self._op, self._payload = "upsert", payload
+        return self
+
+    def update(self, payload):
+        self._op, self._payload = "update", payload
+        return self
+
+    def eq(self, column: str, value):
+        self._filters.append((column, value))
+        return self
+
+    def execute(self) -> _Result:
+        self._db._sleep()
+        with self._db._lock:
+            if self._table == "content_queue" and self._op == "update":
+                matched = [row for row in self._db.content_queue.values() if all(row.get(c) == v for c, v in self._filters)]
+                for row in matched:
+                    row.update(self._payload)
+                return _Result([dict(row) for row in matched])
+            self._db.tables.setdefault(self._table, []).append(self._payload)
+        return _Result([self._payload])
+
+class FakeSupabase:
+    """
+    In-memory content_queue plus the RPCs the pipeline calls, with optional
+    per-request latency to mimic network round trips.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.content_queue: Dict[str, Dict[str, Any]] = {}
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def seed_pending(self, count: int, words: int = 250):
+        base = datetime.now()
+        with self._lock:
+            for n in range(count):
+                row_id = str(uuid.uuid4())
+                self.content_queue[row_id] = {
+                    "id": row_id,
+                    "raw_content": fake_article(self._rng, words),
+                    "summary": None,
+                    "source_url": f"https://example.com/{row_id}",
+                    "status": "pending",
+                    "created_at": (base + timedelta(microseconds=n)).isoformat(timespec="microseconds"),
+                    "source": self._rng.choice(_SOURCES),
+                    "published_at": (base - timedelta(hours=self._rng.uniform(0, 72))).isoformat(timespec="microseconds"),
+                    "viral_score": self._rng.choice((0, 0, 0, 20, 50)),
+                    "ai_status": None,
+                    "analyzed_at": None,
+                    "ai_retry_count": 0,
+                    "claimed_by": None,
+                    "lease_expires_at": None
+                }
+
+    def table(self, name: str) -> _TableQuery:
+        return _TableQuery(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> _Call:
+        handlers = {
+            "claim_pending_content": self._claim_pending_content,
+            "claim_prioritized_content": self._claim_prioritized_content,
+            "source_approval_rates": self._source_approval_rates,
+            "reclaim_content": self._reclaim_content,
+            "save_analysis_batch": self._save_analysis_batch,
+            "extend_content_lease": self._extend_content_lease
+        }
+        if name not in handlers:
+            raise ValueError(f"FakeSupabase has no RPC {name}")
+        return _Call(lambda: handlers[name](**params))
+
+    def _claim_pending_content(
+        self,
+        p_worker_id: str,
+        p_limit: int,
+        p_lease_seconds: int,
+        p_after_created_at: Optional[str] = None,
+        p_after_id: Optional[str] = None
+    ):
+        self._sleep()
+        now = datetime.now()
+        with self._lock:
+            claimable = [
+                row for row in self.content_queue.values()
+                if (row["status"] == "pending"
+                    or (row["status"] == "processing" and row["lease_expires_at"] < now))
+                and (p_after_created_at is None or (row["created_at"], row["id"]) > (p_after_created_at, p_after_id))
+            ]
+            claimable.sort(key=lambda row: (row["created_at"], row["id"]))
+            return self._lease(claimable[:p_limit], p_worker_id, p_lease_seconds, now)
+
+    def _lease(self, rows: List[Dict[str, Any]], worker_id: str, lease_seconds: int, now: datetime):
+        for row in rows:
+            row["status"] = "processing"
+            row["claimed_by"] = worker_id
+            row["lease_expires_at"] = now + timedelta(seconds=lease_seconds)
+        return [{column: row[column] for column in CLAIM_COLUMNS} for row in rows]
+
+    def _claim_prioritized_content(
+        self,
+        p_worker_id: str,
+        p_limit: int,
+        p_lease_seconds: int,
+        p_half_life_hours: float,
+        p_max_wait_seconds: int,
+        p_source_weights: Optional[Dict[str, float]] = None
+    ):
+        self._sleep()
+        now = datetime.now()
+        deadline = now - timedelta(seconds=p_max_wait_seconds)
+        weights = p_source_weights or {}
+
+        def rank(row):
+            created_at = datetime.fromisoformat(row["created_at"])
+            if created_at < deadline:
+                return (0, created_at.timestamp(), row["id"])
+            published_at = min(datetime.fromisoformat(row["published_at"] or row["created_at"]), created_at)
+            weight = max(weights.get(row["source"], 1.0) * (1 + max(row["viral_score"], 0) / 100), 0.01)
+            effective_at = published_at.timestamp() + p_half_life_hours * 3600 * math.log2(weight)
+            return (1, -effective_at, row["id"])
+
+        with self._lock:
+            claimable = [
+                row for row in self.content_queue.values()
+                if row["status"] == "pending"
+                or (row["status"] == "processing" and row["lease_expires_at"] < now)
+            ]
+            claimable.sort(key=rank)
+            return self._lease(claimable[:p_limit], p_worker_id, p_lease_seconds, now)
+
+    def _source_approval_rates(self, p_since: str):
+        self._sleep()
+        rates: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for row in self.content_queue.values():
+                if row["ai_status"] not in ("approved", "review", "rejected") or row["analyzed_at"] < p_since:
+                    continue
+                rate = rates.setdefault(row["source"], {"source": row["source"], "decided": 0, "approved": 0})
+                rate["decided"] += 1
+                rate["approved"] += row["ai_status"] == "approved"
+        return list(rates.values())
+
+    def _reclaim_content(self, p_worker_id: str, p_previous_worker_id: str, p_ids: List[str], p_lease_seconds: int):
+        self._sleep()
+        now = datetime.now()
+        with self._lock:
+            reclaimed = []
+            for content_id in p_ids:
+                row = self.content_queue.get(content_id)
+                if row and row["status"] == "processing" and row["claimed_by"] == p_previous_worker_id:
+                    row["claimed_by"] = p_worker_id
+                    row["lease_expires_at"] = now + timedelta(seconds=p_lease_seconds)
+                    reclaimed.append({column: row[column] for column in CLAIM_COLUMNS})
+            return reclaimed
+
+    def _save_analysis_batch(self, p_rows: List[Dict[str, Any]], p_worker_id: str):
+        self._sleep()
+        failures = []
+        with self._lock:
+            for r in p_rows:
+                row = self.content_queue.get(r["id"])
+                if row is None or row["claimed_by"] != p_worker_id:
+                    failures.append({"content_id": r["id"], "error": f"lease lost: row is no longer claimed by {p_worker_id}"})
+                    continue
+                row.update({k: v for k, v in r.items() if k not in ("id", "analysis")})
+                row["claimed_by"] = None
+                row["lease_expires_at"] = None
+                if r.get("analysis"):
+                    self.tables.setdefault("content_ai_analysis", []).append({"content_id": r["id"], **r["analysis"]})
+        return failures
+
+    def _extend_content_lease(self, p_worker_id: str, p_ids: List[str], p_lease_seconds: int):
+        self._sleep()
+        now = datetime.now()
+        with self._lock:
+            renewed = []
+            for content_id in p_ids:
+                row = self.content_queue.get(content_id)
+                if row and row["status"] == "processing" and row["claimed_by"] == p_worker_id:
+                    row["lease_expires_at"] = now + timedelta(seconds=p_lease_seconds)
+                    renewed.append({"id": content_id})
+            return renewed
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model returning plausible AIAnalysisResult JSON (or {"items": [...]} for packed
+    prompts) after a gaussian latency, failing with probability `failure_rate`.
+    """
+    latency_ms: float = 800.0
+    jitter_ms: float = 300.0
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _delay(self) -> float:
+        return max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def _analysis(self) -> Dict[str, Any]:
+        return {
+            "category": self._rng.choice(["technology", "startup", "ai", "business", "marketing", "other"]),
+            "content_quality_score": self._rng.randint(20, 95),
+            "engagement_score": self._rng.randint(20, 95),
+            "virality_probability": self._rng.randint(10, 90),
+            "recommended_platforms": ["linkedin", "twitter"],
+            "content_type_recommendation": "text_post",
+            "reasoning": "Synthetic benchmark analysis.",
+            "rewrite_needed": self._rng.random() < 0.2
+        }
+
+    def _respond(self, messages) -> ChatResult:
+        if self._rng.random() < self.failure_rate:
+            raise RuntimeError("Fake provider error")
+        prompt = "\n".join(str(m.content) for m in messages)
+        items = len(re.findall(r"\[ITEM \d+\]", prompt))
+        if items:
+            content = json.dumps({"items": [{"item": n, **self._analysis()} for n in range(1, items + 1)]})
+        else:
+            content = json.dumps(self._analysis())
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+        message = AIMessage(content=content, usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._respond(messages)
@@ -0,0 +1,184 @@
+"""
+Offline throughput benchmark for the analysis pipeline.
+
+Runs the graph (or the streaming pipeline) against FakeSupabase and FakeChatModel
+for every batch size x concurrency combination, each in a fresh subprocess so
+settings and peak memory are isolated, then compares against a stored baseline.
+
+    cd ai-service
+    python -m benchmarks.run --batch-sizes 10 50 --concurrency 1 5 10
+    python -m benchmarks.run --save-baseline   # record the current numbers
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Dict, Any
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_case(args) -> Dict[str, Any]:
+    """
+    Executes one configuration in this process. Settings arrive via environment
+    variables set by the parent, before any app module is imported.
+    """
+    from benchmarks.fakes import FakeSupabase, FakeChatModel
+    from app.config import use_clients
+    from app.graph import app_graph
+    from app.pipeline import run_streaming_batch
+    from app.runtime import run_async
+    from app.schemas import ProcessingStats
+
+    db = FakeSupabase(latency_ms=args.db_latency_ms, seed=args.seed)
+    use_clients(
+        supabase_client=db,
+        llm_factory=lambda: FakeChatModel(
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            failure_rate=args.failure_rate,
+            seed=args.seed
+        )
+    )
+
+    latencies, items = [], 0
+    for _ in range(args.repeats):
+        db.seed_pending(args.batch_size, words=args.words)
+        start = time.perf_counter()
+        if args.mode == "stream":
+            stats = run_async(run_streaming_batch(args.batch_size))
+        else:
+            final_state = app_graph.invoke({
+                "batch_size": args.batch_size,
+                "batch_id": None,
+                "content_batch": [],
+                "stats": ProcessingStats().model_dump()
+            })
+            stats = final_state["stats"]
+        latencies.append(time.perf_counter() - start)
+        items += args.batch_size
+
+    return {
+        "items_per_sec": round(items / sum(latencies), 2),
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "last_stats": stats
+    }
+
+def spawn_case(args, batch_size: int, concurrency: int, data_dir: str) -> Dict[str, Any]:
+    env = dict(os.environ)
+    env.update({
+        "ANALYSIS_CONCURRENCY": str(concurrency),
+        "GROQ_REQUESTS_PER_MINUTE": str(args.rpm),
+        "GROQ_TOKENS_PER_MINUTE": str(args.tpm),
+        "AI_SERVICE_DATA_DIR": data_dir
+    })
+    cmd = [
+        sys.executable, "-m", "benchmarks.run", "--case",
+        "--mode", args.mode,
+        "--batch-size", str(batch_size),
+        "--repeats", str(args.repeats),
+        "--words", str(args.words),
+        "--llm-latency-ms", str(args.llm_latency_ms),
+        "--llm-jitter-ms", str(args.llm_jitter_ms),
+        "--failure-rate", str(args.failure_rate),
+        "--db-latency-ms", str(args.db_latency_ms),
+        "--seed", str(args.seed)
+    ]
+    cwd = os.path.join(os.path.dirname(__file__), "..")
+    output = subprocess.run(cmd, env=env, cwd=cwd, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"Benchmark case failed:\n{output.stderr}")
+    # The pipeline prints progress; the result is the last line
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def find_regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if result["items_per_sec"] < base["items_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key}: items/sec {result['items_per_sec']} < baseline {base['items_per_sec']}")
+        if result["p95_s"] > base["p95_s"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {result['p95_s']}s > baseline {base['p95_s']}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["batch", "stream"], default="batch")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--words", type=int, default=250, help="Words per synthetic article")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter-ms", type=float, default=300)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--db-latency-ms", type=float, default=20)
+    parser.add_argument("--rpm", type=int, default=0, help="Requests/min limit (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokens/min limit (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown vs baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    # Internal: run a single case in this process
+    parser.add_argument("--case", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--batch-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args)))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch_size in args.batch_sizes:
+            for concurrency in args.concurrency:
+                key = f"{args.mode}/batch={batch_size}/concurrency={concurrency}"
+                data_dir = os.path.join(tmp, key.replace("/", "_"))
+                result = spawn_case(args, batch_size, concurrency, data_dir)
+                result.pop("last_stats", None)
+                results[key] = result
+                print(
+                    f"{key:<40} {result['items_per_sec']:>8} items/s  "
+                    f"p50 {result['p50_s']}s  p95 {result['p95_s']}s  p99 {result['p99_s']}s  "
+                    f"rss {result['peak_rss_mb']}MB"
+                )
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline stored; run with --save-baseline to record one.")
+        return
+    with open(args.baseline) as f:
+        regressions = find_regressions(results, json.load(f), args.tolerance)
+    if regressions:
+        print("REGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Cold-start check: median time to import the API (`main`) in fresh interpreters,
+compared against an import-time budget. Heavy dependencies (LangChain,
+LangGraph, Supabase, NumPy, tiktoken) should only load when the first batch runs.
+
+    cd ai-service
+    python -m benchmarks.startup                  # fails if over budget
+    python -m benchmarks.startup --budget-ms 500 --runs 9
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "750"))
+# Must stay out of the API's import path
+LAZY_MODULES = ["langgraph", "langchain_groq", "supabase", "numpy", "tiktoken", "app.graph", "app.nodes"]
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(elapsed)
+print(",".join(m for m in {lazy!r} if m in sys.modules))
+"""
+
+def measure(module: str, runs: int) -> Tuple[List[float], List[str]]:
+    """
+    Import time of `module` in ms for each of `runs` fresh interpreters, and the
+    LAZY_MODULES that importing it pulled in.
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+            cwd=SERVICE_DIR, capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        timings.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else ""
+    return timings, [m for m in loaded.split(",") if m]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    timings, eager = measure(args.module, max(1, args.runs))
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.0f}ms over {len(timings)} runs "
+          f"(min {min(timings):.0f}ms, max {max(timings):.0f}ms), budget {args.budget_ms:.0f}ms")
+    failed = False
+    if eager:
+        print(f"Loaded at import, should be lazy: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print("Over budget.")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,71 @@
+import os
 import pydantic
 import uvicorn
 from datetime import datetime
-from fastapi import FastAPI, HTTPException
-from app.graph import app_graph
-from app.schemas import AnalysisRequest, AnalysisResponse, ProcessingStats
+from fastapi import FastAPI, HTTPException, Response
+from prometheus_client import CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client import multiprocess
+from app.jobs import job_manager, JobQueueFull
+from app.schemas import AnalysisRequest, AnalysisJob
 
 app = FastAPI(title="SocialSync AI Decision Layer", version="1.0")
 
+@app.on_event("startup")
+def resume_interrupted_jobs():
+    """
+    Resumes batches a previous process on this host left unfinished (see app/checkpoint.py).
+    """
+    for job in job_manager.resume_interrupted():
+        print(f"Resuming interrupted analysis job {job.job_id}")
+
 @app.get("/")
 def read_root():
     return {
         "message": "SocialSync AI Decision Layer is running",
         "docs": "/docs",
         "health": "/health",
-        "analyze": "/api/analyze (POST)"
+        "metrics": "/metrics",
+        "analyze": "/api/analyze (POST)",
+        "analyze_status": "/api/analyze/{job_id} (GET)"
     }
 
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "timestamp": str(datetime.now())}
 
-@app.post("/api/analyze", response_model=AnalysisResponse)
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics: stage, batch and LLM call latency histograms plus token counters.
+    Under gunicorn, set PROMETHEUS_MULTIPROC_DIR so all workers are aggregated.
+    """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+@app.post("/api/analyze", response_model=AnalysisJob, status_code=202)
 def analyze_content(request: AnalysisRequest):
     """
-    Triggers the AI analysis workflow for pending content.
+    Queues the AI analysis workflow for pending content and returns immediately.
+    Poll GET /api/analyze/{job_id} for per-stage progress and final stats.
     """
+    print(f"Received {request.mode} analysis request for batch size {request.batch_size}")
     try:
-        print(f"Received analysis request for batch size {request.batch_size}")
-        
-        # Initial state
-        initial_state = {
-            "batch_size": request.batch_size,
-            "batch_id": None,
-            "content_batch": [],
-            "stats": ProcessingStats().model_dump()
-        }
-        
-        # Run graph (Sync execution in threadpool)
-        final_state = app_graph.invoke(initial_state)
-        
-        stats = final_state["stats"]
-        return AnalysisResponse(**stats)
-        
-    except Exception as e:
-        print(f"Error in analyze_content: {e}")
-        # Return error response structure if possible, or raise HTTP exc
-        raise HTTPException(status_code=500, detail=str(e))
+        return job_manager.submit(request.batch_size, request.mode)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
 
-import os
+@app.get("/api/analyze/{job_id}", response_model=AnalysisJob)
+def get_analysis_job(job_id: str):
+    """
+    Returns the progress of an analysis job.
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
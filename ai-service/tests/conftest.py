@@ -0,0 +1,39 @@
+import os
+import tempfile
+import pytest
+
+# Before any app module reads its config: local state in a scratch dir, no Groq rate limits
+os.environ.setdefault("AI_SERVICE_DATA_DIR", tempfile.mkdtemp(prefix="ai-service-tests-"))
+os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("GROQ_TOKENS_PER_MINUTE", "0")
+
+import app.config as config # Only after the environment above is set
+import app.jobs as jobs
+import app.nodes as nodes
+from app.cache import open_analysis_cache
+from app.checkpoint import open_run_checkpoint
+from app.dedup import open_near_duplicate_index
+from benchmarks.fakes import FakeSupabase, FakeChatModel
+
+@pytest.fixture
+def fake_clients(monkeypatch, tmp_path):
+    """
+    FakeSupabase plus a fast FakeChatModel, and empty local stores, swapped in for
+    one test and restored afterwards. Fakes seeded alike produce the same texts, so
+    shared stores would turn one test's items into another's cache hits and duplicates.
+    """
+    db = FakeSupabase(seed=1)
+    monkeypatch.setattr(config, "_supabase", db)
+    monkeypatch.setattr(config, "_llm_factory", lambda: FakeChatModel(latency_ms=1, jitter_ms=0, seed=1))
+    monkeypatch.setattr(config, "_llms", {})
+    data_dir = str(tmp_path / "data")
+    checkpoint = open_run_checkpoint(data_dir, config.CHECKPOINT_MAX_AGE_SECONDS)
+    monkeypatch.setattr(nodes, "analysis_cache", open_analysis_cache(
+        data_dir, config.ANALYSIS_CACHE_TTL_SECONDS, config.ANALYSIS_CACHE_MAX_ENTRIES
+    ))
+    monkeypatch.setattr(nodes, "near_dup_index", open_near_duplicate_index(
+        data_dir, config.NEAR_DUP_MAX_HISTORY, config.NEAR_DUP_HISTORY_SECONDS, config.NEAR_DUP_REFRESH_SECONDS
+    ))
+    monkeypatch.setattr(nodes, "run_checkpoint", checkpoint)
+    monkeypatch.setattr(jobs, "run_checkpoint", checkpoint)
+    return db
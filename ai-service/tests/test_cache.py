@@ -0,0 +1,45 @@
+import asyncio
+import app.nodes as nodes
+from app.cache import AnalysisCache
+from app.schemas import ProcessingStats
+
+ANALYSIS = {"category": "ai", "content_quality_score": 80}
+
+def _cache(tmp_path, ttl_seconds=3600, max_entries=100):
+    return AnalysisCache(str(tmp_path / "analysis_cache.sqlite3"), ttl_seconds, max_entries)
+
+def test_hit_after_set_and_miss_otherwise(tmp_path):
+    cache = _cache(tmp_path)
+    key = AnalysisCache.make_key("some text", "v1", "model-a")
+    assert cache.get(key) is None
+    cache.set(key, ANALYSIS)
+    assert cache.get(key) == ANALYSIS
+    assert cache.get(AnalysisCache.make_key("some text", "v1", "model-b")) is None
+    assert cache.get(AnalysisCache.make_key("some text", "v2", "model-a")) is None
+
+def test_expired_entries_are_not_returned(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=-1)
+    cache.set("k", ANALYSIS)
+    assert cache.get("k") is None
+
+def test_least_recently_used_entries_are_evicted_on_trim(tmp_path, monkeypatch):
+    monkeypatch.setattr(AnalysisCache, "TRIM_EVERY", 1)
+    cache = _cache(tmp_path, max_entries=2)
+    cache.set("a", ANALYSIS)
+    cache.set("b", ANALYSIS)
+    cache.get("a") # "b" is now the least recently used
+    cache.set("c", ANALYSIS)
+    assert [cache.get(key) is not None for key in ("a", "b", "c")] == [True, False, True]
+
+def test_cache_hit_skips_the_llm(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    monkeypatch.setattr(nodes, "analysis_cache", cache)
+    monkeypatch.setattr(nodes, "run_checkpoint", None)
+    async def no_llm(*args):
+        raise AssertionError("LLM called on a cache hit")
+    monkeypatch.setattr(nodes, "_call_llm", no_llm)
+    item, stats = nodes.new_content_item({"id": "c1", "raw_content": "text"}), ProcessingStats().model_dump()
+    item["prompt_content"] = "text"
+    cache.set(AnalysisCache.make_key("text", nodes.PROMPT_VERSION, nodes.CACHE_MODEL_TAG), ANALYSIS)
+    asyncio.run(nodes.analyze_item(None, "", item, stats))
+    assert (item["analysis"], stats["cache_hits"], stats["processed"]) == (ANALYSIS, 1, 1)
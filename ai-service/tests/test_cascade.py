@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+import app.nodes as nodes
+from app.schemas import ProcessingStats
+from app.scoring import is_near_threshold, REJECT_THRESHOLD, APPROVE_THRESHOLD
+
+def _analysis(score):
+    return {
+        "category": "ai", "content_quality_score": score, "engagement_score": score, "virality_probability": score,
+        "recommended_platforms": [], "content_type_recommendation": "post", "reasoning": "ok", "rewrite_needed": False
+    }
+
+def test_near_threshold_is_strictly_within_margin():
+    assert is_near_threshold(APPROVE_THRESHOLD - 7.9, 8)
+    assert is_near_threshold(REJECT_THRESHOLD + 7.9, 8)
+    assert not is_near_threshold(APPROVE_THRESHOLD + 8, 8)
+    assert not is_near_threshold(REJECT_THRESHOLD - 8, 8)
+
+def _triage(monkeypatch, invoke):
+    async def acquire(tokens):
+        pass
+    monkeypatch.setattr(nodes, "triage_limiter", SimpleNamespace(acquire=acquire))
+    monkeypatch.setattr(nodes, "CASCADE_MARGIN", 8)
+    monkeypatch.setattr(nodes, "_invoke_llm", invoke)
+    item, stats = nodes.new_content_item({"id": "c1", "raw_content": "text"}), ProcessingStats().model_dump()
+    return asyncio.run(nodes._triage_item(None, {}, 1, item, stats)), stats
+
+def test_clear_triage_result_is_kept(monkeypatch):
+    async def clear(chain, inputs, stats):
+        return _analysis(95)
+    result, stats = _triage(monkeypatch, clear)
+    assert result == _analysis(95)
+    assert (stats["triaged"], stats["escalated"]) == (1, 0)
+
+def test_triage_result_near_a_threshold_is_escalated(monkeypatch):
+    async def borderline(chain, inputs, stats):
+        return _analysis(int(APPROVE_THRESHOLD) - 2)
+    result, stats = _triage(monkeypatch, borderline)
+    assert result is None
+    assert (stats["triaged"], stats["escalated"]) == (0, 1)
+
+def test_failed_triage_is_escalated(monkeypatch):
+    async def failing(chain, inputs, stats):
+        raise RuntimeError("triage model down")
+    result, stats = _triage(monkeypatch, failing)
+    assert result is None and stats["escalated"] == 1
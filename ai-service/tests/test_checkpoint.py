@@ -0,0 +1,29 @@
+import socket
+import sqlite3
+from app.checkpoint import RunCheckpoint
+
+def _checkpoint(path, instance="ai-service-1"):
+    return RunCheckpoint(str(path), 3600, instance)
+
+def test_run_of_a_replaced_container_is_resumed_by_instance_name(tmp_path):
+    path = tmp_path / "run_checkpoint.sqlite3"
+    _checkpoint(path).start_run("b1", "old-worker", ["c1", "c2"])
+    with sqlite3.connect(path) as conn: # As if written before the restart, under another hostname
+        conn.execute("UPDATE checkpoint_runs SET hostname = 'old-container-hash'")
+    restarted = _checkpoint(path)
+    runs = restarted.interrupted_runs()
+    assert [(run["batch_id"], sorted(run["content_ids"])) for run in runs] == [("b1", ["c1", "c2"])]
+    assert restarted.take_over(runs[0], "new-worker")
+    assert restarted.interrupted_runs() == []
+
+def test_runs_of_other_instances_are_left_alone(tmp_path):
+    path = tmp_path / "run_checkpoint.sqlite3"
+    _checkpoint(path, "ai-service-2").start_run("b1", "w", ["c1"])
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE checkpoint_runs SET hostname = 'elsewhere'")
+    assert _checkpoint(path, "ai-service-1").interrupted_runs() == []
+
+def test_live_run_of_this_process_is_not_interrupted(tmp_path):
+    checkpoint = _checkpoint(tmp_path / "run_checkpoint.sqlite3", socket.gethostname())
+    checkpoint.start_run("b1", "w", ["c1"])
+    assert checkpoint.interrupted_runs() == []
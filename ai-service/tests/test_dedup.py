@@ -0,0 +1,25 @@
+import sqlite3
+from app.dedup import NearDuplicateIndex, minhash_signature
+
+def _signature(n):
+    return minhash_signature(f"story number {n} about a startup raising a seed round for developer tools")
+
+def test_entries_added_by_another_process_are_picked_up(tmp_path):
+    path = str(tmp_path / "near_duplicates.sqlite3")
+    reader = NearDuplicateIndex(path, refresh_seconds=0)
+    writer = NearDuplicateIndex(path, refresh_seconds=0)
+    assert reader.query(_signature(1), 0.8) is None
+    writer.add("c1", _signature(1), {"category": "ai"})
+    assert reader.query(_signature(1), 0.8) == ("c1", 1.0)
+
+def test_persisted_table_is_capped_at_max_entries(tmp_path):
+    path = str(tmp_path / "near_duplicates.sqlite3")
+    index = NearDuplicateIndex(path, max_entries=3, refresh_seconds=0)
+    for n in range(6):
+        index.add(f"c{n}", _signature(n))
+    index.query(_signature(0), 0.8)
+    with sqlite3.connect(path) as conn:
+        kept = [row[0] for row in conn.execute("SELECT content_id FROM near_dup_signatures ORDER BY rowid")]
+    assert kept == ["c3", "c4", "c5"]
+    assert index.query(_signature(0), 0.8) is None
+    assert index.query(_signature(5), 0.8) == ("c5", 1.0)
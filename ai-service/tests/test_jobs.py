@@ -0,0 +1,45 @@
+import threading
+import time
+import pytest
+from app.jobs import JobManager, JobQueueFull
+from app.job_store import JobStore
+
+def _wait_until_finished(manager, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.status in ("completed", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job.status}")
+
+def test_job_runs_to_completion_and_reports_every_stage(fake_clients, tmp_path):
+    fake_clients.seed_pending(5, words=120)
+    manager = JobManager(1, 1, 10, JobStore(str(tmp_path / "jobs.sqlite3"), 10))
+    job = manager.submit(5)
+    assert job.status in ("queued", "running") # The pool may pick it up at once
+    job = _wait_until_finished(manager, job.job_id)
+    assert (job.status, job.items, job.stats.processed) == ("completed", 5, 5)
+    assert set(job.stages.values()) == {"completed"}
+
+def test_submit_beyond_running_plus_queued_is_refused(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(JobManager, "_run", lambda self, job_id, batch_size, resume_from=None: release.wait(10))
+    manager = JobManager(1, 1, 10)
+    try:
+        manager.submit(5)
+        manager.submit(5)
+        with pytest.raises(JobQueueFull):
+            manager.submit(5)
+    finally:
+        release.set()
+
+def test_job_can_be_polled_from_another_process(fake_clients, tmp_path):
+    fake_clients.seed_pending(3, words=120)
+    path = str(tmp_path / "jobs.sqlite3")
+    owner = JobManager(1, 1, 10, JobStore(path, 10))
+    other = JobManager(1, 1, 10, JobStore(path, 10)) # Another gunicorn worker on the same data dir
+    job_id = owner.submit(3).job_id
+    owner._executor.shutdown(wait=True) # Until the job's last record is written
+    assert other.get(job_id).status == "completed"
+    assert other.get("unknown") is None
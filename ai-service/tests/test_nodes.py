@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+import app.nodes as nodes
+from langchain_core.runnables import RunnableLambda
+from app.config import GROQ_MAX_ITEM_RETRIES
+from app.nodes import new_content_item, _mark_ai_error, _with_failed_generation
+from app.persistence import build_save_row
+from app.resilience import RetriesExhausted
+from app.schemas import ProcessingStats
+from app.structured import AnalysisParseError, parse_analysis
+
+def _item(retry_count=0):
+    return new_content_item({"id": "c1", "raw_content": "text", "ai_retry_count": retry_count})
+
+def test_deferred_item_is_requeued_with_its_retry_count():
+    item, stats = _item(retry_count=2), ProcessingStats().model_dump()
+    item["retry_count"] += 4
+    _mark_ai_error(item, RetriesExhausted("gave up"), stats)
+    row = build_save_row(item, "2026-10-17T00:00:00")
+    assert (row["status"], row["ai_retry_count"], stats["deferred"]) == ("pending", 6, 1)
+
+def test_item_over_retry_cap_is_given_up():
+    item, stats = _item(retry_count=GROQ_MAX_ITEM_RETRIES), ProcessingStats().model_dump()
+    _mark_ai_error(item, RetriesExhausted("gave up"), stats)
+    row = build_save_row(item, "2026-10-17T00:00:00")
+    assert (row["status"], row["ai_status"], stats["ai_errors"]) == ("rejected", "ai_error", 1)
+
+class _JsonValidateFailed(Exception):
+    def __init__(self, failed_generation):
+        super().__init__("Error code: 400")
+        self.body = {"error": {"code": "json_validate_failed", "failed_generation": failed_generation}}
+
+def _rejecting_llm(failed_generation):
+    def reject(messages):
+        raise _JsonValidateFailed(failed_generation)
+    async def areject(messages):
+        reject(messages)
+    return RunnableLambda(reject, afunc=areject)
+
+def test_json_mode_rejection_is_repaired_locally():
+    output = '```json\n{"category": "AI", "content_quality_score": "80", "engagement_score": 70, "virality_probability": 60,}\n```'
+    chain = _with_failed_generation(_rejecting_llm(output)) | RunnableLambda(parse_analysis)
+    result = asyncio.run(chain.ainvoke("prompt"))
+    assert (result["category"], result["content_quality_score"]) == ("ai", 80)
+
+def test_unrepairable_json_mode_rejection_becomes_parse_error():
+    chain = _with_failed_generation(_rejecting_llm("I cannot answer that.")) | RunnableLambda(parse_analysis)
+    with pytest.raises(AnalysisParseError):
+        asyncio.run(chain.ainvoke("prompt"))
+
+def test_pack_is_deferred_whole_when_retries_run_out(monkeypatch):
+    calls = []
+    async def exhausted(chain, inputs, tokens, item, stats):
+        calls.append(inputs["count"])
+        item["retry_count"] += 3
+        raise RetriesExhausted("gave up after 3 attempts")
+    monkeypatch.setattr(nodes, "_call_llm", exhausted)
+    items, stats = [_item() for _ in range(4)], ProcessingStats().model_dump()
+    for n, item in enumerate(items):
+        item["id"], item["prompt_content"] = f"c{n}", f"story {n}"
+    asyncio.run(nodes.analyze_pack(None, None, "", items, stats))
+    assert calls == [4]
+    assert [(item["decision"], item["retry_count"]) for item in items] == [("deferred", 3)] * 4
+    assert stats["deferred"] == 4
+
+def test_batch_log_includes_save_timing(monkeypatch):
+    logged = []
+    monkeypatch.setattr(nodes, "save_items", lambda items, stats: None)
+    monkeypatch.setattr(nodes, "log_batch", lambda batch_id, size, stats, started_at: logged.append(dict(stats["stage_timings_ms"])))
+    state = {
+        "batch_id": "b1", "batch_size": 1, "started_at": "2026-10-17T00:00:00",
+        "content_batch": [_item()], "stats": ProcessingStats().model_dump()
+    }
+    nodes.save_results_node(state)
+    assert "save" in logged[0]
+
+def test_analysis_fan_out_is_capped_at_concurrency(monkeypatch):
+    running, peak = 0, 0
+    async def slow_analyze(chain, format_instructions, item, stats, triage_chain=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+    monkeypatch.setattr(nodes, "analyze_item", slow_analyze)
+    monkeypatch.setattr(nodes, "ANALYSIS_CONCURRENCY", 3)
+    asyncio.run(nodes._analyze_items(None, "", [_item() for _ in range(10)], ProcessingStats().model_dump()))
+    assert peak == 3
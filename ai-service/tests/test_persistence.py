@@ -0,0 +1,44 @@
+import asyncio
+import app.nodes as nodes
+from app.persistence import save_batch, _save_rows_individually
+
+def _row(content_id):
+    return {
+        "id": content_id, "status": "approved", "ai_status": "approved", "final_score": 80.0,
+        "decision_reason": "ok", "analyzed_at": "2026-10-17T00:00:00", "ai_retry_count": 0, "analysis": None
+    }
+
+def _claim(monkeypatch, worker_id, limit):
+    monkeypatch.setenv("WORKER_ID", worker_id)
+    return [row["id"] for row in nodes.claim_pending_items(limit)]
+
+def test_workers_never_claim_the_same_rows(fake_clients, monkeypatch):
+    fake_clients.seed_pending(6)
+    first, second = _claim(monkeypatch, "w1", 4), _claim(monkeypatch, "w2", 4)
+    assert len(first) == 4 and len(second) == 2
+    assert not set(first) & set(second)
+
+def test_save_after_lease_lost_leaves_new_owners_row_alone(fake_clients, monkeypatch):
+    fake_clients.seed_pending(1)
+    content_id = _claim(monkeypatch, "w1", 1)[0]
+    fake_clients.content_queue[content_id]["claimed_by"] = "w2" # Lease expired and was reclaimed
+    failures = save_batch([_row(content_id)])
+    assert [failure["content_id"] for failure in failures] == [content_id]
+    assert fake_clients.content_queue[content_id]["status"] == "processing"
+
+def test_per_row_fallback_checks_the_claim(fake_clients, monkeypatch):
+    fake_clients.seed_pending(2)
+    kept, lost = _claim(monkeypatch, "w1", 2)
+    fake_clients.content_queue[lost]["claimed_by"] = "w2"
+    failures = _save_rows_individually([_row(kept), _row(lost)], "w1")
+    assert [failure["content_id"] for failure in failures] == [lost]
+    assert (fake_clients.content_queue[kept]["status"], fake_clients.content_queue[lost]["status"]) == \
+        ("approved", "processing")
+
+def test_leases_are_renewed_while_a_batch_runs(fake_clients, monkeypatch):
+    fake_clients.seed_pending(1)
+    content_id = _claim(monkeypatch, "w1", 1)[0]
+    claimed_until = fake_clients.content_queue[content_id]["lease_expires_at"]
+    monkeypatch.setattr(nodes, "CONTENT_LEASE_SECONDS", 0.03)
+    asyncio.run(nodes._with_leases([content_id], asyncio.sleep(0.1)))
+    assert fake_clients.content_queue[content_id]["lease_expires_at"] != claimed_until
@@ -0,0 +1,29 @@
+import asyncio
+import pytest
+import app.pipeline as pipeline
+
+def test_streaming_batch_processes_every_item(fake_clients):
+    fake_clients.seed_pending(8, words=120)
+    stats = asyncio.run(pipeline.run_streaming_batch(8))
+    assert stats["processed"] == 8
+    assert stats["approved"] + stats["review"] + stats["rejected"] + stats["ai_errors"] + stats["deferred"] == 8
+    assert {"validate", "dedup", "analyze", "save"} <= set(stats["stage_timings_ms"])
+
+def test_failed_save_stage_does_not_hang(fake_clients, monkeypatch):
+    def failing_save(items, stats):
+        raise RuntimeError("database down")
+    monkeypatch.setattr(pipeline, "save_items", failing_save)
+    monkeypatch.setattr(pipeline, "STREAM_QUEUE_SIZE", 1)
+    fake_clients.seed_pending(10, words=120)
+    with pytest.raises(RuntimeError, match="database down"):
+        asyncio.run(asyncio.wait_for(pipeline.run_streaming_batch(10), timeout=30))
+
+def test_streaming_batch_feeds_stage_histogram(fake_clients):
+    from app.metrics import STAGE_SECONDS
+    def observations(stage):
+        return sum(sample.value for sample in STAGE_SECONDS.collect()[0].samples
+                   if sample.name.endswith("_count") and sample.labels["stage"] == stage)
+    before = observations("analyze")
+    fake_clients.seed_pending(3, words=120)
+    asyncio.run(pipeline.run_streaming_batch(3))
+    assert observations("analyze") == before + 1
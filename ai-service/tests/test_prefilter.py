@@ -0,0 +1,29 @@
+import math
+import numpy as np
+import app.nodes as nodes
+from app.prefilter import Prefilter, N_FEATURES, MIN_HOLDOUT_REJECTS
+from app.schemas import ProcessingStats
+
+def _prefilter(tmp_path, probability, confidence=0.97, precision=0.99, predicted_rejects=MIN_HOLDOUT_REJECTS,
+               min_precision=0.98):
+    """A model predicting `probability` for every text."""
+    prefilter = Prefilter(str(tmp_path / "prefilter.npz"), min_precision)
+    meta = {"confidence": confidence, "holdout_precision": precision, "holdout_predicted_rejects": predicted_rejects}
+    prefilter.save(np.zeros(N_FEATURES), math.log(probability / (1 - probability)), meta)
+    return prefilter
+
+def test_rejects_only_at_or_above_confidence(tmp_path):
+    assert _prefilter(tmp_path, 0.99).confident_reject("any text") > 0.98
+    assert _prefilter(tmp_path, 0.9).confident_reject("any text") is None
+
+def test_model_below_min_precision_is_ignored(tmp_path):
+    assert _prefilter(tmp_path, 0.99, precision=0.95).confident_reject("any text") is None
+
+def test_model_with_too_few_holdout_rejects_is_ignored(tmp_path):
+    assert _prefilter(tmp_path, 0.99, predicted_rejects=MIN_HOLDOUT_REJECTS - 1).confident_reject("any text") is None
+
+def test_confident_reject_skips_the_llm(tmp_path, monkeypatch):
+    monkeypatch.setattr(nodes, "get_prefilter", lambda: _prefilter(tmp_path, 0.99))
+    item, stats = nodes.new_content_item({"id": "c1", "raw_content": "text"}), ProcessingStats().model_dump()
+    nodes.prefilter_item(item, stats)
+    assert (item["is_valid"], item["decision"], stats["prefiltered"]) == (False, "rejected", 1)
@@ -0,0 +1,38 @@
+import asyncio
+import multiprocessing
+import time
+from app.rate_limit import SharedRateLimiter
+
+def _acquire_for(path, seconds, results):
+    limiter = SharedRateLimiter(path, "analysis", requests_per_minute=10, tokens_per_minute=0)
+    async def drain():
+        count = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                await asyncio.wait_for(limiter.acquire(1), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            count += 1
+        return count
+    results.put(asyncio.run(drain()))
+
+def test_processes_share_one_request_budget(tmp_path):
+    path = str(tmp_path / "rate_limit.sqlite3")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=_acquire_for, args=(path, 1.5, results)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    counts = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+    # One full bucket plus at most one refill over the window, not 10 per process
+    assert 10 <= sum(counts) <= 11
+
+def test_pause_is_seen_by_other_processes(tmp_path):
+    path = str(tmp_path / "rate_limit.sqlite3")
+    first = SharedRateLimiter(path, "analysis", 600, 0)
+    second = SharedRateLimiter(path, "analysis", 600, 0)
+    first._pause_shared(30)
+    assert second._try_acquire_shared(1) > 25
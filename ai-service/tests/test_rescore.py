@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+import app.rescore as rescore
+
+class _CappedQuery:
+    """content_ai_analysis query that, like PostgREST, returns at most `max_rows` rows."""
+
+    def __init__(self, rows, max_rows):
+        self.rows, self.max_rows = rows, max_rows
+        self.after, self.count = None, None
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        return self
+
+    def gt(self, column, value):
+        self.after = value
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        rows = [row for row in self.rows if self.after is None or row["content_id"] > self.after]
+        return SimpleNamespace(data=rows[:min(self.count, self.max_rows)])
+
+def test_fetch_analysis_pages_reads_past_server_row_cap(monkeypatch):
+    rows = [{"content_id": f"{n:05d}"} for n in range(2500)]
+    client = SimpleNamespace(table=lambda name: _CappedQuery(rows, max_rows=1000))
+    monkeypatch.setattr(rescore, "get_supabase", lambda: client)
+    pages = list(rescore.fetch_analysis_pages(5000))
+    assert [len(page) for page in pages] == [1000, 1000, 500]
+    assert [row["content_id"] for page in pages for row in page] == [row["content_id"] for row in rows]
@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+import app.nodes as nodes
+from app.resilience import CircuitBreaker, retry_after_seconds
+
+def _error(status, headers):
+    return SimpleNamespace(status_code=status, response=SimpleNamespace(status_code=status, headers=headers))
+
+def test_retry_after_is_preferred():
+    headers = {"retry-after": "5", "x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "30s"}
+    assert retry_after_seconds(_error(429, headers)) == 5.0
+
+def test_uses_reset_of_exhausted_limit_only():
+    headers = {
+        "x-ratelimit-remaining-requests": "14000", "x-ratelimit-reset-requests": "2m59.56s",
+        "x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "7.66s"
+    }
+    assert retry_after_seconds(_error(429, headers)) == 7.66
+
+def test_no_exhausted_limit_means_no_suggestion():
+    headers = {"x-ratelimit-remaining-requests": "10", "x-ratelimit-reset-requests": "2m59s"}
+    assert retry_after_seconds(_error(429, headers)) is None
+
+def test_ignored_for_server_errors():
+    headers = {"retry-after": "120", "x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "60s"}
+    assert retry_after_seconds(_error(503, headers)) is None
+
+def test_cancelled_half_open_probe_releases_its_slot(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    monkeypatch.setattr(nodes, "groq_breaker", breaker)
+    async def hang(chain, inputs, stats):
+        await asyncio.sleep(60)
+    monkeypatch.setattr(nodes, "_invoke_llm", hang)
+
+    async def probe_then_cancel():
+        item = nodes.new_content_item({"id": "c1", "raw_content": "text"})
+        probe = asyncio.create_task(nodes._call_llm(None, {}, 1, item, {}))
+        await asyncio.sleep(0.01)
+        assert not breaker.allow() # The probe holds the half-open slot
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    asyncio.run(probe_then_cancel())
+    assert breaker.allow()
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+import app.nodes as nodes
+import app.scheduling as scheduling
+from app.scheduling import SourceWeights, learned_weights
+
+def _set_rows(db, **ages):
+    """Replaces the queue with rows named by keyword, each created and published `hours` ago."""
+    now = datetime.now()
+    db.content_queue.clear()
+    db.seed_pending(len(ages))
+    rows = list(db.content_queue.values())
+    db.content_queue.clear()
+    for row, (name, hours) in zip(rows, ages.items()):
+        stamp = (now - timedelta(hours=hours)).isoformat(timespec="microseconds")
+        row.update(id=name, created_at=stamp, published_at=stamp, source="newsapi", viral_score=0)
+        db.content_queue[name] = row
+
+def _claim(limit, after=None):
+    return [row["id"] for row in nodes.claim_pending_items(limit, after)]
+
+def test_fifo_claims_oldest_first_and_continues_after_a_row(fake_clients, monkeypatch):
+    monkeypatch.setattr(nodes, "SCHEDULING_MODE", "fifo")
+    _set_rows(fake_clients, newest=1, oldest=30, middle=10)
+    first = nodes.claim_pending_items(1)
+    assert [row["id"] for row in first] == ["oldest"]
+    assert _claim(2, first[-1]) == ["middle", "newest"]
+
+def test_priority_prefers_fresh_items_but_starving_ones_go_first(fake_clients, monkeypatch):
+    monkeypatch.setattr(nodes, "SCHEDULING_MODE", "priority")
+    monkeypatch.setattr(scheduling, "SCHEDULING_MAX_WAIT_HOURS", 24)
+    monkeypatch.setattr(scheduling.source_weights, "fetch_rates", None)
+    _set_rows(fake_clients, fresh=1, stale=10, starving=48)
+    assert _claim(3) == ["starving", "fresh", "stale"]
+
+def test_source_weight_lifts_an_older_item(fake_clients, monkeypatch):
+    monkeypatch.setattr(nodes, "SCHEDULING_MODE", "priority")
+    monkeypatch.setattr(scheduling, "SCHEDULING_HALF_LIFE_HOURS", 6)
+    monkeypatch.setattr(scheduling, "source_weights", SourceWeights({"techcrunch": 4.0}, None, 60))
+    _set_rows(fake_clients, fresh=1, boosted=8)
+    fake_clients.content_queue["boosted"]["source"] = "techcrunch" # 4x = two half-lives younger
+    assert _claim(2) == ["boosted", "fresh"]
+
+def test_learned_weights_are_smoothed_and_bounded():
+    rates = [
+        {"source": "good", "approved": 90, "decided": 100},
+        {"source": "bad", "approved": 0, "decided": 1000},
+        {"source": "new", "approved": 1, "decided": 1}
+    ]
+    weights = learned_weights(rates)
+    assert weights["good"] > 1 and weights["bad"] == 0.25
+    assert weights["new"] < 2 # Unsmoothed, one approval would hit the 4x cap
+
+def test_failed_refresh_keeps_previous_weights():
+    calls = []
+    def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("rpc down")
+        return [{"source": "good", "approved": 90, "decided": 100}, {"source": "bad", "approved": 10, "decided": 100}]
+    weights = SourceWeights({}, fetch, refresh_seconds=0)
+    first = weights.get()
+    assert weights.get() == first and len(calls) == 2
@@ -0,0 +1,48 @@
+from app.text import extract_main_text
+
+ARTICLE = "<p>" + "The startup raised a large seed round to build developer tools for data teams. " * 3 + "</p>"
+
+def test_unclosed_paragraph_in_boilerplate_container():
+    html = '<aside class="widgets"><div class="share-bar"><p>Share this</div></aside>' + ARTICLE
+    text = extract_main_text(html)
+    assert text.startswith("The startup raised")
+    assert "Share this" not in text
+
+def test_unclosed_list_items_in_menu():
+    html = '<ul class="menu"><li>Home<li>About</ul>' + ARTICLE
+    text = extract_main_text(html)
+    assert text.startswith("The startup raised")
+    assert "Home" not in text
+
+def test_wrapper_class_containing_keyword():
+    html = '<body class="post has-sidebar">' + ARTICLE + "</body>"
+    assert extract_main_text(html).startswith("The startup raised")
+
+def test_class_token_with_boilerplate_prefix_is_skipped():
+    html = '<div class="related-posts"><p>Other stories</p></div>' + ARTICLE
+    assert "Other stories" not in extract_main_text(html)
+
+def test_stray_end_tag_does_not_hide_text():
+    html = "</div></span>" + ARTICLE
+    assert extract_main_text(html).startswith("The startup raised")
+
+def test_falls_back_to_tag_stripping_when_almost_everything_is_skipped():
+    html = '<div class="comments">' + ARTICLE + "</div><script>var x = 1;</script>"
+    text = extract_main_text(html)
+    assert text.startswith("The startup raised")
+    assert "var x" not in text
+
+def test_plain_text_passes_through():
+    assert extract_main_text("Plain &amp; simple  text") == "Plain & simple text"
+
+def test_plain_text_starting_with_boilerplate_word_is_kept():
+    text = "Shareholders of Acme approved the merger on Tuesday, ending a year of talks."
+    assert extract_main_text(text) == text
+
+def test_only_block_starting_with_boilerplate_word_is_kept():
+    assert extract_main_text("<p>Cookie maker Mondelez reported record earnings.</p>") == \
+        "Cookie maker Mondelez reported record earnings."
+
+def test_short_boilerplate_lines_are_dropped():
+    html = "<p>Share this</p>" + ARTICLE + "<p>© 2026 Example Media</p><p>We use cookies to improve your experience.</p>"
+    assert extract_main_text(html) == extract_main_text(ARTICLE)
@@ -0,0 +1,30 @@
+import worker
+from worker import AdaptiveBatchSize
+
+def _sizer(size, minimum=5, maximum=200, target_seconds=60):
+    sizer = AdaptiveBatchSize(minimum, maximum, target_seconds)
+    sizer.size = size
+    return sizer
+
+def test_size_at_most_doubles_per_batch(monkeypatch):
+    monkeypatch.setattr(worker, "GROQ_REQUESTS_PER_MINUTE", 0)
+    monkeypatch.setattr(worker, "GROQ_TOKENS_PER_MINUTE", 0)
+    assert _sizer(10).update(10, 1.0, {}) == 20 # Fast enough for 600 per minute
+
+def test_size_follows_observed_item_time(monkeypatch):
+    monkeypatch.setattr(worker, "GROQ_REQUESTS_PER_MINUTE", 0)
+    monkeypatch.setattr(worker, "GROQ_TOKENS_PER_MINUTE", 0)
+    assert _sizer(40).update(40, 120.0, {}) == 20 # 3s per item, 60s target
+
+def test_size_is_capped_by_groq_budget(monkeypatch):
+    monkeypatch.setattr(worker, "GROQ_REQUESTS_PER_MINUTE", 30)
+    monkeypatch.setattr(worker, "GROQ_TOKENS_PER_MINUTE", 12000)
+    stats = {"llm_calls": 10, "prompt_tokens": 15000, "completion_tokens": 5000}
+    assert _sizer(10).update(10, 1.0, stats) == 6 # 2000 tokens per item at 12k TPM
+
+def test_rate_limit_pressure_halves_down_to_minimum(monkeypatch):
+    sizer = _sizer(40)
+    assert sizer.update(40, 10.0, {"retries": 3}) == 20
+    assert sizer.update(20, 10.0, {"deferred": 1}) == 10
+    assert sizer.update(10, 10.0, {"retries": 1}) == 5
+    assert sizer.update(5, 10.0, {"retries": 1}) == 5
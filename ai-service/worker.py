@@ -0,0 +1,131 @@
+"""
+Long-running worker that keeps draining content_queue, as an alternative to
+triggering batches through POST /api/analyze.
+
+    cd ai-service
+    python worker.py                # graph runs
+    python worker.py --mode stream  # streaming pipeline
+
+Batch size adapts to the observed per-item time and the Groq rate limits. The
+worker backs off while the queue is empty. On SIGTERM/SIGINT it finishes and
+saves the batch in flight, then exits.
+"""
+import argparse
+import signal
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional, Tuple
+from app.config import (
+    run_checkpoint, get_worker_id,
+    GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE,
+    WORKER_MIN_BATCH, WORKER_MAX_BATCH, WORKER_TARGET_BATCH_SECONDS, WORKER_IDLE_MAX_SECONDS
+)
+from app.graph import app_graph
+from app.pipeline import run_streaming_batch
+from app.runtime import run_async
+from app.schemas import ProcessingStats
+
+class AdaptiveBatchSize:
+    """
+    Sizes batches so one takes about `target_seconds`. The size grows at most
+    2x per batch, is capped by what the Groq request and token budgets allow in
+    that window, and halves as soon as a batch hits rate-limit retries or
+    deferrals.
+    """
+
+    def __init__(self, minimum: int, maximum: int, target_seconds: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.target_seconds = target_seconds
+        self.size = self.minimum
+
+    def update(self, items: int, elapsed: float, stats: Dict[str, Any]) -> int:
+        if items <= 0 or elapsed <= 0:
+            return self.size
+        if stats.get("retries") or stats.get("deferred"):
+            self.size = max(self.minimum, self.size // 2)
+            return self.size
+
+        limits = [self.size * 2, items / elapsed * self.target_seconds]
+        calls_per_item = stats.get("llm_calls", 0) / items
+        if calls_per_item and GROQ_REQUESTS_PER_MINUTE > 0:
+            limits.append(GROQ_REQUESTS_PER_MINUTE * self.target_seconds / 60 / calls_per_item)
+        tokens_per_item = (stats.get("prompt_tokens", 0) + stats.get("completion_tokens", 0)) / items
+        if tokens_per_item and GROQ_TOKENS_PER_MINUTE > 0:
+            limits.append(GROQ_TOKENS_PER_MINUTE * self.target_seconds / 60 / tokens_per_item)
+        self.size = int(max(self.minimum, min(self.maximum, min(limits))))
+        return self.size
+
+def run_batch(batch_size: int, mode: str, resume_from: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+    """
+    Runs one batch. Returns (items fetched, ProcessingStats dict).
+    """
+    batch_id = resume_from["batch_id"] if resume_from else str(uuid.uuid4())
+    if mode == "stream" and not resume_from:
+        saved = [0]
+        def on_progress(stats, items_saved):
+            saved[0] = items_saved
+        stats = run_async(run_streaming_batch(batch_size, batch_id, on_progress))
+        return saved[0], stats
+
+    final_state = app_graph.invoke({
+        "batch_size": batch_size,
+        "batch_id": batch_id,
+        "resume_from": resume_from,
+        "content_batch": [],
+        "stats": ProcessingStats().model_dump()
+    })
+    return len(final_state["content_batch"]), final_state["stats"]
+
+def resume_interrupted(mode: str):
+    """Finishes batches a dead process on this host left behind (see app/checkpoint.py)."""
+    if not run_checkpoint:
+        return
+    for run in run_checkpoint.interrupted_runs():
+        if not run_checkpoint.take_over(run, get_worker_id()):
+            continue
+        if not run["content_ids"]:
+            run_checkpoint.finish_run(run["batch_id"])
+            continue
+        print(f"Resuming interrupted batch {run['batch_id']}...")
+        run_batch(len(run["content_ids"]), mode, resume_from=run)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["batch", "stream"], default="batch")
+    args = parser.parse_args()
+
+    stopping = threading.Event()
+    def request_stop(signum, frame):
+        print(f"Received signal {signum}, stopping after the current batch...")
+        stopping.set()
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    print(f"Worker {get_worker_id()} draining content_queue ({args.mode} mode)...")
+    resume_interrupted(args.mode)
+    sizer = AdaptiveBatchSize(WORKER_MIN_BATCH, WORKER_MAX_BATCH, WORKER_TARGET_BATCH_SECONDS)
+    idle_seconds = 0.0
+    while not stopping.is_set():
+        start = time.perf_counter()
+        try:
+            items, stats = run_batch(sizer.size, args.mode)
+        except Exception as e:
+            print(f"Batch failed: {e}")
+            items, stats = 0, {}
+        elapsed = time.perf_counter() - start
+
+        if items == 0:
+            # Empty queue (or a failed fetch): back off exponentially up to the cap
+            idle_seconds = min(WORKER_IDLE_MAX_SECONDS, max(1.0, idle_seconds * 2))
+            stopping.wait(idle_seconds)
+            continue
+        idle_seconds = 0.0
+        size = sizer.update(items, elapsed, stats)
+        print(f"Batch of {items} items took {elapsed:.1f}s; next batch size {size}")
+
+    print("Worker stopped.")
+
+if __name__ == "__main__":
+    main()
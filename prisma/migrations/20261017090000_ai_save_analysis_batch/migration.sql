@@ -0,0 +1,66 @@
+-- Bulk write path for the Python AI service (ai-service/app/persistence.py).
+-- Applies a whole batch of analysis results in one round trip. Each row runs in
+-- its own sub-transaction, so a bad row is reported back instead of failing the batch.
+
+-- CreateFunction
+CREATE OR REPLACE FUNCTION "save_analysis_batch"(p_rows JSONB)
+RETURNS TABLE ("content_id" TEXT, "error" TEXT)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    r JSONB;
+    a JSONB;
+BEGIN
+    FOR r IN SELECT * FROM jsonb_array_elements(p_rows)
+    LOOP
+        BEGIN
+            UPDATE "content_queue" SET
+                "status" = COALESCE(r->>'status', "status"),
+                "ai_status" = r->>'ai_status',
+                "final_score" = (r->>'final_score')::DOUBLE PRECISION,
+                "decision_reason" = r->>'decision_reason',
+                "analyzed_at" = (r->>'analyzed_at')::TIMESTAMP(3),
+                "updated_at" = CURRENT_TIMESTAMP
+            WHERE "id" = r->>'id';
+
+            a := r->'analysis';
+            IF a IS NOT NULL AND jsonb_typeof(a) = 'object' THEN
+                INSERT INTO "content_ai_analysis" (
+                    "id", "content_id", "category", "content_quality_score", "engagement_score",
+                    "virality_probability", "final_score", "recommended_platforms",
+                    "content_type_recommendation", "rewrite_needed", "reasoning", "raw_llm_response"
+                ) VALUES (
+                    gen_random_uuid()::TEXT,
+                    r->>'id',
+                    a->>'category',
+                    (a->>'content_quality_score')::INTEGER,
+                    (a->>'engagement_score')::INTEGER,
+                    (a->>'virality_probability')::INTEGER,
+                    (r->>'final_score')::DOUBLE PRECISION,
+                    a->'recommended_platforms',
+                    a->>'content_type_recommendation',
+                    (a->>'rewrite_needed')::BOOLEAN,
+                    a->>'reasoning',
+                    a
+                )
+                ON CONFLICT ("content_id") DO UPDATE SET
+                    "category" = EXCLUDED."category",
+                    "content_quality_score" = EXCLUDED."content_quality_score",
+                    "engagement_score" = EXCLUDED."engagement_score",
+                    "virality_probability" = EXCLUDED."virality_probability",
+                    "final_score" = EXCLUDED."final_score",
+                    "recommended_platforms" = EXCLUDED."recommended_platforms",
+                    "content_type_recommendation" = EXCLUDED."content_type_recommendation",
+                    "rewrite_needed" = EXCLUDED."rewrite_needed",
+                    "reasoning" = EXCLUDED."reasoning",
+                    "raw_llm_response" = EXCLUDED."raw_llm_response";
+            END IF;
+        EXCEPTION WHEN OTHERS THEN
+            "content_id" := r->>'id';
+            "error" := SQLERRM;
+            RETURN NEXT;
+        END;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,99 @@
+-- Atomic claim/lease of pending content so several AI service workers can drain
+-- content_queue without analyzing the same rows twice.
+
+-- AlterTable
+ALTER TABLE "content_queue" ADD COLUMN     "claimed_by" TEXT,
+ADD COLUMN     "lease_expires_at" TIMESTAMP(3);
+
+-- CreateIndex
+CREATE INDEX "content_queue_status_lease_expires_at_idx" ON "content_queue"("status", "lease_expires_at");
+
+-- CreateFunction
+-- Moves up to p_limit rows to 'processing' under p_worker_id. Rows whose lease has
+-- expired (the worker died mid-batch) are reclaimed. SKIP LOCKED lets concurrent
+-- callers take disjoint rows instead of blocking on each other.
+CREATE OR REPLACE FUNCTION "claim_pending_content"(p_worker_id TEXT, p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF "content_queue"
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "status" = 'processing',
+        "claimed_by" = p_worker_id,
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" IN (
+        SELECT "id" FROM "content_queue"
+        WHERE "status" = 'pending'
+           OR ("status" = 'processing' AND "lease_expires_at" < CURRENT_TIMESTAMP)
+        ORDER BY "created_at"
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING q.*;
+$$;
+
+-- CreateFunction
+-- save_analysis_batch now also releases the lease on every row it writes.
+CREATE OR REPLACE FUNCTION "save_analysis_batch"(p_rows JSONB)
+RETURNS TABLE ("content_id" TEXT, "error" TEXT)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    r JSONB;
+    a JSONB;
+BEGIN
+    FOR r IN SELECT * FROM jsonb_array_elements(p_rows)
+    LOOP
+        BEGIN
+            UPDATE "content_queue" SET
+                "status" = COALESCE(r->>'status', "status"),
+                "ai_status" = r->>'ai_status',
+                "final_score" = (r->>'final_score')::DOUBLE PRECISION,
+                "decision_reason" = r->>'decision_reason',
+                "analyzed_at" = (r->>'analyzed_at')::TIMESTAMP(3),
+                "claimed_by" = NULL,
+                "lease_expires_at" = NULL,
+                "updated_at" = CURRENT_TIMESTAMP
+            WHERE "id" = r->>'id';
+
+            a := r->'analysis';
+            IF a IS NOT NULL AND jsonb_typeof(a) = 'object' THEN
+                INSERT INTO "content_ai_analysis" (
+                    "id", "content_id", "category", "content_quality_score", "engagement_score",
+                    "virality_probability", "final_score", "recommended_platforms",
+                    "content_type_recommendation", "rewrite_needed", "reasoning", "raw_llm_response"
+                ) VALUES (
+                    gen_random_uuid()::TEXT,
+                    r->>'id',
+                    a->>'category',
+                    (a->>'content_quality_score')::INTEGER,
+                    (a->>'engagement_score')::INTEGER,
+                    (a->>'virality_probability')::INTEGER,
+                    (r->>'final_score')::DOUBLE PRECISION,
+                    a->'recommended_platforms',
+                    a->>'content_type_recommendation',
+                    (a->>'rewrite_needed')::BOOLEAN,
+                    a->>'reasoning',
+                    a
+                )
+                ON CONFLICT ("content_id") DO UPDATE SET
+                    "category" = EXCLUDED."category",
+                    "content_quality_score" = EXCLUDED."content_quality_score",
+                    "engagement_score" = EXCLUDED."engagement_score",
+                    "virality_probability" = EXCLUDED."virality_probability",
+                    "final_score" = EXCLUDED."final_score",
+                    "recommended_platforms" = EXCLUDED."recommended_platforms",
+                    "content_type_recommendation" = EXCLUDED."content_type_recommendation",
+                    "rewrite_needed" = EXCLUDED."rewrite_needed",
+                    "reasoning" = EXCLUDED."reasoning",
+                    "raw_llm_response" = EXCLUDED."raw_llm_response";
+            END IF;
+        EXCEPTION WHEN OTHERS THEN
+            "content_id" := r->>'id';
+            "error" := SQLERRM;
+            RETURN NEXT;
+        END;
+    END LOOP;
+END;
+$$;
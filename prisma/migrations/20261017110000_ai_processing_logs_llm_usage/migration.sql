@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE "ai_processing_logs" ADD COLUMN     "llm_calls" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "prompt_tokens" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "completion_tokens" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "stage_timings" JSONB;
@@ -0,0 +1,36 @@
+-- Bulk write-back for the offline re-scorer (ai-service/app/rescore.py): applies
+-- re-decided scores and statuses in two set-based statements per call.
+
+-- CreateFunction
+-- Only rows still in a settled decision status are touched, so content that was
+-- scheduled or posted meanwhile is never pulled back. Returns the number of
+-- content_queue rows updated.
+CREATE OR REPLACE FUNCTION "apply_rescore"(p_rows JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INTEGER;
+BEGIN
+    WITH r AS (
+        SELECT * FROM jsonb_to_recordset(p_rows)
+            AS x("id" TEXT, "status" TEXT, "final_score" DOUBLE PRECISION, "decision_reason" TEXT)
+    ), q AS (
+        UPDATE "content_queue" AS q SET
+            "status" = r."status",
+            "ai_status" = r."status",
+            "final_score" = r."final_score",
+            "decision_reason" = r."decision_reason",
+            "updated_at" = CURRENT_TIMESTAMP
+        FROM r
+        WHERE q."id" = r."id" AND q."status" IN ('approved', 'review', 'rejected')
+        RETURNING q."id", r."final_score"
+    )
+    UPDATE "content_ai_analysis" AS a SET "final_score" = q."final_score"
+    FROM q
+    WHERE a."content_id" = q."id";
+
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
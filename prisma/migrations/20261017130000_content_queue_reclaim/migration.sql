@@ -0,0 +1,19 @@
+-- Lets a restarted AI service process resume an interrupted batch on the same rows
+-- (see ai-service/app/checkpoint.py) instead of waiting for their leases to expire.
+
+-- CreateFunction
+-- Moves rows still 'processing' under p_previous_worker_id to p_worker_id with a
+-- fresh lease. Rows already reclaimed or saved by someone else are left alone.
+CREATE OR REPLACE FUNCTION "reclaim_content"(p_worker_id TEXT, p_previous_worker_id TEXT, p_ids TEXT[], p_lease_seconds INTEGER)
+RETURNS SETOF "content_queue"
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "claimed_by" = p_worker_id,
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" = ANY(p_ids)
+      AND q."status" = 'processing'
+      AND q."claimed_by" = p_previous_worker_id
+    RETURNING q.*;
+$$;
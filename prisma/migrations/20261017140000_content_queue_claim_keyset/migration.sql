@@ -0,0 +1,55 @@
+-- Claims return only the columns the AI service reads, and accept a
+-- (created_at, id) keyset cursor so large batches can be claimed page by page.
+
+-- CreateIndex
+CREATE INDEX "content_queue_status_created_at_id_idx" ON "content_queue"("status", "created_at", "id");
+
+-- DropFunction
+-- The return type changes, which CREATE OR REPLACE cannot do
+DROP FUNCTION IF EXISTS "claim_pending_content"(TEXT, INTEGER, INTEGER);
+DROP FUNCTION IF EXISTS "reclaim_content"(TEXT, TEXT, TEXT[], INTEGER);
+
+-- CreateFunction
+-- As before, but rows come in (created_at, id) order, starting after the cursor
+-- when one is given.
+CREATE FUNCTION "claim_pending_content"(
+    p_worker_id TEXT,
+    p_limit INTEGER,
+    p_lease_seconds INTEGER,
+    p_after_created_at TIMESTAMP(3) DEFAULT NULL,
+    p_after_id TEXT DEFAULT NULL
+)
+RETURNS TABLE ("id" TEXT, "raw_content" TEXT, "summary" TEXT, "source_url" TEXT, "created_at" TIMESTAMP(3))
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "status" = 'processing',
+        "claimed_by" = p_worker_id,
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" IN (
+        SELECT c."id" FROM "content_queue" AS c
+        WHERE (c."status" = 'pending'
+               OR (c."status" = 'processing' AND c."lease_expires_at" < CURRENT_TIMESTAMP))
+          AND (p_after_created_at IS NULL OR (c."created_at", c."id") > (p_after_created_at, p_after_id))
+        ORDER BY c."created_at", c."id"
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING q."id", q."raw_content", q."summary", q."source_url", q."created_at";
+$$;
+
+-- CreateFunction
+CREATE FUNCTION "reclaim_content"(p_worker_id TEXT, p_previous_worker_id TEXT, p_ids TEXT[], p_lease_seconds INTEGER)
+RETURNS TABLE ("id" TEXT, "raw_content" TEXT, "summary" TEXT, "source_url" TEXT, "created_at" TIMESTAMP(3))
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "claimed_by" = p_worker_id,
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" = ANY(p_ids)
+      AND q."status" = 'processing'
+      AND q."claimed_by" = p_previous_worker_id
+    RETURNING q."id", q."raw_content", q."summary", q."source_url", q."created_at";
+$$;
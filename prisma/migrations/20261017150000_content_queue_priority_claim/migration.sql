@@ -0,0 +1,72 @@
+-- Priority scheduling for the AI service (ai-service/app/scheduling.py): claims
+-- the pending rows most worth analyzing now instead of the oldest, and reports
+-- per-source approval rates so the ranking can learn which sources pay off.
+
+-- CreateIndex
+CREATE INDEX "content_queue_analyzed_at_idx" ON "content_queue"("analyzed_at");
+
+-- CreateFunction
+-- Same claim and lease semantics as claim_pending_content, different order:
+--   1. Rows waiting longer than p_max_wait_seconds (starvation guard), earliest
+--      deadline first.
+--   2. Everything else by effective freshness: the publish time (capped at the
+--      enqueue time) shifted by p_half_life_hours * log2(weight), i.e. a weight
+--      of 2 counts as one half-life fresher. weight = the source's entry in
+--      p_source_weights (default 1) * (1 + viral_score / 100).
+-- The order is recomputed on every call, so there is no keyset cursor; claimed
+-- rows leave 'pending', and rows that arrive between pages compete on merit.
+CREATE OR REPLACE FUNCTION "claim_prioritized_content"(
+    p_worker_id TEXT,
+    p_limit INTEGER,
+    p_lease_seconds INTEGER,
+    p_half_life_hours DOUBLE PRECISION,
+    p_max_wait_seconds INTEGER,
+    p_source_weights JSONB DEFAULT '{}'::JSONB
+)
+RETURNS TABLE ("id" TEXT, "raw_content" TEXT, "summary" TEXT, "source_url" TEXT, "created_at" TIMESTAMP(3))
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "status" = 'processing',
+        "claimed_by" = p_worker_id,
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" IN (
+        SELECT c."id" FROM "content_queue" AS c
+        CROSS JOIN LATERAL (
+            SELECT
+                c."created_at" < CURRENT_TIMESTAMP - make_interval(secs => p_max_wait_seconds) AS starving,
+                GREATEST(
+                    COALESCE((p_source_weights ->> c."source")::DOUBLE PRECISION, 1)
+                        * (1 + GREATEST(c."viral_score", 0) / 100.0),
+                    0.01
+                ) AS weight
+        ) AS s
+        WHERE c."status" = 'pending'
+           OR (c."status" = 'processing' AND c."lease_expires_at" < CURRENT_TIMESTAMP)
+        ORDER BY
+            s.starving DESC,
+            CASE WHEN s.starving THEN c."created_at" END,
+            LEAST(COALESCE(c."published_at", c."created_at"), c."created_at")
+                + (p_half_life_hours * ln(s.weight) / ln(2)) * INTERVAL '1 hour' DESC,
+            c."id"
+        LIMIT p_limit
+        FOR UPDATE OF c SKIP LOCKED
+    )
+    RETURNING q."id", q."raw_content", q."summary", q."source_url", q."created_at";
+$$;
+
+-- CreateFunction
+-- Decided rows per source since p_since. Rows still awaiting analysis and
+-- ai_error rows are not counted.
+CREATE OR REPLACE FUNCTION "source_approval_rates"(p_since TIMESTAMP(3))
+RETURNS TABLE ("source" TEXT, "decided" BIGINT, "approved" BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT q."source", COUNT(*), COUNT(*) FILTER (WHERE q."ai_status" = 'approved')
+    FROM "content_queue" AS q
+    WHERE q."analyzed_at" >= p_since
+      AND q."ai_status" IN ('approved', 'review', 'rejected')
+    GROUP BY q."source";
+$$;
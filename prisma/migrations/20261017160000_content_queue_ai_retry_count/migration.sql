@@ -0,0 +1,163 @@
+-- Transient LLM failures per content row, accumulated across runs, so the AI
+-- service can stop requeuing rows that keep failing (ai-service/app/nodes.py).
+
+-- AlterTable
+ALTER TABLE "content_queue" ADD COLUMN     "ai_retry_count" INTEGER NOT NULL DEFAULT 0;
+
+-- DropFunction
+-- Claims now also return ai_retry_count, which CREATE OR REPLACE cannot do
+DROP FUNCTION IF EXISTS "claim_pending_content"(TEXT, INTEGER, INTEGER, TIMESTAMP(3), TEXT);
+DROP FUNCTION IF EXISTS "claim_prioritized_content"(TEXT, INTEGER, INTEGER, DOUBLE PRECISION, INTEGER, JSONB);
+DROP FUNCTION IF EXISTS "reclaim_content"(TEXT, TEXT, TEXT[], INTEGER);
+
+-- CreateFunction
+CREATE FUNCTION "claim_pending_content"(
+    p_worker_id TEXT,
+    p_limit INTEGER,
+    p_lease_seconds INTEGER,
+    p_after_created_at TIMESTAMP(3) DEFAULT NULL,
+    p_after_id TEXT DEFAULT NULL
+)
+RETURNS TABLE ("id" TEXT, "raw_content" TEXT, "summary" TEXT, "source_url" TEXT, "created_at" TIMESTAMP(3), "ai_retry_count" INTEGER)
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "status" = 'processing',
+        "claimed_by" = p_worker_id,
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" IN (
+        SELECT c."id" FROM "content_queue" AS c
+        WHERE (c."status" = 'pending'
+               OR (c."status" = 'processing' AND c."lease_expires_at" < CURRENT_TIMESTAMP))
+          AND (p_after_created_at IS NULL OR (c."created_at", c."id") > (p_after_created_at, p_after_id))
+        ORDER BY c."created_at", c."id"
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING q."id", q."raw_content", q."summary", q."source_url", q."created_at", q."ai_retry_count";
+$$;
+
+-- CreateFunction
+CREATE FUNCTION "claim_prioritized_content"(
+    p_worker_id TEXT,
+    p_limit INTEGER,
+    p_lease_seconds INTEGER,
+    p_half_life_hours DOUBLE PRECISION,
+    p_max_wait_seconds INTEGER,
+    p_source_weights JSONB DEFAULT '{}'::JSONB
+)
+RETURNS TABLE ("id" TEXT, "raw_content" TEXT, "summary" TEXT, "source_url" TEXT, "created_at" TIMESTAMP(3), "ai_retry_count" INTEGER)
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "status" = 'processing',
+        "claimed_by" = p_worker_id,
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" IN (
+        SELECT c."id" FROM "content_queue" AS c
+        CROSS JOIN LATERAL (
+            SELECT
+                c."created_at" < CURRENT_TIMESTAMP - make_interval(secs => p_max_wait_seconds) AS starving,
+                GREATEST(
+                    COALESCE((p_source_weights ->> c."source")::DOUBLE PRECISION, 1)
+                        * (1 + GREATEST(c."viral_score", 0) / 100.0),
+                    0.01
+                ) AS weight
+        ) AS s
+        WHERE c."status" = 'pending'
+           OR (c."status" = 'processing' AND c."lease_expires_at" < CURRENT_TIMESTAMP)
+        ORDER BY
+            s.starving DESC,
+            CASE WHEN s.starving THEN c."created_at" END,
+            LEAST(COALESCE(c."published_at", c."created_at"), c."created_at")
+                + (p_half_life_hours * ln(s.weight) / ln(2)) * INTERVAL '1 hour' DESC,
+            c."id"
+        LIMIT p_limit
+        FOR UPDATE OF c SKIP LOCKED
+    )
+    RETURNING q."id", q."raw_content", q."summary", q."source_url", q."created_at", q."ai_retry_count";
+$$;
+
+-- CreateFunction
+CREATE FUNCTION "reclaim_content"(p_worker_id TEXT, p_previous_worker_id TEXT, p_ids TEXT[], p_lease_seconds INTEGER)
+RETURNS TABLE ("id" TEXT, "raw_content" TEXT, "summary" TEXT, "source_url" TEXT, "created_at" TIMESTAMP(3), "ai_retry_count" INTEGER)
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "claimed_by" = p_worker_id,
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" = ANY(p_ids)
+      AND q."status" = 'processing'
+      AND q."claimed_by" = p_previous_worker_id
+    RETURNING q."id", q."raw_content", q."summary", q."source_url", q."created_at", q."ai_retry_count";
+$$;
+
+-- CreateFunction
+-- save_analysis_batch now also stores ai_retry_count when the row carries it.
+CREATE OR REPLACE FUNCTION "save_analysis_batch"(p_rows JSONB)
+RETURNS TABLE ("content_id" TEXT, "error" TEXT)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    r JSONB;
+    a JSONB;
+BEGIN
+    FOR r IN SELECT * FROM jsonb_array_elements(p_rows)
+    LOOP
+        BEGIN
+            UPDATE "content_queue" SET
+                "status" = COALESCE(r->>'status', "status"),
+                "ai_status" = r->>'ai_status',
+                "final_score" = (r->>'final_score')::DOUBLE PRECISION,
+                "decision_reason" = r->>'decision_reason',
+                "analyzed_at" = (r->>'analyzed_at')::TIMESTAMP(3),
+                "ai_retry_count" = COALESCE((r->>'ai_retry_count')::INTEGER, "ai_retry_count"),
+                "claimed_by" = NULL,
+                "lease_expires_at" = NULL,
+                "updated_at" = CURRENT_TIMESTAMP
+            WHERE "id" = r->>'id';
+
+            a := r->'analysis';
+            IF a IS NOT NULL AND jsonb_typeof(a) = 'object' THEN
+                INSERT INTO "content_ai_analysis" (
+                    "id", "content_id", "category", "content_quality_score", "engagement_score",
+                    "virality_probability", "final_score", "recommended_platforms",
+                    "content_type_recommendation", "rewrite_needed", "reasoning", "raw_llm_response"
+                ) VALUES (
+                    gen_random_uuid()::TEXT,
+                    r->>'id',
+                    a->>'category',
+                    (a->>'content_quality_score')::INTEGER,
+                    (a->>'engagement_score')::INTEGER,
+                    (a->>'virality_probability')::INTEGER,
+                    (r->>'final_score')::DOUBLE PRECISION,
+                    a->'recommended_platforms',
+                    a->>'content_type_recommendation',
+                    (a->>'rewrite_needed')::BOOLEAN,
+                    a->>'reasoning',
+                    a
+                )
+                ON CONFLICT ("content_id") DO UPDATE SET
+                    "category" = EXCLUDED."category",
+                    "content_quality_score" = EXCLUDED."content_quality_score",
+                    "engagement_score" = EXCLUDED."engagement_score",
+                    "virality_probability" = EXCLUDED."virality_probability",
+                    "final_score" = EXCLUDED."final_score",
+                    "recommended_platforms" = EXCLUDED."recommended_platforms",
+                    "content_type_recommendation" = EXCLUDED."content_type_recommendation",
+                    "rewrite_needed" = EXCLUDED."rewrite_needed",
+                    "reasoning" = EXCLUDED."reasoning",
+                    "raw_llm_response" = EXCLUDED."raw_llm_response";
+            END IF;
+        EXCEPTION WHEN OTHERS THEN
+            "content_id" := r->>'id';
+            "error" := SQLERRM;
+            RETURN NEXT;
+        END;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,98 @@
+-- Saves and lease renewals are checked against the claiming worker, so a worker
+-- whose lease expired (and whose rows were reclaimed by another worker) can no
+-- longer overwrite the new owner's result (ai-service/app/persistence.py).
+
+-- DropFunction
+-- The owner check adds a parameter; dropping the old signature keeps unchecked saves from resolving
+DROP FUNCTION IF EXISTS "save_analysis_batch"(JSONB);
+
+-- CreateFunction
+-- Rows not claimed by p_worker_id are reported back with a "lease lost" error and left untouched.
+CREATE FUNCTION "save_analysis_batch"(p_rows JSONB, p_worker_id TEXT)
+RETURNS TABLE ("content_id" TEXT, "error" TEXT)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    r JSONB;
+    a JSONB;
+BEGIN
+    FOR r IN SELECT * FROM jsonb_array_elements(p_rows)
+    LOOP
+        BEGIN
+            UPDATE "content_queue" SET
+                "status" = COALESCE(r->>'status', "status"),
+                "ai_status" = r->>'ai_status',
+                "final_score" = (r->>'final_score')::DOUBLE PRECISION,
+                "decision_reason" = r->>'decision_reason',
+                "analyzed_at" = (r->>'analyzed_at')::TIMESTAMP(3),
+                "ai_retry_count" = COALESCE((r->>'ai_retry_count')::INTEGER, "ai_retry_count"),
+                "claimed_by" = NULL,
+                "lease_expires_at" = NULL,
+                "updated_at" = CURRENT_TIMESTAMP
+            WHERE "id" = r->>'id'
+              AND "claimed_by" = p_worker_id;
+
+            IF NOT FOUND THEN
+                "content_id" := r->>'id';
+                "error" := 'lease lost: row is no longer claimed by ' || p_worker_id;
+                RETURN NEXT;
+                CONTINUE;
+            END IF;
+
+            a := r->'analysis';
+            IF a IS NOT NULL AND jsonb_typeof(a) = 'object' THEN
+                INSERT INTO "content_ai_analysis" (
+                    "id", "content_id", "category", "content_quality_score", "engagement_score",
+                    "virality_probability", "final_score", "recommended_platforms",
+                    "content_type_recommendation", "rewrite_needed", "reasoning", "raw_llm_response"
+                ) VALUES (
+                    gen_random_uuid()::TEXT,
+                    r->>'id',
+                    a->>'category',
+                    (a->>'content_quality_score')::INTEGER,
+                    (a->>'engagement_score')::INTEGER,
+                    (a->>'virality_probability')::INTEGER,
+                    (r->>'final_score')::DOUBLE PRECISION,
+                    a->'recommended_platforms',
+                    a->>'content_type_recommendation',
+                    (a->>'rewrite_needed')::BOOLEAN,
+                    a->>'reasoning',
+                    a
+                )
+                ON CONFLICT ("content_id") DO UPDATE SET
+                    "category" = EXCLUDED."category",
+                    "content_quality_score" = EXCLUDED."content_quality_score",
+                    "engagement_score" = EXCLUDED."engagement_score",
+                    "virality_probability" = EXCLUDED."virality_probability",
+                    "final_score" = EXCLUDED."final_score",
+                    "recommended_platforms" = EXCLUDED."recommended_platforms",
+                    "content_type_recommendation" = EXCLUDED."content_type_recommendation",
+                    "rewrite_needed" = EXCLUDED."rewrite_needed",
+                    "reasoning" = EXCLUDED."reasoning",
+                    "raw_llm_response" = EXCLUDED."raw_llm_response";
+            END IF;
+        EXCEPTION WHEN OTHERS THEN
+            "content_id" := r->>'id';
+            "error" := SQLERRM;
+            RETURN NEXT;
+        END;
+    END LOOP;
+END;
+$$;
+
+-- CreateFunction
+-- Pushes out the lease of rows still 'processing' under p_worker_id. Returns the ids
+-- renewed; rows missing from the result were saved or have been reclaimed.
+CREATE OR REPLACE FUNCTION "extend_content_lease"(p_worker_id TEXT, p_ids TEXT[], p_lease_seconds INTEGER)
+RETURNS TABLE ("id" TEXT)
+LANGUAGE sql
+AS $$
+    UPDATE "content_queue" AS q SET
+        "lease_expires_at" = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds),
+        "updated_at" = CURRENT_TIMESTAMP
+    WHERE q."id" = ANY(p_ids)
+      AND q."status" = 'processing'
+      AND q."claimed_by" = p_worker_id
+    RETURNING q."id";
+$$;
@@ -1,6 +1,7 @@
 import requests
 import json
 import sys
+import time
 
 url = "http://localhost:8000/api/analyze"
 payload = {"batch_size": 2}
@@ -10,9 +11,15 @@ print(f"Testing {url} with {payload}...")
 try:
     response = requests.post(url, json=payload)
     print(f"Status: {response.status_code}")
-    if response.status_code == 200:
+    if response.status_code == 202:
+        job = response.json()
+        print(f"Queued job {job['job_id']}, polling...")
+        while job["status"] in ("queued", "running"):
+            time.sleep(2)
+            job = requests.get(f"{url}/{job['job_id']}").json()
+            print(f"  {job['status']}: {job['stages']}")
         print("Response:")
-        print(json.dumps(response.json(), indent=2))
+        print(json.dumps(job, indent=2))
     else:
         print("Error Response:")
         print(response.text)